@@ -1,28 +1,71 @@
 import argparse
 import gc
+import re
 import sys
+import time
 import traceback
 from uuid import uuid1
 from pathlib import Path
 
-from src.create_matrix import (create_te_count_matrix,
-                               count_tes,
-                               filter_df_by_domain,
-                               filter_df_by_length,
-                               filter_df_by_percentages) 
-from src.read_input import (merge_inputs, read_repeatmasker_out,
-                            read_tesorter_cls_tsv)
-from src.utils import (convert_data_to_long_df_div,
-                       read_doms_file, read_names_file)
-
-def argument_parser():
+def parse_shard(shard):
+    """Parses a shard given as 'K/N' (shard K of N, starting at 0).
+
+    Used as the `type` of an argparse option.
+
+    Returns
+    -------
+    shard_index, n_shards : int
+    """
+    try:
+        shard_index, n_shards = (int(number) for number in shard.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must be given as K/N (e.g. 0/10), not {shard}")
+    if not 0 <= shard_index < n_shards:
+        raise argparse.ArgumentTypeError(f"Shard index must be between 0 and {n_shards - 1}")
+    return shard_index, n_shards
+
+def parse_region(region):
+    """Parses a region given as 'seqid:start-end' (or 'seqid:position').
+
+    Used as the `type` of an argparse option. Positions can
+    contain commas (e.g. chr3:1,200,000-1,800,000).
+
+    Returns
+    -------
+    seqid : str
+
+    start, end : int
+    """
+    seqid, _, positions = region.rpartition(":")
+    try:
+        start, _, end = positions.replace(",", "").partition("-")
+        start = int(start)
+        end = int(end) if end else start
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Region must be given as seqid:start-end, not {region}")
+    if not seqid or end < start:
+        raise argparse.ArgumentTypeError(f"Region must be given as seqid:start-end, not {region}")
+    return seqid, start, end
+
+def argument_parser(command=None):
     desc = """Create a TE count matrix and a divergence table 
     from several files of RepeatMasker (RM) and TESorter (TES);
     TES files must come from RM individual repeats. Several options
     are provided to filter the data from these files (some of them
     require input files). Another file with the names of the species
-    is required."""
-    parser = argparse.ArgumentParser(description=desc)
+    is required. To split the species between several nodes, run
+    'RECollector.py map' for each part and 'RECollector.py reduce'
+    to merge their outputs (see their --help). Outputs created with
+    --interval-index can be queried by region with 'RECollector.py query'."""
+    if command == "map":
+        desc = """Process a shard (a subset of the species directories)
+        of a RECollector analysis. Its output folder can be merged
+        with those of the other shards with 'RECollector.py reduce'.
+        The options are the same as in RECollector.py, and must be
+        the same for all the shards."""
+        parser = argparse.ArgumentParser(prog="RECollector.py map", description=desc)
+    else:
+        parser = argparse.ArgumentParser(description=desc)
         
     help_input_dir = """Input directory containing the files
     from RM and TES. Directory must contain individual subdirectories
@@ -82,6 +125,24 @@ def argument_parser():
                             choices=["lower_than","higher_than","equal"],
                             nargs=1)
 
+    desc_filter_chromosomes = """Filters data to only include repeats
+    of some sequences (e.g. to remove unplaced scaffolds and organelle
+    contigs). Sequences are selected while reading the RM files, so the
+    repeats of the other sequences are never loaded"""
+    chrom_group = parser.add_argument_group("Filter by chromosomes",
+                                            description=desc_filter_chromosomes)
+    help_chromosomes = """Sequences whose repeats are included"""
+    chrom_group.add_argument("--chromosomes", help=help_chromosomes, nargs="+",
+                             default=None, metavar="SEQID", required=False)
+    help_exclude_chromosomes = """Sequences whose repeats are excluded"""
+    chrom_group.add_argument("--exclude-chromosomes", help=help_exclude_chromosomes,
+                             nargs="+", default=None, metavar="SEQID", required=False)
+    help_chromosome_regex = """The given sequences are regular expressions
+    that must match the whole name, e.g. --exclude-chromosomes 'scaffold_.*'
+    'chrC|chrM' --chromosome-regex"""
+    chrom_group.add_argument("--chromosome-regex", help=help_chromosome_regex,
+                             action="store_true", required=False)
+
     help_matrix_depth = """Select the depth of the TE count matrix
     (class, subclass, superfamily, element, tes_order,
     tes_superfamily, clade). Default superfamily."""
@@ -97,21 +158,344 @@ def argument_parser():
     TESorter classification also belongs to this Class."""
     parser.add_argument("--override", help=help_override,
                         action="store_true", required=False)
+    help_measure = """Value of each category in the TE matrix: number
+    of repeats (count), sum of their lengths (bp), base pairs covered,
+    merging overlapping repeats of the same category in each sequence
+    (merged_bp), or percentage of the genome covered (genome_fraction;
+    the size of the genome is estimated from the sequences of the
+    RM file). The matrix is named <depth>_<measure>_matrix. Default count"""
+    parser.add_argument("--measure", help=help_measure,
+                        choices=["count", "bp", "merged_bp", "genome_fraction"],
+                        default="count", required=False)
+    help_resolve_fragments = """Count each RM element once: hits with the
+    same sequence and RM ID (fragments of an element) are combined into a
+    single repeat before filtering, with the sum of their lengths and their
+    length-weighted mean divergence, and hits marked with '*' (overlapped
+    by a higher-scoring hit) lose the bases covered by the other hits.
+    Combined repeats span the gaps between their fragments, so it cannot
+    be used with the merged_bp and genome_fraction measures or with
+    --density-window"""
+    parser.add_argument("--resolve-fragments", help=help_resolve_fragments,
+                        action="store_true", required=False)
     help_output = """Output folder path. Generated files will
     be in .csv format"""
     parser.add_argument("--output", "-o", help=help_output,
                         type=Path, required=True)
+    help_div_compression = """Compress the divergence files with
+    gzip (gz) or zstd (zst, requires the zstandard package).
+    REPlotDivergence reads compressed files directly"""
+    parser.add_argument("--div-compression", help=help_div_compression,
+                        choices=["gz", "zst"], default=None, required=False)
+    help_div_sample = """Write a random sample of at most N repeats of each
+    species and category to the divergence files, instead of all of them.
+    The sample is reproducible (its seed is taken from the names of the
+    species and the category), and sampled files have three more columns:
+    the exact number of repeats it was sampled from and their minimum
+    and maximum divergence. The TE count matrix and --landscape use
+    all the repeats"""
+    parser.add_argument("--div-sample", help=help_div_sample, type=int,
+                        default=None, metavar="N", required=False)
+    help_mmap = """Read the RepeatMasker files through a memory map
+    instead of buffered reads. The data read is the same.
+    Compressed files are read as usual"""
+    parser.add_argument("--mmap", help=help_mmap,
+                        action="store_true", required=False)
+    help_prefetch = """Number of species read in advance by a background
+    thread while the current species is merged, filtered and counted,
+    and number of species whose divergence data can wait to be written
+    by another background thread. Higher values use more memory.
+    Use 0 to process the species one step after another. Default 1"""
+    parser.add_argument("--prefetch", help=help_prefetch, type=int,
+                        default=1, required=False)
+    help_stats = """Record the wall time, CPU time, number of rows
+    and memory (RSS) of each processing stage of every species.
+    They are written to the log and to
+    RECollector_stats_<log number>.jsonl in the output folder"""
+    parser.add_argument("--stats", help=help_stats,
+                        action="store_true", required=False)
+    help_profile = """Profile the run with cProfile and a stack sampler.
+    The profile is saved to RECollector_profile_<log number>.pstats
+    (pstats dump) and RECollector_profile_<log number>.collapsed
+    (collapsed stacks for flamegraph.pl or speedscope) in the output
+    folder. Optionally, the name of a species (or of its directory)
+    can be given to profile only the processing of that species"""
+    parser.add_argument("--profile", help=help_profile, nargs="?",
+                        const="all", default=None, metavar="SPECIES",
+                        required=False)
+    help_density_window = """Size (in bp) of the windows of the TE density
+    files. For each species, the number of repeats and base pairs of each
+    category (at the selected depth) in consecutive windows along every
+    sequence are saved in <depth>_density_<size>/<species directory>.npz.
+    Several sizes can be given (e.g. 100000 1000000)"""
+    parser.add_argument("--density-window", help=help_density_window, type=int,
+                        nargs="+", default=None, metavar="BP", required=False)
+    help_landscape = """Save the divergence landscape of the run: the number
+    of repeats of each species and category (at the selected depth) in bins
+    of divergence of the given width (1%% by default, from 0 to 100%%), as an
+    int32 species x category x bin array in <output>_<depth>_landscape_<log
+    number>.npz. It is computed while the divergence files are created"""
+    parser.add_argument("--landscape", help=help_landscape, type=float, nargs="?",
+                        const=1.0, default=None, metavar="WIDTH", required=False)
+    help_interval_index = """Save an index of the positions of the repeats
+    of each species (after filtering) in the interval_index folder of the
+    output, so the repeats of any region can be found with
+    'RECollector.py query' without reading the RM and TES files again"""
+    parser.add_argument("--interval-index", help=help_interval_index,
+                        action="store_true", required=False)
+    help_resume = """Resume an interrupted run in the same output folder.
+    Species recorded in its checkpoint (RECollector_checkpoint.json)
+    are not processed again, and divergence data of species that were
+    not completed is removed. The other options must be the same
+    as in the interrupted run"""
+    parser.add_argument("--resume", help=help_resume,
+                        action="store_true", required=False)
+
+    if command == "map":
+        shard_group = parser.add_argument_group("Shards")
+        help_shard = """Shard to process, as K/N: shard K (from 0 to N-1)
+        of N. With a SLURM array, use $SLURM_ARRAY_TASK_ID/N"""
+        shard_group.add_argument("--shard", help=help_shard, type=parse_shard,
+                                 required=True)
+        help_partition = """How species directories are assigned to shards:
+        'index' splits the directories of the names file (sorted by name)
+        in N consecutive ranges, 'hash' assigns each directory by a hash
+        of its name. Default index"""
+        shard_group.add_argument("--partition", help=help_partition,
+                                 choices=["index", "hash"], default="index")
+
+    return parser
 
+def reduce_argument_parser():
+    desc = """Merge the output folders of the shards of a RECollector
+    analysis ('RECollector.py map') into the TE count matrix, the file
+    of processed species and the divergence files of a single run."""
+    parser = argparse.ArgumentParser(prog="RECollector.py reduce", description=desc)
+    help_shards = """Output folders of the shards (or of partial reduces)"""
+    parser.add_argument("shards", help=help_shards, type=Path, nargs="+")
+    help_partial = """Merge the shards even if some shards of the partition
+    are missing. The output records the shards it contains, so it can
+    be reduced later with the output of the rest of the shards"""
+    parser.add_argument("--partial", help=help_partial,
+                        action="store_true", required=False)
+    help_output = """Output folder path"""
+    parser.add_argument("--output", "-o", help=help_output,
+                        type=Path, required=True)
+    return parser
+
+def query_argument_parser():
+    desc = """Find the repeats of the species of RECollector outputs
+    (created with --interval-index) that overlap some regions, or that
+    are the closest to them. Coordinates are those of RepeatMasker
+    (1-based, both ends included)."""
+    parser = argparse.ArgumentParser(prog="RECollector.py query", description=desc)
+    help_outputs = """Output folders of RECollector (or of its reduce command)"""
+    parser.add_argument("outputs", help=help_outputs, type=Path, nargs="+")
+    help_region = """Regions to query, as seqid:start-end or seqid:position
+    (e.g. chr3:1200000-1800000)"""
+    parser.add_argument("--region", "-r", help=help_region, type=parse_region,
+                        nargs="+", required=True)
+    help_nearest = """Return the closest repeats to each region
+    (with their distance) instead of the overlapping ones"""
+    parser.add_argument("--nearest", help=help_nearest,
+                        action="store_true", required=False)
+    help_counts = """Instead of the repeats, write a TE count matrix
+    of the repeats found in the regions at the given depth"""
+    depth_choices = ["class","subclass", "superfamily", "element",
+                     "tes_order", "tes_superfamily", "clade"]
+    parser.add_argument("--counts", help=help_counts, choices=depth_choices,
+                        type=str.lower, default=None, required=False)
+    help_output = """Output .csv file. By default, the result is
+    written to the standard output"""
+    parser.add_argument("--output", "-o", help=help_output,
+                        type=Path, default=None, required=False)
     return parser
 
 def get_options():
-    parser = argument_parser()
-    return parser.parse_args()
+    command = sys.argv[1] if sys.argv[1:2] in (["map"], ["reduce"], ["query"]) else None
+    if command == "reduce":
+        arguments = reduce_argument_parser().parse_args(sys.argv[2:])
+    elif command == "query":
+        arguments = query_argument_parser().parse_args(sys.argv[2:])
+    else:
+        parser = argument_parser(command)
+        arguments = parser.parse_args(sys.argv[2:] if command == "map" else None)
+        if arguments.resolve_fragments and (arguments.measure in ["merged_bp", "genome_fraction"]
+                                            or arguments.density_window):
+            parser.error("--resolve-fragments cannot be used with the merged_bp and "
+                         "genome_fraction measures or with --density-window")
+        if arguments.div_sample is not None and arguments.div_sample < 1:
+            parser.error("--div-sample must be a positive number of repeats")
+        if arguments.chromosome_regex:
+            for pattern in (arguments.chromosomes or []) + (arguments.exclude_chromosomes or []):
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    parser.error(f"Invalid regular expression {pattern}: {e}")
+    arguments.command = command
+    return arguments
+
+def reduce_main(arguments):
+    from src.checkpoint import CHECKPOINT_FNAME, RunCheckpoint
+    from src.create_matrix import MEASURE_DTYPES, create_te_count_matrix
+    from src.density import get_density_folder_name
+    from src.interval_index import INDEX_DIRNAME
+    from src.landscape import get_landscape_folder_name, write_species_landscapes
+    from src.shards import copy_species_outputs, merge_divergence_files, read_shards
+
+    out_folder = arguments.output
+    if not out_folder.exists():
+        out_folder.mkdir()
+
+    log_number = uuid1()
+    log_fhand = open(out_folder / f"RECollector.{log_number}.log", "w")
+    msg = f"Command used: {' '.join(sys.argv)}\n"
+    msg += f"Shards: {', '.join(str(shard_dir.resolve()) for shard_dir in arguments.shards)}\n"
+    msg += f"Output directory: {out_folder.resolve()}\n"
+    print(msg)
+    log_fhand.write(msg)
+    log_fhand.flush()
+
+    try:
+        settings, shard_species = read_shards(arguments.shards, arguments.partial)
+    except ValueError as e:
+        msg = f"{e}\n"
+        print(msg)
+        log_fhand.write(msg)
+        log_fhand.close()
+        sys.exit(1)
+    depth = settings["depth"]
+    measure = settings.get("measure", "count")
+    msg = f"Species in the shards: {len(shard_species)}\n"
+    if "shard" in settings:
+        msg += f"Partial output with shards {settings['shard']}\n"
+    print(msg)
+    log_fhand.write(msg)
+    log_fhand.flush()
+
+    div_folder = out_folder.joinpath(f"{depth}_divergence_files")
+    if not div_folder.exists():
+        div_folder.mkdir()
+    div_fpaths, merged_species = merge_divergence_files(shard_species, depth, div_folder)
+    msg = f"{'-'*10} {len(div_fpaths)} divergence files created at {div_folder.resolve()} {'-'*10}\n"
+    print(msg)
+    log_fhand.write(msg)
+    if settings.get("interval_index"):
+        n_copied = copy_species_outputs(shard_species, out_folder, INDEX_DIRNAME)
+        msg = f"Interval indexes copied: {n_copied}\n"
+        print(msg)
+        log_fhand.write(msg)
+    for window_size in settings.get("density_window") or []:
+        n_copied = copy_species_outputs(shard_species, out_folder,
+                                        get_density_folder_name(depth, window_size), ".npz")
+        msg = f"Density files of {window_size} bp windows copied: {n_copied}\n"
+        print(msg)
+        log_fhand.write(msg)
+
+    #The merged output has its own checkpoint, so it can
+    #be merged again with other outputs
+    checkpoint = RunCheckpoint(out_folder / CHECKPOINT_FNAME, settings, div_folder)
+    checkpoint.species = merged_species
+    checkpoint.planned = [species["dir"] for species in merged_species]
+    checkpoint.div_sizes = {div_fpath.name: div_fpath.stat().st_size for div_fpath in div_fpaths}
+    checkpoint.save()
+    te_count_matrix = create_te_count_matrix(checkpoint.get_counted_tes(),
+                                             MEASURE_DTYPES[measure])
+    c_matrix_fpath = out_folder.joinpath(f"{out_folder.name}_{depth}_{measure}_matrix_{log_number}.csv")
+    te_count_matrix.to_csv(c_matrix_fpath, index_label=depth)
+    msg = f"{'-'*10} TE count matrix file created at {c_matrix_fpath.resolve()} {'-'*10}\n"
+    print(msg)
+    log_fhand.write(msg)
+
+    if settings.get("landscape"):
+        landscape_folder_name = get_landscape_folder_name(depth)
+        copy_species_outputs(shard_species, out_folder, landscape_folder_name, ".npz")
+        landscape_fpath = out_folder.joinpath(f"{out_folder.name}_{depth}_landscape_{log_number}.npz")
+        write_species_landscapes(merged_species, out_folder / landscape_folder_name, landscape_fpath)
+        msg = f"{'-'*10} Divergence landscape file created at {landscape_fpath.resolve()} {'-'*10}\n"
+        print(msg)
+        log_fhand.write(msg)
+
+    processed_fpath = out_folder.joinpath(f"RECollector_processed_species_{log_number}.txt")
+    with open(processed_fpath, "w") as proc_file:
+        for species in shard_species:
+            proc_file.write("\t".join([species["name"], species["name"]]) + "\n")
+        msg = f"{'-'*10} Created file for processed species at {processed_fpath.resolve()} {'-'*10}"
+        print(msg)
+        log_fhand.write(msg)
+    log_fhand.close()
+
+def query_main(arguments):
+    from src.interval_index import find_index_dirs, query_indexes
+
+    index_dirs = find_index_dirs(arguments.outputs)
+    if not index_dirs:
+        print("No interval indexes were found (run RECollector with --interval-index)",
+              file=sys.stderr)
+        sys.exit(1)
+
+    query_start = time.perf_counter()
+    hits = query_indexes(index_dirs, arguments.region, arguments.nearest,
+                         arguments.counts)
+    output = arguments.output if arguments.output is not None else sys.stdout
+    if arguments.counts:
+        hits.to_csv(output, index_label=arguments.counts)
+    else:
+        hits.to_csv(output, index=False)
+    msg = f"Queried {len(arguments.region)} region(s) in {len(index_dirs)} species "
+    msg += f"in {time.perf_counter() - query_start:.3f} s"
+    print(msg, file=sys.stderr)
 
 def main():
     arguments = get_options()
+    if arguments.command == "reduce":
+        reduce_main(arguments)
+        return
+    if arguments.command == "query":
+        query_main(arguments)
+        return
+    #Processing modules (pandas, matplotlib...) are imported after
+    #parsing the arguments, so --help and argument errors are fast
+    from src.checkpoint import CHECKPOINT_FNAME, RunCheckpoint
+    from src.compression import CSV_COMPRESSIONS, get_compression, open_input
+    from src.create_matrix import (MEASURE_DTYPES,
+                                   create_te_count_matrix,
+                                   count_tes,
+                                   get_seqid_filter,
+                                   filter_df_by_domain,
+                                   filter_df_by_length,
+                                   filter_df_by_percentages)
+    from src.fragments import resolve_fragments
+    from src.read_input import (get_sequence_lengths, merge_inputs,
+                                read_repeatmasker_out, read_tesorter_cls_tsv)
+    from src.density import (compute_window_density, get_density_folder_name,
+                             save_window_density)
+    from src.interval_index import INDEX_DIRNAME, IntervalIndex
+    from src.landscape import (compute_landscape, get_landscape_folder_name,
+                               save_landscape, write_species_landscapes)
+    from src.manifest import scan_input_dir, write_manifest
+    from src.pipeline import (BackgroundWriter, PipelineError, Prefetcher,
+                              StageClock, format_utilization)
+    from src.profiling import RunProfiler, save_profile
+    from src.shards import select_shard_species
+    from src.stage_stats import StageStats
+    from src.utils import (convert_data_to_long_df_div, read_doms_file,
+                           read_names_file, sample_div_data)
+
     depth = arguments.depth
     override = arguments.override
+    measure = arguments.measure
+    density_windows = arguments.density_window or []
+    #Measures of covered base pairs, densities and the
+    #interval index need the coordinates of the repeats
+    needs_coords = (measure in ["merged_bp", "genome_fraction"] or bool(density_windows)
+                    or arguments.interval_index)
+    #Fragments are combined by their sequence and position
+    keep_coords = needs_coords or arguments.resolve_fragments
+    #The length of the sequences is needed for the genome
+    #fraction and to know the windows of each sequence
+    query_left = measure == "genome_fraction" or bool(density_windows)
+    seqid_filter = get_seqid_filter(arguments.chromosomes, arguments.exclude_chromosomes,
+                                    arguments.chromosome_regex)
 
     root_dir = arguments.input
 
@@ -129,6 +513,27 @@ def main():
     log_fhand.write(msg)
     log_fhand.flush()
 
+    if arguments.stats:
+        stats_fpath = out_folder / f"RECollector_stats_{log_number}.jsonl"
+        stage_stats = StageStats(stats_fpath, log_fhand)
+        msg = f"Stage statistics file: {stats_fpath.resolve()}\n"
+        print(msg)
+        log_fhand.write(msg)
+        log_fhand.flush()
+    else:
+        stage_stats = StageStats()
+
+    if arguments.profile:
+        profile_scope = None if arguments.profile == "all" else arguments.profile
+        profiler = RunProfiler(out_folder / f"RECollector_profile_{log_number}",
+                               profile_scope)
+        msg = f"Profiled species: {arguments.profile}\n"
+        print(msg)
+        log_fhand.write(msg)
+        log_fhand.flush()
+    else:
+        profiler = RunProfiler()
+
     div_folder = out_folder.joinpath(f"{depth}_divergence_files")
     if not div_folder.exists():
         div_folder.mkdir()
@@ -137,6 +542,19 @@ def main():
         log_fhand.write(msg)
         log_fhand.flush()
 
+    if arguments.div_compression:
+        div_compression = CSV_COMPRESSIONS[arguments.div_compression]
+        div_suffix = f".{arguments.div_compression}"
+    else:
+        div_compression = None
+        div_suffix = ""
+
+    if arguments.div_sample:
+        msg = f"Divergence files will keep up to {arguments.div_sample} repeats of each species and category\n"
+        print(msg)
+        log_fhand.write(msg)
+        log_fhand.flush()
+
     names_file = arguments.names
     with open(names_file) as names:
         filehand_species = read_names_file(names)
@@ -146,6 +564,16 @@ def main():
         log_fhand.write(msg)
         log_fhand.flush()
 
+    if arguments.command == "map":
+        shard_index, n_shards = arguments.shard
+        filehand_species = select_shard_species(filehand_species, shard_index,
+                                                n_shards, arguments.partition)
+        msg = f"Shard {shard_index}/{n_shards} ({arguments.partition} partition): "
+        msg += f"{len(filehand_species)} species directories\n"
+        print(msg)
+        log_fhand.write(msg)
+        log_fhand.flush()
+
     if arguments.domains:
         if arguments.D:
             with open(arguments.D) as doms_file:
@@ -180,61 +608,15 @@ def main():
     msg = f"{'-'*10} Checking each species directory {'-'*10}\n"
     print(msg)
     log_fhand.write(msg)
-    ignored_dirs = []
-    failed_dirs = []
-
-    for dir_object in sorted(root_dir.iterdir()):
-        if not dir_object.is_dir():
-            continue
-        if dir_object.name not in filehand_species:
-            ignored_dirs.append(dir_object.name)
-            continue
-
-        species = dir_object.name
-        rm_file = list(dir_object.glob(f"*.out"))
-        te_file = list(dir_object.glob(f"*.cls.tsv"))
-
-        #Check that each species contains both files
-        if len(rm_file) != 1:
-            msg = f"{species}: RepeatMasker file was not found/file must end in .out and be the only one\n"
-            print(msg)
-            log_fhand.write(msg)
-            failed_dirs.append(msg)
-            filehand_species.pop(dir_object.name)
-            continue
-
-        if len(te_file) != 1:
-            msg = f"{species}: TESorter file was not found/file must end in .cls.tsv and be the only one\n"
-            print(msg)
-            log_fhand.write(msg)
-            failed_dirs.append(msg)
-            filehand_species.pop(dir_object.name)
-            continue
-
-        #Check that those files are not empty and contain at least one read
-        with open(rm_file[0]) as rm_fhand:
-            try:
-                for i in range(4):
-                    next(rm_fhand)
-            except Exception as e:
-                msg = f"{species}: RepeatMasker file was empty\n"
-                print(msg)
-                log_fhand.write(msg)
-                failed_dirs.append(msg)
-                filehand_species.pop(dir_object.name)                
-                continue
-
-        with open(te_file[0]) as te_fhand:
-            try:
-                for i in range(2):
-                    next(te_fhand)
-            except Exception as e:
-                msg = f"{species}: TESorter file was empty\n"
-                print(msg)
-                log_fhand.write(msg)
-                failed_dirs.append(msg)
-                filehand_species.pop(dir_object.name)
-                continue
+    manifest, ignored_dirs, failed_dirs = scan_input_dir(root_dir, filehand_species)
+    for msg in failed_dirs:
+        print(msg)
+        log_fhand.write(msg)
+    manifest_fpath = out_folder / f"RECollector_manifest_{log_number}.tsv"
+    write_manifest(manifest, manifest_fpath)
+    msg = f"Manifest of the processed files: {manifest_fpath.resolve()}\n"
+    print(msg)
+    log_fhand.write(msg)
 
     msg = f"{'*'*30}\n"
     msg += f"Directories ignored by RECollector:\n"
@@ -247,101 +629,300 @@ def main():
     msg = f"{'*'*30}\n"
     msg += f"Directories processed by RECollector:\n"
     log_fhand.write(msg)
-    log_fhand.write("\n".join(list(filehand_species.keys())) + "\n")
+    log_fhand.write("\n".join(species_files.dir_name for species_files in manifest) + "\n")
     log_fhand.write(f"{'-'*30}\n")
     log_fhand.flush()
 
-    species_counted_tes = []
-    processed_species = []
-    for dir_object in sorted(root_dir.iterdir()):
+    checkpoint_fpath = out_folder / CHECKPOINT_FNAME
+    settings = {"input": str(root_dir.resolve()), "depth": depth,
+                "override": override, "length": arguments.length,
+                "domains": arguments.domains, "D": str(arguments.D),
+                "per": arguments.per, "t": str(arguments.t),
+                "m": str(arguments.m),
+                "div_compression": arguments.div_compression,
+                "div_sample": arguments.div_sample,
+                "measure": measure,
+                "resolve_fragments": arguments.resolve_fragments,
+                "chromosomes": arguments.chromosomes,
+                "exclude_chromosomes": arguments.exclude_chromosomes,
+                "chromosome_regex": arguments.chromosome_regex,
+                "interval_index": arguments.interval_index,
+                "density_window": arguments.density_window,
+                "landscape": arguments.landscape}
+    if arguments.command == "map":
+        settings["shard"] = f"{arguments.shard[0]}/{arguments.shard[1]} {arguments.partition}"
+    if arguments.resume and checkpoint_fpath.exists():
         try:
-            if dir_object.name not in filehand_species:
-                continue
-            species = filehand_species[dir_object.name]
-            processed_species.append(species)
-
-            print(f"{'-'*10} Collecting data for {species} {'-'*10}")
-            rm_file = list(dir_object.glob(f"*.out"))
-            te_file = list(dir_object.glob(f"*.cls.tsv"))
-
-            with open(rm_file[0]) as rm_fhand:
-                print(f"Reading {rm_file[0].name}")
-                rm_repeats = read_repeatmasker_out(rm_fhand)
-                print(f"Read {rm_file[0].name}")
-            with open(te_file[0]) as te_fhand:
-                print(f"Reading {te_file[0].name}")    
-                te_repeats = read_tesorter_cls_tsv(te_fhand)
-                print(f"Read {te_file[0].name}")
-
-            species_df = merge_inputs(rm_repeats, te_repeats, override)
-            print("Merged input files into a dataframe")
-
-            del rm_repeats, te_repeats
-
-            if arguments.length:
-                print("Started filtering by length")
-                length = arguments.length
+            checkpoint = RunCheckpoint.load(checkpoint_fpath, settings, div_folder)
+        except ValueError as e:
+            msg = f"{e}\n"
+            print(msg)
+            log_fhand.write(msg)
+            log_fhand.close()
+            sys.exit(1)
+        restored_fnames = checkpoint.restore_divergence_files()
+        species_counted_tes = checkpoint.get_counted_tes()
+        processed_species = [species["name"] for species in checkpoint.species]
+        msg = f"{'-'*10} Resuming from {checkpoint_fpath.resolve()} {'-'*10}\n"
+        msg += f"Species already processed: {', '.join(processed_species)}\n"
+        msg += f"Divergence files restored: {', '.join(restored_fnames)}\n"
+        print(msg)
+        log_fhand.write(msg)
+        log_fhand.flush()
+    else:
+        if arguments.resume:
+            msg = f"No checkpoint was found in {out_folder.resolve()}, all species will be processed\n"
+            print(msg)
+            log_fhand.write(msg)
+            log_fhand.flush()
+        checkpoint = RunCheckpoint(checkpoint_fpath, settings, div_folder)
+        species_counted_tes = []
+        processed_species = []
+
+    checkpoint.planned = [species_files.dir_name for species_files in manifest]
+    checkpoint.save()
+
+    landscape_folder = out_folder / get_landscape_folder_name(depth)
+    if arguments.landscape:
+        landscape_folder.mkdir(exist_ok=True)
+
+    def read_species(species_files):
+        """Reads the RM and TES files of a species (run by the reader thread).
+
+        Returns both tables and the length of each sequence
+        (only when the measure or the densities need it).
+        """
+        species = species_files.species
+        rm_file = species_files.rm_path
+        te_file = species_files.te_path
+        with stage_stats.stage(species, "read_repeatmasker_out") as stage:
+            print(f"Reading {rm_file.name}")
+            with open_input(rm_file) as rm_fhand:
+                rm_repeats = read_repeatmasker_out(rm_fhand, query_left,
+                                                   arguments.resolve_fragments, seqid_filter,
+                                                   arguments.mmap and get_compression(rm_file) is None)
+            stage.rows_out = len(rm_repeats)
+            seq_lengths = None
+            if query_left:
+                seq_lengths = get_sequence_lengths(rm_repeats)
+                rm_repeats.drop("q left", inplace=True, axis=1)
+            print(f"Read {rm_file.name}")
+        with open_input(te_file) as te_fhand, stage_stats.stage(species, "read_tesorter_cls_tsv") as stage:
+            print(f"Reading {te_file.name}")    
+            #Both tables share the dictionary of sequences
+            te_repeats = read_tesorter_cls_tsv(te_fhand, rm_repeats["seqid"].cat.categories)
+            stage.rows_out = len(te_repeats)
+            print(f"Read {te_file.name}")
+        return rm_repeats, te_repeats, seq_lengths
+
+    def write_species(species, dir_name, counted_tes, div_partitions, species_outputs):
+        """Writes the data of a species and commits it (run by the writer thread).
+
+        `species_outputs` are the jobs (function and arguments) that save
+        the optional outputs (indexes, densities...) of the species.
+        """
+        with stage_stats.stage(species, "species_outputs") as stage:
+            for save, *save_args in species_outputs:
+                save(*save_args)
+            stage.rows_out = len(species_outputs)
+        with stage_stats.stage(species, "divergence_files") as stage:
+            stage.rows_out = 0
+            div_fpaths = []
+            div_ranges = {}
+            for cat, long_df_div in div_partitions:
+                stage.rows_out += len(long_df_div)
+                div_csv_fpath = div_folder.joinpath(f"{cat}_divergence.csv{div_suffix}")
+                div_fpaths.append(div_csv_fpath)
+                #The header is written on its own, so the rows of each
+                #species can be copied from the file (see src.shards)
+                if not div_csv_fpath.exists():
+                    long_df_div.head(0).to_csv(div_csv_fpath, index=False,
+                                               compression=div_compression)
+                    print(f"{cat.capitalize()} divergence data file created")
+                else:
+                    print(f"{cat.capitalize()} divergence data file updated")
+                start = div_csv_fpath.stat().st_size
+                long_df_div.to_csv(div_csv_fpath, mode="a",
+                                    index=False, header=False,
+                                    chunksize=100000,
+                                    compression=div_compression)
+                div_ranges[div_csv_fpath.name] = [start, div_csv_fpath.stat().st_size]
+        checkpoint.commit(species, dir_name, counted_tes, div_fpaths, div_ranges)
+
+    def process_species(species, dir_name, rm_repeats, te_repeats, seq_lengths):
+        """Merges, filters and counts the repeats of a species (run by the main thread).
+
+        Returns the TE counts, the divergence data of each category
+        and the jobs that save the optional outputs of the species
+        (see `write_species`).
+        """
+        with stage_stats.stage(species, "merge_inputs", len(rm_repeats)) as stage:
+            species_df = merge_inputs(rm_repeats, te_repeats, override, keep_coords)
+            stage.rows_out = len(species_df)
+        print("Merged input files into a dataframe")
+
+        del rm_repeats, te_repeats
+
+        if arguments.resolve_fragments:
+            print("Started resolving fragments")
+            with stage_stats.stage(species, "resolve_fragments", len(species_df)) as stage:
+                species_df = resolve_fragments(species_df)
+                if not needs_coords:
+                    species_df.drop(["seqid", "start", "end"], inplace=True, axis=1)
+                stage.rows_out = len(species_df)
+            print("Finished resolving fragments")
+
+        if arguments.length:
+            print("Started filtering by length")
+            length = arguments.length
+            with stage_stats.stage(species, "filter_df_by_length", len(species_df)) as stage:
                 species_df = filter_df_by_length(species_df, length)
-                print("Finished filtering by length")
+                stage.rows_out = len(species_df)
+            print("Finished filtering by length")
 
-            if arguments.domains:
-                print("Started filtering by domains")
+        if arguments.domains:
+            print("Started filtering by domains")
+            with stage_stats.stage(species, "filter_df_by_domain", len(species_df)) as stage:
                 species_df = filter_df_by_domain(species_df,
                                                 domains, clades,
                                                 features_dict)
-                print("Finished filtering by domains")
+                stage.rows_out = len(species_df)
+            print("Finished filtering by domains")
 
-            if arguments.per:
-                print("Started filtering by percentage")
+        if arguments.per:
+            print("Started filtering by percentage")
+            with stage_stats.stage(species, "filter_df_by_percentages", len(species_df)) as stage:
                 species_df = filter_df_by_percentages(species_df,
                                                     threshold,
                                                     perc_mode)
-                print("Finished filtering by percentage")
-
-            print(f"Counting TEs for {depth}")
-            counted_tes = count_tes(species_df, species, depth)
-            species_counted_tes.append(counted_tes)
-            print(f"Counted TEs for {depth}")
-            
-            print(f"{'*'*5} Creating {depth} divergence data file(s) {'*'*5}") 
+                stage.rows_out = len(species_df)
+            print("Finished filtering by percentage")
+
+        print(f"Counting TEs for {depth} ({measure})")
+        with stage_stats.stage(species, "count_tes", len(species_df)) as stage:
+            genome_size = int(seq_lengths.sum()) if seq_lengths is not None else None
+            counted_tes = count_tes(species_df, species, depth, measure, genome_size)
+            stage.rows_out = len(counted_tes)
+        print(f"Counted TEs for {depth}")
+
+        print(f"{'*'*5} Creating {depth} divergence data file(s) {'*'*5}") 
+        with stage_stats.stage(species, "divergence_data", len(species_df)) as stage:
+            div_partitions = []
             depth_cats = species_df[depth].unique()   
             for cat in depth_cats:
                 cat_df = species_df.loc[species_df[depth] == cat]
                 long_df_div = convert_data_to_long_df_div(cat_df, species, depth)
-                div_csv_fpath = div_folder.joinpath(f"{cat}_divergence.csv")
-                if not div_csv_fpath.exists():
-                    long_df_div.to_csv(div_csv_fpath, index=False,
-                                        chunksize=100000)
-                    print(f"{cat.capitalize()} divergence data file created")
-
-                else:
-                    long_df_div.to_csv(div_csv_fpath, mode="a",
-                                        index=False, header=False,
-                                        chunksize=100000)
-                    print(f"{cat.capitalize()} divergence data file updated")
+                if arguments.div_sample:
+                    long_df_div = sample_div_data(long_df_div, depth, arguments.div_sample)
+                div_partitions.append((cat, long_df_div))
+            stage.rows_out = sum(len(long_df_div) for _, long_df_div in div_partitions)
+            species_outputs = []
+            if arguments.landscape:
+                landscape = compute_landscape(species_df, depth, arguments.landscape)
+                species_outputs.append((save_landscape, landscape_folder / f"{dir_name}.npz",
+                                        landscape))
+
+        if arguments.interval_index:
+            with stage_stats.stage(species, "interval_index", len(species_df)) as stage:
+                interval_index = IntervalIndex.from_dataframe(species_df, species)
+                stage.rows_out = len(interval_index)
+            species_outputs.append((interval_index.save, out_folder / INDEX_DIRNAME / dir_name))
+            print("Created interval index")
+
+        for window_size in density_windows:
+            with stage_stats.stage(species, "window_density", len(species_df)) as stage:
+                density = compute_window_density(species_df, depth, window_size, seq_lengths)
+                stage.rows_out = len(density["counts"])
+            density_folder = out_folder / get_density_folder_name(depth, window_size)
+            density_folder.mkdir(exist_ok=True)
+            species_outputs.append((save_window_density, density_folder / f"{dir_name}.npz",
+                                    density))
+            print(f"Computed TE density in {window_size} bp windows")
+
+        return counted_tes, div_partitions, species_outputs
+
+    #The next species is read by a thread while the current one is
+    #processed, and its divergence data is written by another thread.
+    #Queues hold up to --prefetch species, which caps the memory used
+    pending_species = [species_files for species_files in manifest
+                       if not checkpoint.is_committed(species_files.dir_name)]
+    compute_clock = StageClock("compute")
+    reader = Prefetcher(pending_species, read_species, arguments.prefetch,
+                        consumer_clock=compute_clock,
+                        describe=lambda species_files: species_files.species)
+    writer = BackgroundWriter(arguments.prefetch)
+    pipeline_start = time.perf_counter()
+    species = None
+    try:
+        for species_files, (rm_repeats, te_repeats, seq_lengths) in reader:
+            dir_name = species_files.dir_name
+            species = species_files.species
+            processed_species.append(species)
+            profiler.start(species, dir_name)
 
-            del species_df, long_df_div
-            gc.collect()
-        except Exception as e:
-            msg = f"{'*'*10} An error occurred while processing {species}. See traceback below {'*'*10}\n"
-            print(msg)
-            log_fhand.write(msg)
-            log_fhand.write(traceback.format_exc())
-            log_fhand.close()
-            raise
+            print(f"{'-'*10} Collecting data for {species} {'-'*10}")
+            with compute_clock.busy():
+                counted_tes, div_partitions, species_outputs = process_species(species, dir_name,
+                                                                               rm_repeats, te_repeats,
+                                                                               seq_lengths)
+                del rm_repeats, te_repeats
+                species_counted_tes.append(counted_tes)
+                gc.collect()
+            profiler.stop()
+
+            with compute_clock.waiting():
+                writer.submit(species, write_species, species, dir_name,
+                              counted_tes, div_partitions, species_outputs)
+            del div_partitions, species_outputs
+        writer.close()
+    except Exception as e:
+        if isinstance(e, PipelineError):
+            #Species whose files were being read or written
+            species = e.name
+        msg = f"{'*'*10} An error occurred while processing {species}. See traceback below {'*'*10}\n"
+        print(msg)
+        log_fhand.write(msg)
+        log_fhand.write(traceback.format_exc())
+        #Species whose data was already computed are still
+        #written and committed, so a run can be resumed after them
+        reader.close()
+        try:
+            writer.close()
+        except PipelineError:
+            pass
+        save_profile(profiler, log_fhand)
+        log_fhand.close()
+        stage_stats.close()
+        raise
+
+    msg = f"{'-'*10} Pipeline utilization {'-'*10}\n"
+    msg += format_utilization([reader.clock, compute_clock, writer.clock],
+                              time.perf_counter() - pipeline_start)
+    print(msg)
+    log_fhand.write(msg)
+    log_fhand.flush()
 
     print(f"{'-'*10} Performed operations for all accepted species {'-'*10}")
     print("Creating TE count matrix")
-    te_count_matrix = create_te_count_matrix(species_counted_tes)
+    with profiler.section("count_matrix"):
+        te_count_matrix = create_te_count_matrix(species_counted_tes,
+                                                 MEASURE_DTYPES[measure])
     print("TE count matrix created")
 
-    c_matrix_fpath = out_folder.joinpath(f"{out_folder.name}_{depth}_count_matrix_{log_number}.csv")
+    c_matrix_fpath = out_folder.joinpath(f"{out_folder.name}_{depth}_{measure}_matrix_{log_number}.csv")
 
     te_count_matrix.to_csv(c_matrix_fpath, index_label=depth)
     msg = f"{'-'*10} TE count matrix file created at {c_matrix_fpath.resolve()} {'-'*10}\n"
     print(msg)
     log_fhand.write(msg)
 
+    if arguments.landscape:
+        landscape_fpath = out_folder.joinpath(f"{out_folder.name}_{depth}_landscape_{log_number}.npz")
+        write_species_landscapes(checkpoint.species, landscape_folder, landscape_fpath)
+        msg = f"{'-'*10} Divergence landscape file created at {landscape_fpath.resolve()} {'-'*10}\n"
+        print(msg)
+        log_fhand.write(msg)
+
     processed_fpath = out_folder.joinpath(f"RECollector_processed_species_{log_number}.txt")
     with open(processed_fpath, "w") as proc_file:
         for species in processed_species:
@@ -349,7 +930,9 @@ def main():
         msg = f"{'-'*10} Created file for processed species at {processed_fpath.resolve()} {'-'*10}"
         print(msg)
         log_fhand.write(msg)
+    save_profile(profiler, log_fhand)
     log_fhand.close()
+    stage_stats.close()
 
 if __name__ == "__main__":
     main()
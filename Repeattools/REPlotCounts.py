@@ -4,10 +4,6 @@ import traceback
 from uuid import uuid1
 from pathlib import Path
 
-from src.generate_plots import (get_count_matrix_heatmap,
-                                get_count_matrix_pca)
-from src.utils import read_names_file, get_large_dfs
-
 def argument_parser():
     desc = """Generates plots based on RECollector's TE count
     matrix output. It generates a PCA and a heatmap
@@ -57,9 +53,37 @@ def argument_parser():
     parser.add_argument("--hsize", "-s", type=int, nargs=2, 
                         help=help_figure_size, required=False,
                         default=[15, 15])
+    help_heatmap_mode = """How the heatmap is drawn: 'mesh' draws each
+    cell separately (seaborn clustermap); 'raster' draws the whole
+    matrix as an image, which is much faster for thousands of species.
+    Default: auto (raster for matrices larger than 250000 cells)"""
+    parser.add_argument("--hmode", help=help_heatmap_mode,
+                        choices=["auto", "mesh", "raster"],
+                        default="auto", required=False)
+    help_pca_solver = """Solver for the PCA: 'auto' (scikit-learn default),
+    'randomized' (randomized SVD, faster for wide matrices, e.g.
+    element depth) or 'incremental' (fits the PCA in batches of species
+    for matrices that do not fit in memory). Default: auto"""
+    parser.add_argument("--pca", help=help_pca_solver,
+                        choices=["auto", "randomized", "incremental"],
+                        default="auto", required=False)
+    help_cache = """Folder where computed PCA results and heatmap
+    clusterings are saved, so that they are not computed again for
+    the same matrix. Default: 'cache' folder inside the output folder"""
+    parser.add_argument("--cache", type=Path, help=help_cache,
+                        required=False)
     help_output_folder = """Output folder for the heatmap and the PCA"""
     parser.add_argument("--output", "-o", type=Path,
                         help=help_output_folder, required=True)
+    help_profile = """Profile the run with cProfile and a stack sampler.
+    The profile is saved to REPlotCounts_profile_<log number>.pstats
+    (pstats dump) and REPlotCounts_profile_<log number>.collapsed
+    (collapsed stacks for flamegraph.pl or speedscope) in the output
+    folder. Optionally, 'heatmap' or 'pca' can be given to profile
+    only that plot"""
+    parser.add_argument("--profile", help=help_profile, nargs="?",
+                        choices=["all", "heatmap", "pca"], const="all",
+                        default=None, required=False)
 
     return parser
 
@@ -69,13 +93,23 @@ def get_options():
 
 def main():
     arguments = get_options()
+    #Processing modules (pandas, matplotlib...) are imported after
+    #parsing the arguments, so --help and argument errors are fast
+    from src.generate_plots import (get_count_matrix_heatmap,
+                                    get_count_matrix_pca)
+    from src.profiling import RunProfiler, save_profile
+    from src.utils import read_names_file, get_large_dfs
+
     matrix_fpath = arguments.input
     exclude = arguments.exclude
     dendro = arguments.dendro
     show_names = arguments.names
     group_fpath = arguments.gfile
     hsize = tuple(arguments.hsize)
+    hmode = arguments.hmode
     out_folder = arguments.output
+    pca_solver = arguments.pca
+    cache_dir = arguments.cache or out_folder / "cache"
 
     if not out_folder.exists():
         out_folder.mkdir()
@@ -90,6 +124,13 @@ def main():
     log_fhand.write(msg)
     log_fhand.flush()
 
+    if arguments.profile:
+        profile_scope = None if arguments.profile == "all" else arguments.profile
+        profiler = RunProfiler(out_folder / f"REPlotCounts_profile_{log_number}",
+                               profile_scope)
+    else:
+        profiler = RunProfiler()
+
     out_heatmap = out_folder / f"Heatmap_{log_number}.png"
     out_pca = out_folder / f"PCA_{log_number}.png"
 
@@ -112,20 +153,27 @@ def main():
             print(msg)
             log_fhand.write(msg)
             log_fhand.flush()
-            get_count_matrix_heatmap(matrix_df, out_heatmap,
-                                    group_dict, hsize, dendro=dendro)
+            with profiler.section("heatmap"):
+                get_count_matrix_heatmap(matrix_df, out_heatmap,
+                                        group_dict, hsize, dendro=dendro,
+                                        mode=hmode, cache_dir=cache_dir)
             print("Generated heatmap")
             msg = f"Heatmap created at: {out_heatmap.resolve()}\n"
             print(msg)
             log_fhand.write(msg)
             log_fhand.flush()
-            get_count_matrix_pca(matrix_df, out_pca,
-                                group_dict, show_names=show_names)
+            with profiler.section("pca"):
+                get_count_matrix_pca(matrix_df, out_pca,
+                                    group_dict, show_names=show_names,
+                                    solver=pca_solver, cache_dir=cache_dir,
+                                    out_csv_prefix=out_folder / f"PCA_{log_number}")
             print("Generated PCA")
             msg = f"PCA created at: {out_pca.resolve()}\n"
+            msg += f"PCA coordinates and loadings saved at: {out_folder.resolve()}/PCA_{log_number}_*.csv\n"
             print(msg)
             log_fhand.write(msg)
             log_fhand.flush()
+            save_profile(profiler, log_fhand)
             log_fhand.close()
 
     except Exception as e:
@@ -133,6 +181,7 @@ def main():
         print(msg)
         log_fhand.write(msg)
         log_fhand.write(traceback.format_exc())
+        save_profile(profiler, log_fhand)
         log_fhand.close()
         raise
 
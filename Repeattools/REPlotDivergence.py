@@ -4,9 +4,6 @@ import traceback
 from uuid import uuid1
 from pathlib import Path
 
-from src.generate_plots import get_divergence_violins, get_divergence_boxplots
-from src.utils import read_names_file
-
 def argument_parser():
     desc = """Generates violin plots and box plots 
     based on RECollector's species divergence output.
@@ -18,7 +15,10 @@ def argument_parser():
     category introduced by the user. For the box plots, a tab-separated
     file indicating in each line the species and the group it belongs
     to (for example, a taxonomical clade), so that different species
-    can be grouped together."""
+    can be grouped together. Finally, the divergence landscape
+    file of RECollector (--landscape) can be plotted as the number of
+    repeats of each category in each bin of divergence, one plot
+    per species."""
     parser = argparse.ArgumentParser(description=desc)
 
     help_divergence_violin= """Folder of the divergence
@@ -58,10 +58,27 @@ def argument_parser():
     parser.add_argument("--groups", "-g", type=Path,
                         help=help_box_group_file, required=False)
 
-    help_output_folder = """Output directory name for the violin
-    and the box plots"""
+    help_landscape = """RECollector divergence landscape file
+    (<output>_<depth>_landscape_<log number>.npz) for plotting the
+    landscape of each species. If --names is given, only those
+    species are plotted, in the order of the file; --exclude
+    also applies"""
+    parser.add_argument("--landscape", "-l", type=Path, default=False,
+                        help=help_landscape, required=False)
+
+    help_output_folder = """Output directory name for the violin,
+    box and landscape plots"""
     parser.add_argument("--output", "-o", type=Path,
                         help=help_output_folder, required=True)
+    help_profile = """Profile the run with cProfile and a stack sampler.
+    The profile is saved to REPlotDivergence_profile_<log number>.pstats
+    (pstats dump) and REPlotDivergence_profile_<log number>.collapsed
+    (collapsed stacks for flamegraph.pl or speedscope) in the output
+    folder. Optionally, 'violins', 'boxplots' or 'landscapes' can be
+    given to profile only those plots"""
+    parser.add_argument("--profile", help=help_profile, nargs="?",
+                        choices=["all", "violins", "boxplots", "landscapes"], const="all",
+                        default=None, required=False)
 
     return parser
 
@@ -71,12 +88,21 @@ def get_options():
 
 def main():
     arguments = get_options()
+    #Processing modules (pandas, matplotlib...) are imported after
+    #parsing the arguments, so --help and argument errors are fast
+    from src.config import EXCLUDED_CATEGORIES
+    from src.generate_plots import (get_divergence_boxplots, get_divergence_landscapes,
+                                    get_divergence_violins)
+    from src.profiling import RunProfiler, save_profile
+    from src.utils import get_div_files, read_names_file
+
     violin_dir = arguments.violin
     names_file = arguments.names
     exclude = arguments.exclude
     tree_fpath = arguments.tree
     box_file = arguments.box
     groups_file = arguments.groups
+    landscape_file = arguments.landscape
     out_folder = arguments.output
 
     if not out_folder.exists():
@@ -89,13 +115,23 @@ def main():
         msg += f"Input directory for violin plots: {violin_dir.resolve()}\n"
     if box_file:
         msg += f"Input file for box plots: {box_file.resolve()}\n"
+    if landscape_file:
+        msg += f"Input file for landscape plots: {landscape_file.resolve()}\n"
     msg += f"Output folder: {out_folder.resolve()}\n"
     print(msg)
     log_fhand.write(msg)
     log_fhand.flush()
 
+    if arguments.profile:
+        profile_scope = None if arguments.profile == "all" else arguments.profile
+        profiler = RunProfiler(out_folder / f"REPlotDivergence_profile_{log_number}",
+                               profile_scope)
+    else:
+        profiler = RunProfiler()
+
     out_violin = out_folder / f"Violin_plots_{log_number}.png"
     out_box = out_folder / f"Box_plots_{log_number}.png"
+    out_landscape = out_folder / f"Landscape_plots_{log_number}.png"
 
     try:
         if violin_dir:
@@ -117,29 +153,15 @@ def main():
                 log_fhand.write(msg)
                 log_fhand.flush()
 
-            files_list = list(violin_dir.glob("*"))
+            files_list = get_div_files(violin_dir, exclude)
             if exclude:
-                new_list = []
-                cols_to_exclude = ["Artifact", "Other", "Accidental", "Low_complexity",
-                                   "Simple_repeat", "Normally_Non-integrating_Virus",
-                                   "Pseudogene", "RNA", "rRNA", "Tandem_repeat",
-                                   "Satellite", "Acromeric", "Centromeric", "Macro",
-                                   "Subtelomeric", "W-chromosomal", "Y-chromosomal",
-                                   "scRNA", "Segmental_Duplication", "Simple", "snRNA",
-                                   "tRNA", "DFAM-Unknown_Centromeric", "Unknown"]
-                for file in files_list:
-                    for col in cols_to_exclude:
-                        if col in file.name:
-                            break
-                    else:
-                        new_list.append(file)
-                files_list = new_list
-                msg = f"Excluded files: {', '.join(cols_to_exclude)}\n"
+                msg = f"Excluded files: {', '.join(EXCLUDED_CATEGORIES)}\n"
                 print(msg)
                 log_fhand.write(msg)
                 log_fhand.flush()
 
-            get_divergence_violins(files_list, tree_fpath, analyzed_species, out_violin)
+            with profiler.section("violins"):
+                get_divergence_violins(files_list, tree_fpath, analyzed_species, out_violin)
             print(f"{'-'*10} Generated violin plots for divergence {'-'*10}")
             msg = f"Violin plots created at: {out_violin.resolve()}\n"
             print(msg)
@@ -164,13 +186,37 @@ def main():
                 log_fhand.write(msg)
                 log_fhand.flush()
 
-            get_divergence_boxplots(box_file, species_and_groups, out_box)
+            with profiler.section("boxplots"):
+                get_divergence_boxplots(box_file, species_and_groups, out_box)
             print(f"{'-'*10} Generated box plots for {box_file.name} {'-'*10}")
             msg = f"Box plots created at: {out_box.resolve()}\n"
             print(msg)
             log_fhand.write(msg)
             log_fhand.flush()
 
+        if landscape_file:
+            print(f"{'-'*10} Generating landscape plots for {landscape_file.name} {'-'*10}")
+            analyzed_species = None
+            if names_file:
+                with open(names_file) as names:
+                    analyzed_species = list(read_names_file(names).values())
+                    print("Read names of species file for landscape plots")
+            if exclude:
+                msg = f"Excluded categories: {', '.join(EXCLUDED_CATEGORIES)}\n"
+                print(msg)
+                log_fhand.write(msg)
+                log_fhand.flush()
+
+            with profiler.section("landscapes"):
+                get_divergence_landscapes(landscape_file, out_landscape,
+                                          analyzed_species, exclude)
+            print(f"{'-'*10} Generated landscape plots for {landscape_file.name} {'-'*10}")
+            msg = f"Landscape plots created at: {out_landscape.resolve()}\n"
+            print(msg)
+            log_fhand.write(msg)
+            log_fhand.flush()
+
+        save_profile(profiler, log_fhand)
         log_fhand.close()
 
     except Exception as e:
@@ -178,6 +224,7 @@ def main():
         print(msg)
         log_fhand.write(msg)
         log_fhand.write(traceback.format_exc())
+        save_profile(profiler, log_fhand)
         log_fhand.close()
         raise
 
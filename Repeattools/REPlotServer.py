@@ -0,0 +1,75 @@
+import argparse
+import sys
+from uuid import uuid1
+from pathlib import Path
+
+def argument_parser():
+    desc = """Starts a local plotting server that keeps the TE count
+    matrices and divergence files of RECollector loaded in memory,
+    so that the plots of REPlotCounts and REPlotDivergence can be
+    generated repeatedly without reading their inputs again.
+    Plot jobs are sent as JSON to http://<host>:<port>/plot, e.g.
+    {"plot": "heatmap", "matrix": "TECountMatrix.csv",
+    "groups": "groups_file", "hsize": [20, 13]}. Available plots:
+    heatmap, pca, violins and boxplots. The path of the generated
+    figure is returned. Cached files can be consulted at
+    http://<host>:<port>/status. Files are reloaded when they
+    are modified."""
+    parser = argparse.ArgumentParser(description=desc)
+
+    help_host = """Address the server listens on. Default: 127.0.0.1"""
+    parser.add_argument("--host", help=help_host, type=str,
+                        default="127.0.0.1", required=False)
+    help_port = """Port the server listens on. Default: 8765"""
+    parser.add_argument("--port", "-p", help=help_port, type=int,
+                        default=8765, required=False)
+    help_cache_size = """Maximum number of input files kept in memory.
+    The least recently used file is discarded first. Default: 8"""
+    parser.add_argument("--cache", "-c", help=help_cache_size, type=int,
+                        default=8, required=False)
+    help_output_folder = """Output folder for the log and for the plots
+    of jobs that do not specify an output folder"""
+    parser.add_argument("--output", "-o", type=Path,
+                        help=help_output_folder, required=True)
+
+    return parser
+
+def get_options():
+    parser = argument_parser()
+    return parser.parse_args()
+
+def main():
+    arguments = get_options()
+    #Processing modules (pandas, matplotlib...) are imported after
+    #parsing the arguments, so --help and argument errors are fast
+    from src.plot_server import DataCache, PlotServer
+
+    out_folder = arguments.output
+
+    if not out_folder.exists():
+        out_folder.mkdir()
+
+    log_number = uuid1()
+    log_fhand = open(out_folder / f"REPlotServer.{log_number}.log", "w")
+    msg = f"Command used: {' '.join(sys.argv)}\n"
+    msg += f"Output folder: {out_folder.resolve()}\n"
+    msg += f"Listening on: http://{arguments.host}:{arguments.port}\n"
+    print(msg)
+    log_fhand.write(msg)
+    log_fhand.flush()
+
+    cache = DataCache(max_entries=arguments.cache)
+    server = PlotServer((arguments.host, arguments.port), cache,
+                        out_folder, log_fhand=log_fhand)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        msg = f"{'-'*10} Plotting server stopped {'-'*10}\n"
+        print(msg)
+        log_fhand.write(msg)
+    finally:
+        server.server_close()
+        log_fhand.close()
+
+if __name__ == "__main__":
+    main()
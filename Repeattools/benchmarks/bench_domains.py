@@ -0,0 +1,63 @@
+"""Runtime of counting the domains column of TESorter-annotated repeats.
+
+Synthetic TESorter rows (see benchmarks.synthetic) are read with
+read_tesorter_cls_tsv, and count_tes is timed in each domains mode
+against the previous approach, which joined the dictionaries of each
+row into a string and counted the strings.
+
+Usage (from the Repeattools directory):
+    python -m benchmarks.bench_domains [--rows 2000000] [--repeat 3]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import TES_HEADER, make_repeatmasker_df, make_tesorter_df
+from src.create_matrix import DOMAIN_MODES, count_tes
+from src.read_input import read_tesorter_cls_tsv
+
+def count_joined_domains(te_repeats):
+    """Previous domain counting: a string per row (on a copy, as it modified the column)."""
+    te_repeats = te_repeats.copy()
+    te_repeats["domains"] = te_repeats["domains"].apply(lambda x: ','.join(map(str, x)))
+    return te_repeats.value_counts("domains").astype("int32")
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000000,
+                        help="Number of TESorter rows")
+    parser.add_argument("--repeat", type=int, default=3)
+    arguments = parser.parse_args()
+
+    rm_df = make_repeatmasker_df(arguments.rows)
+    te_df = make_tesorter_df(rm_df, te_fraction=1.0)
+    del rm_df
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        te_fpath = Path(tmp_dir) / "species.cls.tsv"
+        with open(te_fpath, "w") as te_fhand:
+            te_fhand.write(TES_HEADER)
+            te_df.to_csv(te_fhand, sep="\t", header=False, index=False, chunksize=500000)
+        del te_df
+        with open(te_fpath) as te_fhand:
+            te_repeats = read_tesorter_cls_tsv(te_fhand)
+
+    print(f"{'method':>12} {'rows':>10} {'categories':>11} {'seconds':>9}")
+    counts, seconds = best_time(lambda: count_joined_domains(te_repeats), arguments.repeat)
+    print(f"{'joined':>12} {len(te_repeats):>10} {len(counts):>11} {seconds:>9.3f}")
+    for mode in DOMAIN_MODES:
+        counts, seconds = best_time(lambda: count_tes(te_repeats, "Species", "domains",
+                                                      domains_mode=mode),
+                                    arguments.repeat)
+        print(f"{mode:>12} {len(te_repeats):>10} {len(counts):>11} {seconds:>9.3f}")
+
+if __name__ == "__main__":
+    main()
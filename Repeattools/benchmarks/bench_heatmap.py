@@ -0,0 +1,52 @@
+"""Runtime of get_count_matrix_heatmap for increasing numbers of species.
+
+Usage (from the Repeattools directory):
+    python -m benchmarks.bench_heatmap [--species 100 1000 5000] [--modes mesh raster]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from src.generate_plots import get_count_matrix_heatmap
+
+def make_count_matrix(n_species, n_categories, seed=0):
+    """Random TE count matrix (species in rows) with 5 groups of species."""
+    rng = np.random.default_rng(seed)
+    counts = rng.poisson(rng.uniform(1, 500, n_categories), (n_species, n_categories))
+    species = [f"Species_{i}" for i in range(n_species)]
+    matrix_df = pd.DataFrame(counts, index=species,
+                             columns=[f"Superfamily_{j}" for j in range(n_categories)])
+    group_dict = {sp: f"Group_{i % 5}" for i, sp in enumerate(species)}
+    return matrix_df, group_dict
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--species", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--categories", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["mesh", "raster"],
+                        choices=["mesh", "raster"])
+    parser.add_argument("--dendro", action="store_true")
+    arguments = parser.parse_args()
+
+    print(f"{'species':>8} {'mode':>7} {'seconds':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_species in arguments.species:
+            matrix_df, group_dict = make_count_matrix(n_species, arguments.categories)
+            for mode in arguments.modes:
+                start = time.perf_counter()
+                get_count_matrix_heatmap(matrix_df, Path(tmp_dir) / f"{n_species}_{mode}.png",
+                                         group_dict, (15, 15), dendro=arguments.dendro,
+                                         mode=mode)
+                elapsed = time.perf_counter() - start
+                plt.close("all")
+                print(f"{n_species:>8} {mode:>7} {elapsed:>9.2f}")
+
+if __name__ == "__main__":
+    main()
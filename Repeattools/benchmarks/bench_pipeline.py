@@ -0,0 +1,211 @@
+"""Runtime and peak memory of each RECollector stage on synthetic data.
+
+Synthetic RepeatMasker/TESorter files (see benchmarks.synthetic) are
+generated once per number of rows in the data directory and reused in
+later runs. For each stage, the best wall time of the repetitions and
+the peak resident memory (RSS) of the process while it runs are reported.
+
+Results can be saved as a baseline and later runs compared against it;
+the benchmark exits with an error if a stage is slower (or uses more
+memory) than the baseline by more than the threshold.
+
+Usage (from the Repeattools directory):
+    python -m benchmarks.bench_pipeline [--rows 100000 1000000 10000000]
+        [--seqids 12] [--data-dir synthetic_data] [--save baseline.json]
+        [--compare baseline.json --threshold 0.2]
+"""
+import argparse
+import gc
+import json
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import write_species_files
+from src.create_matrix import (count_tes, filter_df_by_domain,
+                               filter_df_by_length, filter_df_by_percentages)
+from src.read_input import (merge_inputs, read_repeatmasker_out,
+                            read_tesorter_cls_tsv)
+from src.stage_stats import get_rss
+
+#Stages faster than this (in seconds) are too noisy to detect regressions
+MIN_COMPARED_SECONDS = 0.1
+
+class PeakRSSMonitor:
+    """Samples the resident memory of the process in a background thread.
+
+    Used as a context manager around a stage.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start_rss = 0
+        self.peak_rss = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, get_rss())
+
+    def __enter__(self):
+        self.start_rss = self.peak_rss = get_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, get_rss())
+
+def run_stage(func, repeat):
+    """Runs a stage `repeat` times.
+
+    Returns
+    -------
+    result : object returned by the last run
+
+    seconds : float
+        Best wall time.
+
+    peak_rss_mb : float
+        Highest peak memory of the process during the runs.
+    """
+    best = float("inf")
+    peak_rss = 0
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        with PeakRSSMonitor() as monitor:
+            start = time.perf_counter()
+            result = func()
+            best = min(best, time.perf_counter() - start)
+        peak_rss = max(peak_rss, monitor.peak_rss)
+    return result, best, peak_rss / 2**20
+
+def bench_pipeline(rm_fpath, te_fpath, repeat=1, override=True):
+    """Runs the stages of RECollector for a species.
+
+    Returns
+    -------
+    results : dict
+        Stage name: {"seconds": ..., "peak_rss_mb": ..., "rows": ...}.
+    """
+    results = {}
+
+    def record(name, func):
+        result, seconds, peak_rss_mb = run_stage(func, repeat)
+        results[name] = {"seconds": round(seconds, 4),
+                         "peak_rss_mb": round(peak_rss_mb, 1),
+                         "rows": len(result)}
+        print(f"{name:>26} {results[name]['rows']:>10} {seconds:>9.3f} {peak_rss_mb:>10.1f}")
+        return result
+
+    def read_rm():
+        with open(rm_fpath) as rm_fhand:
+            return read_repeatmasker_out(rm_fhand)
+
+    def read_rm_mmap():
+        with open(rm_fpath) as rm_fhand:
+            return read_repeatmasker_out(rm_fhand, memory_map=True)
+
+    def read_te():
+        with open(te_fpath) as te_fhand:
+            return read_tesorter_cls_tsv(te_fhand)
+
+    rm_repeats = record("read_repeatmasker_out", read_rm)
+    record("read_repeatmasker_out (mmap)", read_rm_mmap)
+    te_repeats = record("read_tesorter_cls_tsv", read_te)
+    species_df = record("merge_inputs", lambda: merge_inputs(rm_repeats, te_repeats, override))
+    del rm_repeats, te_repeats
+    record("filter_df_by_length", lambda: filter_df_by_length(species_df, 100))
+    record("filter_df_by_domain", lambda: filter_df_by_domain(species_df, [], [], []))
+    record("filter_df_by_percentages", lambda: filter_df_by_percentages(species_df))
+    record("count_tes", lambda: count_tes(species_df, "Species", "superfamily"))
+    record("count_tes (domains)", lambda: count_tes(species_df, "Species", "domains"))
+
+    return results
+
+def compare_results(results, baseline, threshold):
+    """Lists the stages that are slower or use more memory than the baseline.
+
+    Parameters
+    ----------
+    results, baseline : dict
+        Number of rows: results of `bench_pipeline`.
+
+    threshold : float
+        Allowed relative increase (e.g. 0.2 for 20%).
+
+    Returns
+    -------
+    regressions : list of str
+    """
+    regressions = []
+    for n_rows, stages in results.items():
+        for stage, values in stages.items():
+            base_values = baseline.get(n_rows, {}).get(stage)
+            if base_values is None:
+                continue
+            if max(values["seconds"], base_values["seconds"]) >= MIN_COMPARED_SECONDS:
+                if values["seconds"] > base_values["seconds"] * (1 + threshold):
+                    regressions.append(f"{stage} ({n_rows} rows): {values['seconds']:.3f} s"
+                                       f" vs {base_values['seconds']:.3f} s")
+            if values["peak_rss_mb"] > base_values["peak_rss_mb"] * (1 + threshold):
+                regressions.append(f"{stage} ({n_rows} rows): {values['peak_rss_mb']:.1f} MB"
+                                   f" vs {base_values['peak_rss_mb']:.1f} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000, 10000000])
+    parser.add_argument("--data-dir", type=Path, default=None,
+                        help="Directory to keep the synthetic files. Default: temporary directory")
+    parser.add_argument("--seqids", type=int, default=12,
+                        help="Number of sequences of the synthetic assembly")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-override", action="store_true",
+                        help="Merge the inputs without --override")
+    parser.add_argument("--save", type=Path, help="Save the results to a JSON file")
+    parser.add_argument("--compare", type=Path, help="JSON file of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = arguments.data_dir or Path(tmp_dir)
+        results = {}
+        for n_rows in arguments.rows:
+            species_dir = f"Synthetic_{n_rows}"
+            if arguments.seqids != 12:
+                species_dir += f"_{arguments.seqids}_seqids"
+            rm_fpath = data_dir / species_dir / f"{species_dir}.fa.out"
+            te_fpath = data_dir / species_dir / f"{species_dir}.fa.rep.fa.rexdb-plant.cls.tsv"
+            if not (rm_fpath.exists() and te_fpath.exists()):
+                print(f"Generating {n_rows} synthetic rows in {data_dir / species_dir}")
+                rm_fpath, te_fpath = write_species_files(data_dir, species_dir, n_rows,
+                                                         n_seqids=arguments.seqids)
+
+            print(f"{'-'*10} {n_rows} rows {'-'*10}")
+            print(f"{'stage':>26} {'rows out':>10} {'seconds':>9} {'peak MB':>10}")
+            results[str(n_rows)] = bench_pipeline(rm_fpath, te_fpath, arguments.repeat,
+                                                  override=not arguments.no_override)
+            gc.collect()
+
+    if arguments.save:
+        with open(arguments.save, "w") as save_fhand:
+            json.dump(results, save_fhand, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as baseline_fhand:
+            baseline = json.load(baseline_fhand)
+        regressions = compare_results(results, baseline, arguments.threshold)
+        if regressions:
+            print(f"Regressions beyond {arguments.threshold:.0%}:")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print(f"No regressions beyond {arguments.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+"""Synthetic RepeatMasker (.out) and TESorter (.cls.tsv) files for benchmarks.
+
+The files follow the layout of the real outputs read by RECollector:
+RepeatMasker rows use class/family values of CLASSIFIER_FOR_RECOLLECTOR,
+some of them are marked with '*', and a fraction of them is also
+classified by TESorter (with its #TE identifier pointing back to the
+RepeatMasker row and realistic domain strings, e.g. "GAG|Ale RT|Ale").
+
+Usage (from the Repeattools directory):
+    python -m benchmarks.synthetic --output synthetic_data --species 3 --rows 100000
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.config import CLASSIFIER_FOR_RECOLLECTOR as classifier
+
+RM_HEADER = ("   SW   perc perc perc  query        position in query                 matching           repeat                position in repeat\n"
+             "score   div. del. ins.  sequence     begin     end            (left)   repeat             class/family      begin   end    (left)       ID\n"
+             "\n")
+
+TES_HEADER = "#TE\tOrder\tSuperfamily\tClade\tComplete\tStrand\tDomains\n"
+
+#Most abundant RepeatMasker classifications and their weights,
+#the rest of the RepeatMasker classifications share the remaining weight
+COMMON_RM_FAMILIES = {"LTR/Gypsy": 0.25, "LTR/Copia": 0.15, "Unknown": 0.2,
+                      "LTR/Unknown": 0.05, "LINE/L1": 0.05, "DNA/hAT": 0.03,
+                      "DNA/MULE-MuDR": 0.03, "DNA/CMC-EnSpm": 0.02,
+                      "RC/Helitron": 0.02, "Simple_repeat": 0.05,
+                      "Low_complexity": 0.02}
+
+#TESorter classifications: order, superfamily, clades and domains (in
+#the order in which they appear in the elements)
+TES_CLASSIFICATIONS = [
+    ("LTR", "Copia", ["Ale", "Angela", "Bianca", "Ikeros", "Ivana", "SIRE", "TAR", "Tork"],
+     ["GAG", "PROT", "INT", "RT", "RH"]),
+    ("LTR", "Gypsy", ["Athila", "CRM", "Galadriel", "Reina", "Retand", "Tekay"],
+     ["GAG", "PROT", "RT", "RH", "aRH", "INT", "CHD"]),
+    ("LINE", "unknown", ["unknown"], ["RT"]),
+    ("TIR", "hAT", ["hAT"], ["TPase"]),
+    ("TIR", "MuDR_Mutator", ["MuDR_Mutator"], ["TPase"]),
+    ("TIR", "EnSpm_CACTA", ["EnSpm_CACTA"], ["TPase"]),
+    ("TIR", "PIF_Harbinger", ["PIF_Harbinger"], ["TPase"]),
+    ("Helitron", "unknown", ["unknown"], ["HEL"]),
+    ]
+
+def get_rm_families():
+    """Returns the RepeatMasker classifications and their sampling probabilities."""
+    tes_orders = {order for order, _, _, _ in TES_CLASSIFICATIONS}
+    tes_orders.update(["pararetrovirus", "DIRS", "mixture", "Maverick", "Penelope"])
+    #Classifications without the four levels (class, subclass,
+    #superfamily and element) cannot be processed by merge_inputs
+    families = [fam for fam in classifier if len(classifier[fam]) == 4
+                and (fam.split("/")[0] not in tes_orders or fam in COMMON_RM_FAMILIES)]
+    rare_families = [fam for fam in families if fam not in COMMON_RM_FAMILIES]
+    rare_weight = (1 - sum(COMMON_RM_FAMILIES.values())) / len(rare_families)
+    families = list(COMMON_RM_FAMILIES) + rare_families
+    weights = np.array(list(COMMON_RM_FAMILIES.values()) + [rare_weight] * len(rare_families))
+    return families, weights / weights.sum()
+
+def get_tes_annotations():
+    """Returns every TESorter annotation (order, superfamily, clade, domains).
+
+    Domain strings are consecutive runs of the domains of each
+    superfamily, named after the clade (or the order for elements
+    without a clade), e.g. "GAG|Ale PROT|Ale" or "RT|LINE".
+    """
+    annotations = []
+    for order, superfamily, clades, domains in TES_CLASSIFICATIONS:
+        for clade in clades:
+            dom_clade = order if clade == "unknown" else clade
+            for i in range(len(domains)):
+                for j in range(i + 1, len(domains) + 1):
+                    dom_str = " ".join(f"{dom}|{dom_clade}" for dom in domains[i:j])
+                    annotations.append((order, superfamily, clade, dom_str))
+    return pd.DataFrame(annotations, columns=["order", "superfamily", "clade", "domains"])
+
+def make_repeatmasker_df(n_rows, seed=0, n_seqids=12, n_families=2000,
+                         star_fraction=0.1, seqid_prefix="Chr", fragment_fraction=0.0):
+    """Creates the rows of a synthetic RepeatMasker .out file.
+
+    Parameters
+    ----------
+    n_rows : int
+
+    seed : int, default: 0
+
+    n_seqids : int, default: 12
+        Number of query sequences (chromosomes).
+
+    n_families : int, default: 2000
+        Number of repeat families. Each family has a single
+        class/family value.
+
+    star_fraction : float, default: 0.1
+        Fraction of rows marked with '*' (overlapped by a
+        higher-scoring match).
+
+    seqid_prefix : str, default: 'Chr'
+
+    fragment_fraction : float, default: 0.0
+        Fraction of rows that are fragments of the element of the
+        previous row of their sequence (with its ID, family and strand).
+
+    Returns
+    -------
+    rm_df : `pandas.DataFrame`
+        Columns in the order of the .out file, plus the '*' marker.
+    """
+    rng = np.random.default_rng(seed)
+    families, probs = get_rm_families()
+
+    #Repeat families, named as RepeatModeler names them
+    fam_classes = np.asarray(families, dtype=object)[rng.choice(len(families), n_families, p=probs)]
+    fam_names = np.array([f"{'ltr-1' if cl.startswith('LTR') else 'rnd-' + str(i % 6 + 1)}_family-{i}"
+                          for i, cl in enumerate(fam_classes)], dtype=object)
+    fam_idx = rng.integers(0, n_families, n_rows)
+
+    #Rows are sorted by sequence and position, without overlaps
+    seqids = np.sort(rng.integers(0, n_seqids, n_rows))
+    lengths = np.clip(rng.lognormal(5.5, 1.0, n_rows), 10, 20000).astype("int64")
+    gaps = rng.integers(0, 2000, n_rows)
+    ends = np.cumsum(gaps + lengths)
+    first_rows = np.searchsorted(seqids, seqids)
+    offsets = ends[first_rows] - gaps[first_rows] - lengths[first_rows]
+    ends = ends - offsets
+    starts = ends - lengths
+    seq_ends = pd.Series(ends).groupby(seqids).transform("max").to_numpy() + rng.integers(0, 10000)
+
+    forward = rng.random(n_rows) < 0.5
+    rep_end = lengths + rng.integers(0, 50, n_rows)
+    rep_left = rng.integers(0, 3000, n_rows)
+    rep_left_str = "(" + pd.Series(rep_left).astype(str) + ")"
+    rep_start_str = pd.Series(np.ones(n_rows, dtype="int64")).astype(str)
+
+    rm_df = pd.DataFrame({
+        "sw": rng.integers(200, 30000, n_rows),
+        "per div": rng.uniform(0, 40, n_rows).round(1),
+        "per del": rng.uniform(0, 10, n_rows).round(1),
+        "per ins": rng.uniform(0, 10, n_rows).round(1),
+        "seqid": pd.Categorical.from_codes(seqids, [f"{seqid_prefix}{i:02d}" for i in range(n_seqids)]),
+        "start": starts,
+        "end": ends,
+        "q left": "(" + pd.Series(seq_ends - ends).astype(str) + ")",
+        "match": np.where(forward, "+", "C"),
+        "repeat": fam_names[fam_idx],
+        "class/family": fam_classes[fam_idx],
+        "r start": rep_start_str.where(forward, rep_left_str),
+        "r end": rep_end,
+        "r left": rep_left_str.where(forward, rep_start_str),
+        "id": np.arange(1, n_rows + 1),
+        "star": np.where(rng.random(n_rows) < star_fraction, "*", ""),
+        })
+
+    if fragment_fraction:
+        joined = rng.random(n_rows) < fragment_fraction
+        joined[0] = False
+        joined[1:] &= seqids[1:] == seqids[:-1]
+        element_firsts = np.maximum.accumulate(np.where(joined, 0, np.arange(n_rows)))
+        for col in ["match", "repeat", "class/family"]:
+            rm_df[col] = rm_df[col].to_numpy()[element_firsts]
+        rm_df["id"] = np.cumsum(~joined)
+
+    return rm_df
+
+def make_tesorter_df(rm_df, seed=0, te_fraction=0.3):
+    """Creates the rows of a synthetic TESorter .cls.tsv file.
+
+    Parameters
+    ----------
+    rm_df : `pandas.DataFrame`
+        Rows from `make_repeatmasker_df`.
+
+    seed : int, default: 0
+
+    te_fraction : float, default: 0.3
+        Fraction of the RepeatMasker rows classified by TESorter.
+
+    Returns
+    -------
+    te_df : `pandas.DataFrame`
+        Columns in the order of the .cls.tsv file.
+    """
+    rng = np.random.default_rng(seed + 1)
+    annotations = get_tes_annotations()
+    te_rows = rm_df.loc[rng.random(len(rm_df)) < te_fraction]
+    te_annots = annotations.iloc[rng.integers(0, len(annotations), len(te_rows))]
+
+    te_ids = (te_rows["seqid"].astype(str) + ":" + te_rows["start"].astype(str)
+              + ".." + te_rows["end"].astype(str) + "_" + te_rows["repeat"]
+              + "#" + te_rows["class/family"])
+    te_df = pd.DataFrame({
+        "#TE": te_ids.to_numpy(),
+        "Order": te_annots["order"].to_numpy(),
+        "Superfamily": te_annots["superfamily"].to_numpy(),
+        "Clade": te_annots["clade"].to_numpy(),
+        "Complete": np.where(rng.random(len(te_rows)) < 0.2, "yes", "no"),
+        "Strand": np.where(te_rows["match"].to_numpy() == "+", "+", "-"),
+        "Domains": te_annots["domains"].to_numpy(),
+        })
+
+    return te_df
+
+def write_species_files(out_dir, species_dir_name, n_rows, seed=0,
+                        te_fraction=0.3, star_fraction=0.1, fragment_fraction=0.0,
+                        n_seqids=12):
+    """Writes the .out and .cls.tsv files of a synthetic species.
+
+    Parameters
+    ----------
+    out_dir : path
+        The files are written in `out_dir/species_dir_name`,
+        as expected by RECollector.
+
+    species_dir_name : str
+
+    n_rows : int
+        Number of rows of the RepeatMasker file.
+
+    seed : int, default: 0
+
+    te_fraction : float, default: 0.3
+        Fraction of the RepeatMasker rows classified by TESorter.
+
+    star_fraction : float, default: 0.1
+        Fraction of the RepeatMasker rows marked with '*'.
+
+    fragment_fraction : float, default: 0.0
+        Fraction of the RepeatMasker rows that are fragments of the
+        element of the previous row (see `make_repeatmasker_df`).
+
+    n_seqids : int, default: 12
+        Number of query sequences (e.g. hundreds of thousands
+        for a scaffold-level assembly).
+
+    Returns
+    -------
+    rm_fpath, te_fpath : paths to the files
+    """
+    species_dir = Path(out_dir) / species_dir_name
+    species_dir.mkdir(parents=True, exist_ok=True)
+    rm_fpath = species_dir / f"{species_dir_name}.fa.out"
+    te_fpath = species_dir / f"{species_dir_name}.fa.rep.fa.rexdb-plant.cls.tsv"
+
+    rm_df = make_repeatmasker_df(n_rows, seed=seed, n_seqids=n_seqids, star_fraction=star_fraction,
+                                 fragment_fraction=fragment_fraction)
+    with open(rm_fpath, "w") as rm_fhand:
+        rm_fhand.write(RM_HEADER)
+        rm_df.to_csv(rm_fhand, sep=" ", header=False, index=False, chunksize=500000)
+
+    te_df = make_tesorter_df(rm_df, seed=seed, te_fraction=te_fraction)
+    with open(te_fpath, "w") as te_fhand:
+        te_fhand.write(TES_HEADER)
+        te_df.to_csv(te_fhand, sep="\t", header=False, index=False, chunksize=500000)
+
+    return rm_fpath, te_fpath
+
+def write_dataset(out_dir, n_species, n_rows, seed=0, te_fraction=0.3,
+                  star_fraction=0.1, fragment_fraction=0.0):
+    """Writes an input directory and a names file for RECollector.
+
+    Parameters
+    ----------
+    out_dir : path
+
+    n_species : int
+
+    n_rows : int
+        Number of RepeatMasker rows of each species.
+
+    seed : int, default: 0
+        Each species uses `seed + its number` as its seed.
+
+    te_fraction, star_fraction, fragment_fraction : float
+        See `write_species_files`.
+
+    Returns
+    -------
+    names_fpath : path to the names file (out_dir/names.txt)
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    names = {}
+    for i in range(n_species):
+        species_dir_name = f"Spec{i:03d}"
+        write_species_files(out_dir, species_dir_name, n_rows, seed=seed + i,
+                            te_fraction=te_fraction, star_fraction=star_fraction,
+                            fragment_fraction=fragment_fraction)
+        names[species_dir_name] = f"Synthetic_species_{i}"
+
+    names_fpath = out_dir / "names.txt"
+    with open(names_fpath, "w") as names_fhand:
+        names_fhand.write("".join(f"{key}\t{value}\n" for key, value in names.items()))
+
+    return names_fpath
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", "-o", type=Path, required=True)
+    parser.add_argument("--species", type=int, default=1)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--te-fraction", type=float, default=0.3)
+    parser.add_argument("--star-fraction", type=float, default=0.1)
+    parser.add_argument("--fragment-fraction", type=float, default=0.0)
+    arguments = parser.parse_args()
+
+    names_fpath = write_dataset(arguments.output, arguments.species, arguments.rows,
+                                seed=arguments.seed, te_fraction=arguments.te_fraction,
+                                star_fraction=arguments.star_fraction,
+                                fragment_fraction=arguments.fragment_fraction)
+    print(f"Names file: {names_fpath}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from .create_matrix import MEASURE_DTYPES
+
+CHECKPOINT_FNAME = "RECollector_checkpoint.json"
+
+class RunCheckpoint:
+    """Records the species whose results have been fully written by RECollector.
+
+    After a species is processed, its TE counts and the size of every
+    divergence file are saved in a JSON checkpoint, which is replaced
+    atomically. Divergence rows written after the last checkpoint belong
+    to a species that was not committed, so `restore_divergence_files`
+    truncates the files to their committed sizes (and removes files that
+    did not exist) before a run is resumed.
+
+    Parameters
+    ----------
+    checkpoint_fpath : path
+
+    settings : dict
+        Options of the run that affect its results (depth, filters...).
+        A run can only be resumed with the same settings.
+
+    div_folder : path
+        Folder of the divergence files.
+
+    Attributes
+    ----------
+    planned : list of str
+        Directories of all the species of the run, so that
+        incomplete runs can be detected.
+    """
+    def __init__(self, checkpoint_fpath, settings, div_folder):
+        self.checkpoint_fpath = Path(checkpoint_fpath)
+        self.settings = settings
+        self.div_folder = Path(div_folder)
+        self.species = []
+        #Divergence files of previous runs in the same folder are
+        #committed as they are, so only rows of this run are removed
+        self.div_sizes = self.get_div_sizes()
+        self.planned = []
+
+    @classmethod
+    def load(cls, checkpoint_fpath, settings, div_folder):
+        """Reads a checkpoint saved by a previous run.
+
+        Raises
+        ------
+        ValueError
+            If the previous run used different settings.
+        """
+        with open(checkpoint_fpath) as checkpoint_fhand:
+            saved = json.load(checkpoint_fhand)
+        if saved["settings"] != settings:
+            changed = [key for key in settings if saved["settings"].get(key) != settings[key]]
+            raise ValueError(f"Cannot resume a run with different options: {', '.join(changed)}")
+        checkpoint = cls(checkpoint_fpath, settings, div_folder)
+        checkpoint.species = saved["species"]
+        checkpoint.div_sizes = saved["div_sizes"]
+        checkpoint.planned = saved.get("planned", [])
+        return checkpoint
+
+    def get_div_sizes(self):
+        """Current size of every divergence file, by file name."""
+        return {div_fpath.name: div_fpath.stat().st_size
+                for div_fpath in self.div_folder.glob("*_divergence.csv*")}
+
+    def is_committed(self, dir_name):
+        return any(species["dir"] == dir_name for species in self.species)
+
+    def get_counted_tes(self):
+        """Returns the TE counts of the committed species, as returned by `count_tes`."""
+        depth = self.settings.get("depth")
+        dtype = MEASURE_DTYPES[self.settings.get("measure", "count")]
+        counted_tes = []
+        for species in self.species:
+            counts = pd.Series(species["counts"], name=species["name"], dtype=dtype)
+            counts.index.name = depth
+            counted_tes.append(counts)
+        return counted_tes
+
+    def restore_divergence_files(self):
+        """Removes divergence rows of species that were not committed.
+
+        Returns
+        -------
+        restored_fnames : list of str
+            Names of the files that were truncated or removed.
+        """
+        restored_fnames = []
+        for div_fpath in sorted(self.div_folder.glob("*_divergence.csv*")):
+            committed_size = self.div_sizes.get(div_fpath.name)
+            if committed_size is None:
+                div_fpath.unlink()
+                restored_fnames.append(div_fpath.name)
+            elif div_fpath.stat().st_size != committed_size:
+                os.truncate(div_fpath, committed_size)
+                restored_fnames.append(div_fpath.name)
+        return restored_fnames
+
+    def commit(self, species_name, dir_name, counted_tes, div_fpaths, div_ranges=None):
+        """Records a species whose divergence rows have been written.
+
+        Parameters
+        ----------
+        species_name, dir_name : str
+
+        counted_tes : `pandas.Series`
+            Result of `count_tes` for the species.
+
+        div_fpaths : list of paths
+            Divergence files written for the species. They are
+            flushed to disk before the checkpoint is saved.
+
+        div_ranges : dict, optional
+            Start and end (in bytes) of the rows of the species in
+            each divergence file, by file name. They are used to
+            merge the outputs of several runs (see `src.shards`).
+        """
+        for div_fpath in div_fpaths:
+            with open(div_fpath, "rb") as div_fhand:
+                os.fsync(div_fhand.fileno())
+        self.div_sizes = self.get_div_sizes()
+        species = {"name": species_name, "dir": dir_name,
+                   "counts": dict(zip(counted_tes.index.astype(str), counted_tes.tolist()))}
+        if div_ranges is not None:
+            species["div_ranges"] = div_ranges
+        self.species.append(species)
+        self.save()
+
+    def save(self):
+        """Writes the checkpoint to a temporary file and renames it."""
+        content = {"settings": self.settings, "species": self.species,
+                   "div_sizes": self.div_sizes, "planned": self.planned}
+        tmp_fd, tmp_fpath = tempfile.mkstemp(dir=self.checkpoint_fpath.parent,
+                                             suffix=".json.tmp")
+        with os.fdopen(tmp_fd, "w") as tmp_fhand:
+            json.dump(content, tmp_fhand)
+            tmp_fhand.flush()
+            os.fsync(tmp_fhand.fileno())
+        os.replace(tmp_fpath, self.checkpoint_fpath)
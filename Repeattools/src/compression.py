@@ -0,0 +1,187 @@
+import gzip
+import io
+import queue
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+
+#Compression of the files by their extension (pandas names)
+COMPRESSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+#Options for pandas.DataFrame.to_csv to write compressed
+#divergence files (gzip level 6, as the gzip command)
+CSV_COMPRESSIONS = {"gz": {"method": "gzip", "compresslevel": 6},
+                    "zst": {"method": "zstd"}}
+
+#External decompressors, in order of preference. They run in
+#their own process, so decompression and parsing run in parallel
+DECOMPRESSORS = {"gzip": [["pigz", "-dc"], ["gzip", "-dc"]],
+                 "zstd": [["zstd", "-dcq"]]}
+
+#Size of the decompressed blocks passed from the decompression thread
+BLOCK_SIZE = 1 << 20
+
+def get_compression(fpath):
+    """Returns the compression of a file ('gzip', 'zstd') from its extension, or None."""
+    return COMPRESSIONS.get(Path(fpath).suffix)
+
+def has_extension(fpath, extension):
+    """Checks if a file has an extension, ignoring the compression extension.
+
+    For example, both 'Peame105.out' and 'Peame105.out.gz' have
+    the '.out' extension.
+    """
+    name = Path(fpath).name
+    if get_compression(name):
+        name = name[:-len(Path(name).suffix)]
+    return name.endswith(extension)
+
+def open_binary_decompressor(fpath):
+    compression = get_compression(fpath)
+    if compression == "gzip":
+        return gzip.open(fpath, "rb")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError(f"Reading {fpath} requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(fpath, "rb"),
+                                                          closefd=True)
+    return open(fpath, "rb")
+
+class ThreadedReader(io.RawIOBase):
+    """Binary stream whose content is read by a background thread.
+
+    The thread reads (and decompresses) the next blocks of the file
+    while the data already read is parsed. At most `max_blocks` blocks
+    are kept in memory. zlib and zstandard release the GIL while
+    decompressing, so both tasks run in parallel.
+
+    Parameters
+    ----------
+    source : binary file
+        Stream to read from (e.g. a `gzip.GzipFile`). It is closed
+        with the reader.
+
+    max_blocks : int, default: 4
+    """
+    def __init__(self, source, max_blocks=4):
+        super().__init__()
+        self.source = source
+        self._blocks = queue.Queue(maxsize=max_blocks)
+        self._buffer = b""
+        self._finished = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read_blocks, daemon=True)
+        self._thread.start()
+
+    def _read_blocks(self):
+        try:
+            while not self._stop.is_set():
+                block = self.source.read(BLOCK_SIZE)
+                self._blocks.put(block)
+                if not block:
+                    break
+        except Exception as e:
+            self._blocks.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer and not self._finished:
+            block = self._blocks.get()
+            if isinstance(block, Exception):
+                self._finished = True
+                raise block
+            if not block:
+                self._finished = True
+            self._buffer = memoryview(block)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if self.closed:
+            return
+        self._stop.set()
+        #Unblock the thread if it is waiting for space in the queue
+        while self._thread.is_alive():
+            try:
+                self._blocks.get(timeout=0.01)
+            except queue.Empty:
+                pass
+        self.source.close()
+        super().close()
+
+class ProcessInput(io.TextIOWrapper):
+    """Text stream with the output of an external decompressor.
+
+    Parameters
+    ----------
+    cmd : list of str
+        Command of the decompressor, without the path of the file.
+
+    fpath : path to the compressed file
+    """
+    def __init__(self, cmd, fpath):
+        self.fpath = fpath
+        self.process = subprocess.Popen(cmd + [str(fpath)], stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE)
+        super().__init__(self.process.stdout)
+
+    def close(self):
+        if self.closed:
+            return
+        #If the file was not read completely, the decompressor is stopped
+        read_completely = not self.buffer.peek(1)
+        super().close()
+        if not read_completely:
+            self.process.terminate()
+        returncode = self.process.wait()
+        stderr = self.process.stderr.read().decode(errors="replace").strip()
+        self.process.stderr.close()
+        if returncode != 0 and read_completely:
+            raise OSError(f"Decompression of {self.fpath} failed: {stderr}")
+
+def get_decompressor(compression):
+    """Returns the command of the first external decompressor found, or None."""
+    for cmd in DECOMPRESSORS.get(compression, []):
+        if shutil.which(cmd[0]):
+            return cmd
+    return None
+
+def open_input(fpath, parallel=True):
+    """Opens a (possibly compressed) text input file.
+
+    Files ending in .gz (gzip) or .zst (zstd) are decompressed
+    while they are read.
+
+    Parameters
+    ----------
+    fpath : path
+
+    parallel : bool, default: True
+        If True, compressed files are decompressed in parallel with
+        their parsing: by an external decompressor (pigz, gzip or zstd)
+        if one is installed, or by a background thread otherwise.
+        If False (or with the background thread), .zst files require
+        the zstandard package.
+
+    Returns
+    -------
+    fhand : text file
+    """
+    compression = get_compression(fpath)
+    if compression is None:
+        return open(fpath)
+    if parallel:
+        decompressor = get_decompressor(compression)
+        if decompressor is not None:
+            return ProcessInput(decompressor, fpath)
+    source = open_binary_decompressor(fpath)
+    if parallel:
+        source = io.BufferedReader(ThreadedReader(source), BLOCK_SIZE)
+    return io.TextIOWrapper(source)
@@ -301,4 +301,14 @@ TESORTER_TO_RM_EQUIV_FOR_RECOLLECTOR = {"TIR/Unknown":	"DNA/Unknown",
 "DIRS/Unknown":	"LTR/DIRS",
 "LTR/Retrovirus":	"LTR/ERV",
 "Maverick/Unknown":	"DNA/Maverick",
-"Penelope/Unknown":	"LINE/Penelope"}
\ No newline at end of file
+"Penelope/Unknown":	"LINE/Penelope"}
+
+#Unknown data and other repetitive elements excluded from the plots
+#when REPlotCounts and REPlotDivergence are run with --exclude
+EXCLUDED_CATEGORIES = ["Artifact", "Other", "Accidental", "Low_complexity",
+"Simple_repeat", "Normally_Non-integrating_Virus",
+"Pseudogene", "RNA", "rRNA", "Tandem_repeat",
+"Satellite", "Acromeric", "Centromeric", "Macro",
+"Subtelomeric", "W-chromosomal", "Y-chromosomal",
+"scRNA", "Segmental_Duplication", "Simple", "snRNA",
+"tRNA", "DFAM-Unknown_Centromeric", "Unknown"]
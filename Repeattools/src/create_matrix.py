@@ -1,6 +1,166 @@
+import re
+
+import numpy as np
 import pandas as pd
 
-def count_tes(input_df, species_name, col="superfamily"):
+from .intervals import get_interval_runs
+
+#Values that count_tes can measure for each category, and the
+#datatype of their matrices (base pairs can exceed int32)
+MEASURES = ["count", "bp", "merged_bp", "genome_fraction"]
+MEASURE_DTYPES = {"count": "int32", "bp": "int64",
+                  "merged_bp": "int64", "genome_fraction": "float64"}
+#How count_tes counts the domains column: each distinct set of
+#domain:clade features of a repeat, or each feature separately
+DOMAIN_MODES = ["combination", "exploded"]
+#Odd multiplier of the polynomial hash of the domain combinations
+DOMAIN_HASH_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+def get_domain_label(domain, clade):
+    """Name of a domain:clade feature, as it is printed by its dictionary."""
+    return str({domain: clade})
+
+def encode_domains(domains, mode="combination"):
+    """Integer codes of the domains of each repeat.
+
+    The domain:clade features are flattened into integer codes
+    (sorted by domain and clade), so the counting works on arrays
+    instead of strings. Only the distinct lists of the column are
+    read (repeats read with `read_tesorter_cls_tsv` share the list
+    of their domain string). In 'combination' mode, each repeat
+    gets the code of its set of features: the sorted codes of each
+    list are combined into a polynomial hash with `numpy.add.reduceat`,
+    and the combinations are checked against a representative list,
+    so hash collisions cannot merge different sets. In 'exploded'
+    mode, each feature of a repeat is counted once.
+
+    Parameters
+    ----------
+    domains : `pandas.Series`
+        Lists of {domain: clade} dictionaries (see `read_tesorter_cls_tsv`).
+        It is not modified.
+
+    mode : {'combination', 'exploded'}, default: 'combination'
+
+    Returns
+    -------
+    rows : `numpy.ndarray` of int64
+        Position of the repeat of each code. Repeats without
+        domains have no codes.
+
+    codes : `numpy.ndarray` of int64
+
+    labels : list of str
+        Name of each code: the features of a combination are joined by ','.
+    """
+    if mode not in DOMAIN_MODES:
+        raise ValueError(f"Unknown domains mode: {mode}")
+    domains = domains.to_numpy()
+    list_codes, _ = pd.factorize(np.fromiter(map(id, domains), dtype=np.int64, count=len(domains)))
+    _, list_firsts = np.unique(list_codes, return_index=True)
+
+    doms, clades, n_feats = [], [], []
+    for features in domains[list_firsts]:
+        n_feat = 0
+        for feature in features:
+            doms.extend(feature.keys())
+            clades.extend(feature.values())
+            n_feat += len(feature)
+        n_feats.append(n_feat)
+    lists = np.repeat(np.arange(len(n_feats), dtype=np.int64), n_feats)
+    dom_codes, dom_names = pd.factorize(np.array(doms, dtype=object), sort=True)
+    clade_codes, clade_names = pd.factorize(np.array(clades, dtype=object), sort=True)
+    feat_codes, feat_idx = np.unique(dom_codes.astype(np.int64) * len(clade_names) + clade_codes,
+                                     return_inverse=True)
+    n_codes = len(feat_codes)
+    feat_labels = [get_domain_label(dom_names[code // len(clade_names)],
+                                    clade_names[code % len(clade_names)])
+                   for code in feat_codes.tolist()]
+
+    #Sorted and without repeated features in each list
+    keys = np.unique(lists * n_codes + feat_idx.reshape(-1))
+    lists, feat_idx = keys // n_codes, keys % n_codes
+    sizes = np.bincount(lists, minlength=len(n_feats))
+    firsts = np.cumsum(sizes) - sizes
+    if mode == "exploded":
+        #The features of the list of each repeat
+        rep_sizes = sizes[list_codes]
+        rows = np.repeat(np.arange(len(domains), dtype=np.int64), rep_sizes)
+        ranks = np.arange(len(rows)) - np.repeat(np.cumsum(rep_sizes) - rep_sizes, rep_sizes)
+        return rows, feat_idx[np.repeat(firsts[list_codes], rep_sizes) + ranks], feat_labels
+
+    combo_codes = np.full(len(n_feats), -1, dtype=np.int64)
+    combo_labels = []
+    has_feats = np.flatnonzero(sizes)
+    if len(has_feats):
+        firsts, sizes = firsts[has_feats], sizes[has_feats]
+        ranks = np.arange(len(lists)) - np.repeat(firsts, sizes)
+        powers = np.cumprod(np.full(int(sizes.max()), DOMAIN_HASH_BASE, dtype=np.uint64))
+        with np.errstate(over="ignore"):
+            terms = (feat_idx.astype(np.uint64) + np.uint64(1)) * powers[ranks]
+            hashes = np.add.reduceat(terms, firsts) + sizes.astype(np.uint64)
+        codes, _ = pd.factorize(hashes)
+        _, reps = np.unique(codes, return_index=True)
+        rep_elements = np.repeat(firsts[reps[codes]], sizes) + ranks
+        if (sizes != sizes[reps[codes]]).any() or (feat_idx != feat_idx[rep_elements]).any():
+            #Hash collision: the combinations are compared as tuples
+            codes, _ = pd.factorize(pd.Series(np.split(feat_idx, firsts[1:])).map(tuple))
+            _, reps = np.unique(codes, return_index=True)
+        combo_codes[has_feats] = codes
+        combo_labels = [",".join(feat_labels[code] for code in feat_idx[firsts[rep]:firsts[rep] + sizes[rep]].tolist())
+                        for rep in reps.tolist()]
+    codes = combo_codes[list_codes]
+    rows = np.flatnonzero(codes >= 0)
+    return rows, codes[rows], combo_labels
+
+def get_merged_bp(seqid_codes, cat_codes, starts, ends, n_cats):
+    """Base pairs covered by the repeats of each category.
+
+    Overlapping repeats of the same category and sequence are
+    merged, so each base pair is only counted once. The union
+    is computed for all the sequences and categories at once:
+    repeats are sorted by category, sequence and start, and a
+    new merged interval begins wherever a repeat starts after
+    the end of all the previous repeats of its group.
+
+    Parameters
+    ----------
+    seqid_codes, cat_codes : `numpy.ndarray` of int
+        Sequence and category of each repeat, as integer codes.
+
+    starts, ends : `numpy.ndarray` of int
+        Coordinates of the repeats (the end is not included,
+        as in the length column).
+
+    n_cats : int
+        Number of categories.
+
+    Returns
+    -------
+    merged_bp : `numpy.ndarray` of int64
+        Covered base pairs of each category code.
+    """
+    if len(starts) == 0:
+        return np.zeros(n_cats, dtype=np.int64)
+    low = min(int(starts.min()), int(ends.min()))
+    span = max(int(starts.max()), int(ends.max())) - low + 1
+    n_seqids = int(seqid_codes.max()) + 1
+    if n_cats * n_seqids * span < 2**62:
+        #A single sort key is much faster than lexsort
+        keys = (cat_codes.astype(np.int64) * n_seqids + seqid_codes) * span + (starts - low)
+        order = np.argsort(keys)
+        del keys
+    else:
+        order = np.lexsort((starts, seqid_codes, cat_codes))
+    cat_codes = cat_codes[order]
+    group_codes = cat_codes.astype(np.int64) * n_seqids + seqid_codes[order]
+    firsts, run_starts, run_ends = get_interval_runs(group_codes, starts[order], ends[order])
+    interval_bp = np.maximum(run_ends - run_starts, 0)
+    return np.bincount(cat_codes[firsts], weights=interval_bp,
+                       minlength=n_cats).astype(np.int64)
+
+def count_tes(input_df, species_name, col="superfamily", measure="count",
+              genome_size=None, domains_mode="combination"):
     """Counts each element of the selected column.
 
     Parameters
@@ -14,23 +174,66 @@ def count_tes(input_df, species_name, col="superfamily"):
 
     col : str, default: 'superfamily'
         Column that will be selected and counted.
-        
+
+    measure : {'count', 'bp', 'merged_bp', 'genome_fraction'}, default: 'count'
+        Value computed for each element: number of repeats ('count'),
+        sum of their lengths ('bp'), base pairs they cover, merging
+        overlapping repeats of the same element in each sequence
+        ('merged_bp'), or percentage of the genome they cover
+        ('genome_fraction'). The last two require the 'seqid',
+        'start' and 'end' columns (see `merge_inputs`).
+
+    genome_size : int, optional
+        Base pairs of the genome, required by 'genome_fraction'
+        (see `get_genome_size`).
+
+    domains_mode : {'combination', 'exploded'}, default: 'combination'
+        When `col` is 'domains', count each set of domain:clade features
+        or each feature (see `encode_domains`). `input_df` is not modified.
+
     Returns
     -------
     counted_tes : `pandas.Series`
         Indexes are named after counted elements and the Series
         is named after the species it came from, so that it
         can be used as the name of the column when combining
-        different Series.
+        different Series. Elements are sorted by their value.
     """
 
+    if measure not in MEASURES:
+        raise ValueError(f"Unknown measure: {measure}")
+
     if col == "domains":
-        input_df["domains"] = input_df['domains'].apply(lambda x: ','.join(map(str, x)))
+        valid, cat_codes, cats = encode_domains(input_df["domains"], domains_mode)
+    elif measure == "count":
+        counted_tes = input_df.value_counts(col).rename(species_name).astype("int32")
+        return counted_tes
+    else:
+        cat_codes, cats = pd.factorize(input_df[col])
+        #Repeats without a category are not counted, as in value_counts
+        valid = np.flatnonzero(cat_codes >= 0)
+        cat_codes = cat_codes[valid]
+    if measure == "count":
+        values = np.bincount(cat_codes, minlength=len(cats))
+    elif measure == "bp":
+        values = np.bincount(cat_codes, minlength=len(cats),
+                             weights=input_df["length"].to_numpy()[valid])
+    else:
+        seqid_codes = pd.factorize(input_df["seqid"])[0][valid]
+        values = get_merged_bp(seqid_codes, cat_codes,
+                               input_df["start"].to_numpy()[valid],
+                               input_df["end"].to_numpy()[valid], len(cats))
+        if measure == "genome_fraction":
+            if not genome_size:
+                raise ValueError("genome_fraction requires the size of the genome")
+            values = 100 * values / genome_size
 
-    counted_tes = input_df.value_counts(col).rename(species_name).astype("int32")
+    counted_tes = pd.Series(values, index=pd.Index(np.asarray(cats), name=col),
+                            name=species_name).astype(MEASURE_DTYPES[measure])
+    counted_tes = counted_tes.sort_values(ascending=False, kind="stable")
     return counted_tes
 
-def create_te_count_matrix(list_of_inputs):
+def create_te_count_matrix(list_of_inputs, dtype="int32"):
     """Combines the series from count_tes() into a dataframe.
     
 
@@ -39,18 +242,21 @@ def create_te_count_matrix(list_of_inputs):
     list_of_inputs : list
         List containing all the `pandas.Series` to concatenate.
 
+    dtype : str, default: 'int32'
+        Datatype of the matrix (see `MEASURE_DTYPES`).
+
     Returns
     -------
     te_count_matrix : `pandas.DataFrame`
         Columns: name of the species; indexes: element. In case
         some element was not present in a species, it is filled
-        with a 0. All numbers are converted into integers,
+        with a 0. All numbers are converted into `dtype`,
         as some Series can be added as floats.
     """
     te_count_matrix = pd.DataFrame()
     for input in list_of_inputs:
         te_count_matrix = pd.concat([te_count_matrix, input], axis=1)
-    te_count_matrix = te_count_matrix.fillna(0).astype("int32")
+    te_count_matrix = te_count_matrix.fillna(0).astype(dtype)
     return te_count_matrix
 
 def filter_df_by_domain(df_to_filter, doms, clades, special_features):
@@ -94,6 +300,110 @@ def filter_df_by_domain(df_to_filter, doms, clades, special_features):
 
     return filtered_df
 
+def select_seqids(seqids, chromosomes, exclude=False, regex=False):
+    """Selects sequences by their names.
+
+    Parameters
+    ----------
+    seqids : array-like of str
+        Distinct names of the sequences.
+
+    chromosomes : list of str
+        Names of the sequences to select (include).
+
+    exclude : bool, default: False
+        If True, the given sequences are the ones not selected.
+
+    regex : bool, default: False
+        If True, `chromosomes` are regular expressions that must
+        match the whole name (e.g. 'scaffold_.*').
+
+    Returns
+    -------
+    selected : `numpy.ndarray` of bool
+        For each sequence, whether it is selected.
+    """
+    seqids = np.asarray(seqids, dtype=object)
+    if regex:
+        pattern = re.compile("|".join(f"(?:{chrom})" for chrom in chromosomes))
+        selected = np.fromiter((pattern.fullmatch(seqid) is not None for seqid in seqids),
+                               dtype=bool, count=len(seqids))
+    else:
+        selected = np.isin(seqids, list(chromosomes))
+    return ~selected if exclude else selected
+
+def get_seqid_filter(chromosomes=None, excluded=None, regex=False):
+    """Creates a function that selects the sequences to keep.
+
+    It can be given to the readers of RepeatMasker files
+    (see `read_repeatmasker_out`), so the repeats of the
+    other sequences are removed while reading.
+
+    Parameters
+    ----------
+    chromosomes, excluded : list of str, optional
+        Sequences to include and to exclude (see `select_seqids`).
+
+    regex : bool, default: False
+        If True, both lists are regular expressions.
+
+    Returns
+    -------
+    seqid_filter : function or None
+        Called with an array of distinct sequence names, it returns
+        a boolean array of the ones kept. None if no list is given.
+    """
+    if not chromosomes and not excluded:
+        return None
+
+    def seqid_filter(seqids):
+        selected = np.ones(len(seqids), dtype=bool)
+        if chromosomes:
+            selected &= select_seqids(seqids, chromosomes, regex=regex)
+        if excluded:
+            selected &= select_seqids(seqids, excluded, exclude=True, regex=regex)
+        return selected
+
+    return seqid_filter
+
+def filter_df_by_chromosomes(df_to_filter, chromosomes, exclude=False, regex=False):
+    """Filters the dataframe to keep the repeats of the given sequences.
+
+    The names are checked once for each distinct sequence, and the
+    rows are selected through the integer codes of the sequences.
+
+    Parameters
+    ----------
+    df_to_filter : `pandas.DataFrame`
+        Dataframe containing the seqid column.
+
+    chromosomes : list of str
+        Sequences (chromosomes, scaffolds...) to keep.
+
+    exclude : bool, default: False
+        If True, the repeats of `chromosomes` are removed instead.
+
+    regex : bool, default: False
+        If True, `chromosomes` are regular expressions that must
+        match the whole name of the sequences.
+
+    Returns
+    -------
+    filtered_df : `pandas.DataFrame`
+        Dataframe containing the specified data.
+    """
+    seqid_col = df_to_filter["seqid"]
+    if isinstance(seqid_col.dtype, pd.CategoricalDtype):
+        seqid_codes = seqid_col.cat.codes.to_numpy()
+        seqids = seqid_col.cat.categories
+    else:
+        seqid_codes, seqids = pd.factorize(seqid_col)
+    selected = np.append(select_seqids(seqids, chromosomes, exclude, regex), exclude)
+    #Repeats without a sequence (code -1) are only kept when excluding
+    filtered_df = df_to_filter[selected[seqid_codes]]
+
+    return filtered_df
+
 def filter_df_by_length(df_to_filter, length):
     """Filters the dataframe by eliminating rows whose length is lower than the given.
 
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+def get_density_folder_name(depth, window_size):
+    """Folder of the density files of a window size in the output of RECollector."""
+    return f"{depth}_density_{window_size}"
+
+def compute_window_density(species_df, depth, window_size, seq_lengths=None):
+    """Counts the repeats and base pairs of each category in windows along the sequences.
+
+    Each sequence is split in consecutive windows of `window_size`
+    bases (the first one starts at position 1). A repeat is counted
+    in the window of its start, and its base pairs (as in the length
+    column) are added to every window it covers. All the repeats are
+    binned at once with `numpy.bincount` over window and category
+    codes, so the time grows linearly with the number of repeats.
+
+    Parameters
+    ----------
+    species_df : `pandas.DataFrame`
+        From `merge_inputs` with `keep_coords=True`.
+
+    depth : str
+        Column of the categories.
+
+    window_size : int
+
+    seq_lengths : `pandas.Series`, optional
+        Length of each sequence (see `get_sequence_lengths`). Without
+        it, or for missing sequences, the windows of a sequence end
+        at its last repeat.
+
+    Returns
+    -------
+    density : dict of `numpy.ndarray`
+        'window_size', 'seqids' (sorted), 'seq_lengths', 'offsets'
+        (first window of each sequence, plus the number of windows),
+        'categories', 'counts' (windows x categories, int32) and 'bp'
+        (windows x categories, int64).
+    """
+    cat_codes, cats = pd.factorize(species_df[depth])
+    valid = cat_codes >= 0
+    cat_codes = cat_codes[valid]
+    seqid_codes, seqids = pd.factorize(species_df["seqid"], sort=True)
+    seqid_codes = seqid_codes[valid]
+    #0-based positions, the end excluded
+    starts = species_df["start"].to_numpy()[valid].astype(np.int64) - 1
+    ends = np.maximum(species_df["end"].to_numpy()[valid].astype(np.int64) - 1, starts)
+
+    lengths = np.zeros(len(seqids), dtype=np.int64)
+    np.maximum.at(lengths, seqid_codes, ends)
+    if seq_lengths is not None:
+        lengths = np.maximum(lengths, seq_lengths.reindex(seqids).fillna(0).to_numpy(dtype=np.int64))
+    n_windows = np.maximum(-(-lengths // window_size), 1)
+    offsets = np.append(0, np.cumsum(n_windows))
+    n_cats = len(cats)
+    n_cells = int(offsets[-1]) * n_cats
+
+    first_windows = starts // window_size
+    last_windows = np.maximum(ends - 1, starts) // window_size
+    rows = offsets[seqid_codes] + first_windows
+    counts = np.bincount(rows * n_cats + cat_codes, minlength=n_cells)
+    first_bp = np.minimum(ends, (first_windows + 1) * window_size) - starts
+
+    #Repeats that cover several windows add their bases to each one
+    spans = last_windows - first_windows
+    spanning = np.flatnonzero(spans > 0)
+    repeats = np.repeat(spanning, spans[spanning])
+    within = np.arange(len(repeats)) - np.repeat(np.cumsum(spans[spanning]) - spans[spanning],
+                                                 spans[spanning])
+    windows = first_windows[repeats] + 1 + within
+    next_bp = np.minimum(ends[repeats], (windows + 1) * window_size) - windows * window_size
+    cells = np.concatenate([rows * n_cats + cat_codes,
+                            (offsets[seqid_codes[repeats]] + windows) * n_cats + cat_codes[repeats]])
+    bp = np.bincount(cells, weights=np.concatenate([first_bp, next_bp]), minlength=n_cells)
+
+    return {"window_size": np.int64(window_size),
+            "seqids": np.asarray(seqids, dtype=str), "seq_lengths": lengths,
+            "offsets": offsets, "categories": np.asarray(cats, dtype=str),
+            "counts": counts.astype(np.int32).reshape(-1, n_cats),
+            "bp": bp.astype(np.int64).reshape(-1, n_cats)}
+
+def save_window_density(density_fpath, density):
+    """Writes the result of `compute_window_density` as a compressed .npz file."""
+    np.savez_compressed(density_fpath, **density)
+
+def load_window_density(density_fpath, value="counts"):
+    """Reads a density file as a table.
+
+    Parameters
+    ----------
+    density_fpath : path
+        .npz file written by `save_window_density`.
+
+    value : {'counts', 'bp'}, default: 'counts'
+
+    Returns
+    -------
+    density_df : `pandas.DataFrame`
+        Rows: windows, indexed by sequence and start of the window
+        (1-based); columns: categories.
+    """
+    with np.load(density_fpath) as density:
+        offsets = density["offsets"]
+        seqid_idx = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        window_starts = (np.arange(offsets[-1]) - offsets[seqid_idx]) * int(density["window_size"]) + 1
+        index = pd.MultiIndex.from_arrays([density["seqids"][seqid_idx], window_starts],
+                                          names=["seqid", "window_start"])
+        return pd.DataFrame(density[value], index=index, columns=density["categories"])
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from .intervals import get_interval_runs
+
+#Columns averaged over the fragments of an element, weighted by their length
+WEIGHTED_COLS = ["per div", "per del", "per ins"]
+
+def get_covered_bp(seqid_codes, starts, ends, query_codes, query_starts, query_ends):
+    """Base pairs of each query interval covered by a set of intervals.
+
+    The intervals are merged into disjoint runs of each sequence (see
+    `get_interval_runs`), so the covered bases before any position can
+    be read from the cumulative length of the runs with a binary search,
+    and all the queries are answered at once.
+
+    Parameters
+    ----------
+    seqid_codes, starts, ends : `numpy.ndarray` of int
+        Sequence (integer code) and coordinates of the covering
+        intervals (the end is not included, as in the length column).
+
+    query_codes, query_starts, query_ends : `numpy.ndarray` of int
+        Same for the queries.
+
+    Returns
+    -------
+    covered_bp : `numpy.ndarray` of int64
+    """
+    if len(starts) == 0 or len(query_starts) == 0:
+        return np.zeros(len(query_starts), dtype=np.int64)
+    low = min(int(starts.min()), int(query_starts.min()))
+    span = max(int(ends.max()), int(query_ends.max())) - low + 1
+    seqid_codes = seqid_codes.astype(np.int64)
+    starts = starts.astype(np.int64)
+    ends = np.maximum(ends, starts)
+    order = np.argsort(seqid_codes * span + (starts - low), kind="stable")
+    seqid_codes = seqid_codes[order]
+    firsts, run_starts, run_ends = get_interval_runs(seqid_codes, starts[order], ends[order])
+    run_lengths = run_ends - run_starts
+    bp_before = np.append(0, np.cumsum(run_lengths))
+    #Runs and queries are searched by a single key of sequence and position
+    run_starts = run_starts + seqid_codes[firsts] * span - low
+
+    def covered_before(positions):
+        runs = np.searchsorted(run_starts, positions, side="right") - 1
+        inside = np.clip(positions - run_starts[np.maximum(runs, 0)], 0,
+                         run_lengths[np.maximum(runs, 0)])
+        return np.where(runs >= 0, bp_before[np.maximum(runs, 0)] + inside, 0)
+
+    shifts = query_codes.astype(np.int64) * span - low
+    query_starts = query_starts + shifts
+    query_ends = np.maximum(query_ends + shifts, query_starts)
+    return covered_before(query_ends) - covered_before(query_starts)
+
+def resolve_fragments(species_df):
+    """Combines the fragments of each RepeatMasker element into a single repeat.
+
+    First, hits marked by RepeatMasker as overlapped by a higher-scoring
+    hit ('*') lose the bases covered by the hits that are not marked,
+    so overlapping bases are only counted once. Then, hits with the same
+    sequence and RepeatMasker ID (the fragments of an element) become a
+    single repeat: it spans from the start of the first fragment to the
+    end of the last one, its length is the sum of the (resolved) lengths
+    of the fragments, and its percentages of divergence, deletions and
+    insertions are the means of the fragments weighted by their length.
+    The rest of the columns (classification, TESorter data...) come
+    from the longest fragment. All the elements are resolved at once
+    with sorting and grouped reductions.
+
+    Parameters
+    ----------
+    species_df : `pandas.DataFrame`
+        From `merge_inputs` with `keep_coords=True`, with the "id" and
+        "overlapped" columns (see `read_repeatmasker_out`).
+
+    Returns
+    -------
+    resolved_df : `pandas.DataFrame`
+        A row for each element, in the order of their first fragment,
+        with a "fragments" column (number of fragments) instead of
+        the "id" and "overlapped" columns.
+    """
+    seqid_codes, _ = pd.factorize(species_df["seqid"])
+    starts = species_df["start"].to_numpy().astype(np.int64)
+    ends = species_df["end"].to_numpy().astype(np.int64)
+    lengths = species_df["length"].to_numpy().astype(np.int64)
+    overlapped = species_df["overlapped"].to_numpy(dtype=bool)
+
+    covered = get_covered_bp(seqid_codes[~overlapped], starts[~overlapped], ends[~overlapped],
+                             seqid_codes[overlapped], starts[overlapped], ends[overlapped])
+    resolved_lengths = lengths.copy()
+    resolved_lengths[overlapped] = np.maximum(lengths[overlapped] - covered, 0)
+
+    #Elements in the order of their first fragment
+    ids = species_df["id"].to_numpy().astype(np.int64)
+    element_codes, _ = pd.factorize(seqid_codes.astype(np.int64) * (int(ids.max(initial=0)) + 1) + ids)
+    #Fragments sorted by element, the longest one first (the
+    #first one in the file if there is a tie)
+    sort_lengths = np.maximum(lengths, 0)
+    max_length = int(sort_lengths.max(initial=0)) + 1
+    order = np.argsort(element_codes.astype(np.int64) * max_length + (max_length - 1 - sort_lengths),
+                       kind="stable")
+    sorted_codes = element_codes[order]
+    firsts = np.flatnonzero(np.append(True, sorted_codes[1:] != sorted_codes[:-1]))
+    if len(order) == 0:
+        firsts = firsts[:0]
+
+    resolved_df = species_df.iloc[order[firsts]].drop(columns=["id", "overlapped"])
+    resolved_df["start"] = np.minimum.reduceat(starts[order], firsts).astype(species_df["start"].dtype)
+    resolved_df["end"] = np.maximum.reduceat(ends[order], firsts).astype(species_df["end"].dtype)
+    resolved_df["length"] = np.add.reduceat(resolved_lengths[order], firsts).astype(species_df["length"].dtype)
+    weights = np.add.reduceat(lengths[order], firsts)
+    n_fragments = np.diff(np.append(firsts, len(order)))
+    for col in WEIGHTED_COLS:
+        values = species_df[col].to_numpy(dtype=np.float64)[order]
+        weighted = np.add.reduceat(values * lengths[order], firsts)
+        #Elements without length are averaged without weights
+        means = np.add.reduceat(values, firsts) / np.maximum(n_fragments, 1)
+        resolved_df[col] = np.where(weights > 0, weighted / np.maximum(weights, 1),
+                                    means).astype(species_df[col].dtype)
+    resolved_df["fragments"] = n_fragments.astype(np.int32)
+    return resolved_df.reset_index(drop=True)
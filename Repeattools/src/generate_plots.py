@@ -1,21 +1,81 @@
 import math
 
-import matplotlib.pyplot as plt
-import numpy as np
-import pandas as pd
-import seaborn as sns
-
-from ete3 import Tree, NodeStyle
-from matplotlib.gridspec import GridSpec
-from matplotlib.patches import Patch
-from scipy.stats import zscore
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-
-from .plot_eteTree import plot_tree
-from .utils import get_large_dfs
-
-def get_count_matrix_heatmap(matrix_df, out_file, group_dict, hsize, dendro=False):
+#matplotlib, seaborn, scipy and scikit-learn are imported inside
+#the functions that use them, so that importing this module
+#(and running --help in the CLI) stays fast
+from .landscape import landscape_to_long_df, load_landscape
+from .matrix_cache import hash_matrix, load_cached_arrays, save_cached_arrays
+from .utils import add_missing_species, get_div_sampling, read_div_file, standardize_matrix
+
+#Heatmaps with more cells than this are drawn as an image
+#(see `get_raster_heatmap`) when mode is "auto"
+RASTER_HEATMAP_CELLS = 250000
+
+def compute_linkage(data, metric="euclidean", method="average"):
+    """Hierarchical clustering of the rows of a matrix.
+
+    Uses fastcluster when it is installed (it is much faster
+    for thousands of rows), and scipy otherwise. Both give the
+    same linkage matrix that seaborn.clustermap computes.
+
+    Parameters
+    ----------
+    data : `pandas.DataFrame` or `numpy.ndarray`
+
+    metric : str, default: 'euclidean'
+        Distance metric (see `scipy.spatial.distance.pdist`).
+
+    method : str, default: 'average'
+        Linkage method (see `scipy.cluster.hierarchy.linkage`).
+
+    Returns
+    -------
+    linkage : `numpy.ndarray`
+    """
+    try:
+        from fastcluster import linkage
+    except ImportError:
+        from scipy.cluster.hierarchy import linkage
+
+    return linkage(data, method=method, metric=metric)
+
+def get_cached_linkage(data_df, metric="euclidean", method="average",
+                       cache_dir=None):
+    """Hierarchical clustering of the rows of a matrix, cached on disk.
+
+    Parameters
+    ----------
+    data_df : `pandas.DataFrame`
+
+    metric, method : str
+        See `compute_linkage`.
+
+    cache_dir : path, optional
+        If given, the linkage matrix is saved in (and loaded from)
+        this directory, keyed by the content of `data_df`, the metric
+        and the method. The distances and the clustering are then
+        skipped when the same matrix is plotted again.
+
+    Returns
+    -------
+    linkage : `numpy.ndarray`
+    """
+    #Hashing copies the whole matrix, so it is only done when caching
+    key = hash_matrix(data_df, "linkage", metric, method) if cache_dir is not None else None
+    cached = load_cached_arrays(cache_dir, "linkage", key)
+    if cached is not None:
+        return cached["linkage"]
+
+    linkage = compute_linkage(data_df, metric=metric, method=method)
+    save_cached_arrays(cache_dir, "linkage", key, linkage=linkage)
+
+    return linkage
+
+def get_count_matrix_heatmap(matrix_df, out_file, group_dict, hsize,
+                             dendro=False, mode="auto",
+                             row_linkage=None, col_linkage=None,
+                             metric="euclidean", method="average",
+                             cache_dir=None):
     """Generate heatmap from TE count matrix.
     
     Parameters
@@ -36,7 +96,30 @@ def get_count_matrix_heatmap(matrix_df, out_file, group_dict, hsize, dendro=Fals
     dendro: bool, default: False
         If True, the generated heatmap will contain a dendrogram
         for the species (rows).
+
+    mode : str, default: 'auto'
+        'mesh' draws every cell with seaborn.clustermap; 'raster'
+        draws the matrix as a single image, which is much faster
+        and lighter for thousands of species. 'auto' uses 'raster'
+        for matrices with more than `RASTER_HEATMAP_CELLS` cells.
+
+    row_linkage, col_linkage : `numpy.ndarray`, optional
+        Precomputed linkage matrices (see `compute_linkage`) of the
+        standardized matrix for the rows and the columns. If not
+        given, they are computed (or loaded from `cache_dir`).
+
+    metric, method : str, default: 'euclidean', 'average'
+        Distance metric and linkage method of the clustering
+        (seaborn.clustermap defaults).
+
+    cache_dir : path, optional
+        Directory to cache the linkage matrices
+        (see `get_cached_linkage`).
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.patches import Patch
+
     plt.rc('legend',fontsize="xx-large",title_fontsize="xx-large")
     plt.rc('axes',titlesize="x-large")
     plt.rc('axes',labelsize="x-large")
@@ -47,12 +130,30 @@ def get_count_matrix_heatmap(matrix_df, out_file, group_dict, hsize, dendro=Fals
     group_lut = dict(zip(groups, group_pal))
     group_colors = group_df.map(group_lut)
 
-    #Heatmap creation with previous standardization
-    standard_matrix = matrix_df.apply(lambda col: zscore(col) if col.std() != 0 else col, axis=0)
+    #Standardization and clustering of the categories (and species)
+    standard_matrix = standardize_matrix(matrix_df)
+    if col_linkage is None and standard_matrix.shape[1] > 1:
+        col_linkage = get_cached_linkage(standard_matrix.T, metric, method,
+                                         cache_dir)
+    if dendro and row_linkage is None and standard_matrix.shape[0] > 1:
+        row_linkage = get_cached_linkage(standard_matrix, metric, method,
+                                         cache_dir)
+
+    if mode == "auto":
+        mode = "raster" if standard_matrix.size > RASTER_HEATMAP_CELLS else "mesh"
+    if mode == "raster":
+        get_raster_heatmap(standard_matrix, out_file, group_colors,
+                           group_lut, hsize, row_linkage if dendro else None,
+                           col_linkage)
+        return
+
+    #Heatmap creation
     cm_heat = sns.clustermap(standard_matrix,
-                             cmap="magma_r", col_cluster=True,
+                             cmap="magma_r", col_cluster=col_linkage is not None,
+                             col_linkage=col_linkage,
                              row_colors=group_colors,
-                             row_cluster=dendro, figsize=hsize,
+                             row_cluster=dendro and row_linkage is not None,
+                             row_linkage=row_linkage, figsize=hsize,
                              cbar_kws={"orientation":"horizontal"}, vmin=0)
     cm_heat.ax_col_dendrogram.set_visible(False)
     dendro_box = cm_heat.ax_col_dendrogram.get_position()
@@ -62,7 +163,6 @@ def get_count_matrix_heatmap(matrix_df, out_file, group_dict, hsize, dendro=Fals
 
     #Add legend
     handles = [Patch(facecolor=group_lut[name]) for name in group_lut]
-    fontsize_scaled = math.ceil(hsize[1])
     legend_box = cm_heat.ax_col_dendrogram.get_position()
     yper = 1.5/hsize[1]
     legend_box.y0 = dendro_box.y1 + yper
@@ -76,7 +176,171 @@ def get_count_matrix_heatmap(matrix_df, out_file, group_dict, hsize, dendro=Fals
     cm_heat.ax_heatmap.set_xlabel("")
     cm_heat.savefig(out_file, dpi=250)
 
-def get_count_matrix_pca(matrix_df, out_file, group_dict, show_names=False):
+def get_raster_heatmap(standard_matrix, out_file, group_colors, group_lut,
+                       hsize, row_linkage=None, col_linkage=None,
+                       max_labels=60):
+    """Draw a clustered heatmap as a single image.
+
+    Same layout as the heatmap of seaborn.clustermap (group colors,
+    optional species dendrogram, horizontal color bar and legend on top),
+    but the matrix is drawn with `imshow` instead of one patch per cell.
+
+    Parameters
+    ----------
+    standard_matrix : `pandas.DataFrame`
+        Standardized TE count matrix (species in rows).
+
+    out_file : output file path
+
+    group_colors : `pandas.Index`
+        Color of the group of each species.
+
+    group_lut : dictionary
+        Keys: groups; values: colors.
+
+    hsize : tuple (width, height)
+        Size of the figure in inches
+
+    row_linkage, col_linkage : `numpy.ndarray`, optional
+        Linkage matrices used to order (and, for the rows,
+        draw a dendrogram of) the species and the categories.
+
+    max_labels : int, default: 60
+        Maximum number of species or categories labelled
+        in each axis.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from matplotlib.colors import to_rgb
+    from matplotlib.gridspec import GridSpec
+    from matplotlib.patches import Patch
+    from scipy.cluster.hierarchy import dendrogram, leaves_list
+
+    n_rows, n_cols = standard_matrix.shape
+    row_order = leaves_list(row_linkage) if row_linkage is not None else np.arange(n_rows)
+    col_order = leaves_list(col_linkage) if col_linkage is not None else np.arange(n_cols)
+    values = standard_matrix.to_numpy()[np.ix_(row_order, col_order)]
+
+    fig = plt.figure(figsize=hsize)
+    gs = GridSpec(2, 3, figure=fig, width_ratios=[0.15, 0.02, 0.83],
+                  height_ratios=[0.2, 0.8], wspace=0.01, hspace=0.02)
+    ax_heatmap = fig.add_subplot(gs[1, 2])
+    ax_colors = fig.add_subplot(gs[1, 1], sharey=ax_heatmap)
+    image = ax_heatmap.imshow(values, cmap="magma_r", vmin=0,
+                              aspect="auto", interpolation="nearest")
+
+    #Group colors of the species
+    row_rgb = np.array([to_rgb(color) if isinstance(color, tuple) else (1, 1, 1)
+                        for color in group_colors])[row_order]
+    ax_colors.imshow(row_rgb[:, np.newaxis, :], aspect="auto",
+                     interpolation="nearest")
+    ax_colors.set_axis_off()
+
+    if row_linkage is not None:
+        ax_dendro = fig.add_subplot(gs[1, 0])
+        dendrogram(row_linkage, orientation="left", ax=ax_dendro,
+                   no_labels=True, link_color_func=lambda k: "black")
+        for collection in ax_dendro.collections:
+            collection.set_linewidth(0.5)
+        ax_dendro.invert_yaxis()
+        ax_dendro.set_axis_off()
+
+    #Label every n-th species/category so that labels do not overlap
+    col_ticks = np.arange(0, n_cols, math.ceil(n_cols / max_labels))
+    row_ticks = np.arange(0, n_rows, math.ceil(n_rows / max_labels))
+    ax_heatmap.set_xticks(col_ticks, standard_matrix.columns[col_order[col_ticks]],
+                          rotation=90)
+    ax_heatmap.yaxis.tick_right()
+    ax_heatmap.set_yticks(row_ticks, standard_matrix.index[row_order[row_ticks]])
+
+    #Color bar and legend
+    cax = fig.add_subplot(gs[0, 2])
+    cax.set_axis_off()
+    cbar_ax = cax.inset_axes([0, 0.05, 1, 0.1])
+    fig.colorbar(image, cax=cbar_ax, orientation="horizontal")
+    handles = [Patch(facecolor=group_lut[name]) for name in group_lut]
+    cax.legend(handles, group_lut, title='Groups',
+               ncol=math.ceil(len(handles)/4),
+               loc='upper center')
+
+    fig.savefig(out_file, dpi=250)
+
+def compute_pca(matrix_df, solver="auto", batch_size=1000, cache_dir=None):
+    """Standardize a TE count matrix and compute its first two principal components.
+
+    Parameters
+    ----------
+    matrix_df : `pandas.DataFrame`
+        DataFrame in wide form, where columns are the different
+        subcategories of the chosen category, and rows are species.
+
+    solver : str, default: 'auto'
+        'auto': scikit-learn's default PCA solver; 'randomized':
+        randomized SVD (faster for wide matrices); 'incremental':
+        IncrementalPCA fitted in batches of species, so that the
+        standardized matrix is never held in memory at once.
+
+    batch_size : int, default: 1000
+        Number of species in each batch ('incremental' solver).
+
+    cache_dir : path, optional
+        If given, results are saved in (and loaded from) this
+        directory, keyed by the content of the matrix and the solver.
+
+    Returns
+    -------
+    pca_df : `pandas.DataFrame`
+        Coordinates of each species (rows) in PC1 and PC2.
+
+    loadings_df : `pandas.DataFrame`
+        Weight of each category (rows) in PC1 and PC2.
+
+    explained_variance_ratio : `numpy.ndarray`
+    """
+    import numpy as np
+    import pandas as pd
+
+    #Hashing copies the whole matrix, so it is only done when caching
+    key = hash_matrix(matrix_df, "pca", solver, batch_size) if cache_dir is not None else None
+    cached = load_cached_arrays(cache_dir, "pca", key)
+    if cached is None:
+        from sklearn.decomposition import PCA, IncrementalPCA
+        from sklearn.preprocessing import StandardScaler
+
+        if solver == "incremental":
+            #Batches must contain at least as many species as components
+            n_batches = max(1, min(math.ceil(len(matrix_df) / batch_size),
+                                   len(matrix_df) // 2))
+            batches = np.array_split(np.arange(len(matrix_df)), n_batches)
+            scaler = StandardScaler()
+            for batch in batches:
+                scaler.partial_fit(matrix_df.iloc[batch])
+            pca = IncrementalPCA(n_components=2)
+            for batch in batches:
+                pca.partial_fit(scaler.transform(matrix_df.iloc[batch]))
+            pca_data = np.concatenate([pca.transform(scaler.transform(matrix_df.iloc[batch]))
+                                       for batch in batches])
+        elif solver in ("auto", "randomized"):
+            scaled_matrix = StandardScaler().fit_transform(matrix_df)
+            pca = PCA(n_components=2, svd_solver=solver,
+                      random_state=0 if solver == "randomized" else None)
+            pca_data = pca.fit_transform(scaled_matrix)
+        else:
+            raise ValueError(f"Unknown PCA solver: {solver}")
+
+        cached = {"coordinates": pca_data, "loadings": pca.components_.T,
+                  "explained_variance_ratio": pca.explained_variance_ratio_}
+        save_cached_arrays(cache_dir, "pca", key, **cached)
+
+    pca_df = pd.DataFrame(cached["coordinates"], index=matrix_df.index,
+                          columns=['PC1', 'PC2'])
+    loadings_df = pd.DataFrame(cached["loadings"], index=matrix_df.columns,
+                               columns=['PC1', 'PC2'])
+
+    return pca_df, loadings_df, cached["explained_variance_ratio"]
+
+def get_count_matrix_pca(matrix_df, out_file, group_dict, show_names=False,
+                         solver="auto", cache_dir=None, out_csv_prefix=None):
     """Generate PCA plot from TE count matrix.
 
     Parameters
@@ -93,23 +357,37 @@ def get_count_matrix_pca(matrix_df, out_file, group_dict, show_names=False):
     
     show_names : bool, default: False
         If True, the generated plot will show the name of each point.
+
+    solver : str, default: 'auto'
+        PCA solver (see `compute_pca`).
+
+    cache_dir : path, optional
+        Directory to cache the PCA results (see `compute_pca`).
+
+    out_csv_prefix : path, optional
+        If given, the coordinates of the species and the loadings
+        of the categories are written to <prefix>_coordinates.csv
+        and <prefix>_loadings.csv.
     """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import seaborn as sns
+
     plt.rc('legend',fontsize="small")
     plt.rc("legend",title_fontsize="large")
     #Standardization of data and 2-component PCA creation
-    scaled_matrix = StandardScaler().fit_transform(matrix_df)
-
-    pca = PCA(n_components=2)
-    pca_data = pca.fit_transform(scaled_matrix)
-
-    #Gather PCA data to plot
-    pca_df = pd.DataFrame(pca_data, index=matrix_df.index,
-                          columns=['PC1', 'PC2'])
-    per_var = np.round(pca.explained_variance_ratio_ * 100, decimals=1)
+    pca_df, loadings_df, explained_variance_ratio = compute_pca(matrix_df, solver,
+                                                                cache_dir=cache_dir)
+    per_var = np.round(explained_variance_ratio * 100, decimals=1)
 
     #Assign each species to its group
     pca_df["group"] = pca_df.index.map(group_dict)
 
+    if out_csv_prefix is not None:
+        pca_df.to_csv(f"{out_csv_prefix}_coordinates.csv", index_label="species")
+        loadings_df.to_csv(f"{out_csv_prefix}_loadings.csv",
+                           index_label=matrix_df.columns.name or "category")
+
     #Plotting the results
     fig, ax = plt.subplots(figsize=(6.4, 6.4))
     sns.scatterplot(data=pca_df, x=pca_df.PC1, y=pca_df.PC2,
@@ -145,7 +423,8 @@ def get_count_matrix_pca(matrix_df, out_file, group_dict, show_names=False):
     fig.tight_layout()
     fig.savefig(out_file, dpi=300)
 
-def get_divergence_boxplots(div_file, species_and_groups, out_fpath):
+def get_divergence_boxplots(div_file, species_and_groups, out_fpath,
+                            div_reader=read_div_file):
     """Generate a box plot from a given category from RECollector divergence data.
 
     Parameters
@@ -158,7 +437,15 @@ def get_divergence_boxplots(div_file, species_and_groups, out_fpath):
         will be excluded
 
     out_fpath : output file path
+
+    div_reader : callable, default: `read_div_file`
+        Function that takes the path to a divergence file and
+        returns its DataFrame. The returned DataFrame is not
+        modified, so it can come from a cache.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.rc('legend',fontsize="x-large",title_fontsize="x-large")
     plt.rc('axes',titlesize="x-large")
     plt.rc('axes',labelsize="x-large")
@@ -170,26 +457,22 @@ def get_divergence_boxplots(div_file, species_and_groups, out_fpath):
             sp_per_group[v] = [k]
     ordered_sp = [sp for val in sp_per_group.values() for sp in val]
 
-    with open(div_file) as file:
-        div_df = get_large_dfs(file)
-        species_in_df = list(div_df["species"].unique())
-        excluded_df_species = [species for species in species_in_df if species not in species_and_groups]
-        div_df = div_df[~div_df["species"].isin(excluded_df_species)]
-        div_df.species = div_df.species.cat.remove_unused_categories()
-        print(f"Species excluded from the analysis: {', '.join(excluded_df_species)}\n")
-        cat_name = div_df.columns[1]
-        cat = list(div_df[cat_name].unique())[0]
-        div_df["group"] = div_df["species"].apply(lambda x: species_and_groups[x]).astype("category")
-        print(f"Read data for {cat} divergence")
+    div_df = div_reader(div_file)
+    species_in_df = list(div_df["species"].unique())
+    excluded_df_species = [species for species in species_in_df if species not in species_and_groups]
+    div_df = div_df[~div_df["species"].isin(excluded_df_species)].copy()
+    div_df.species = div_df.species.cat.remove_unused_categories()
+    print(f"Species excluded from the analysis: {', '.join(excluded_df_species)}\n")
+    cat_name = div_df.columns[1]
+    cat = list(div_df[cat_name].unique())[0]
+    div_df["group"] = div_df["species"].apply(lambda x: species_and_groups[x]).astype("category")
+    print(f"Read data for {cat} divergence")
+    n_rows, n_repeats = get_div_sampling(div_df)
+    if n_rows < n_repeats:
+        print(f"Plotted a sample of {n_rows} of {n_repeats} repeats (--div-sample)")
     
-    #Check if some species is not in the dataframe
-    sp_in_df = list(div_df["species"].unique())    
-    for species in ordered_sp:
-        #Add blank data if not present
-        if species not in sp_in_df:
-            empty_df = pd.DataFrame({"species": [species],
-                                        cat_name: cat, "per div": 0.0})
-            div_df = pd.concat([div_df, empty_df])
+    #Add blank data for species that are not in the dataframe
+    div_df = add_missing_species(div_df, ordered_sp, cat_name, cat)
 
     #Modify plot aspect given the number of species
     data_length = len(ordered_sp)
@@ -218,7 +501,8 @@ def get_divergence_boxplots(div_file, species_and_groups, out_fpath):
     b_plot.ax.yaxis.grid()
     b_plot.savefig(out_fpath, dpi=300)
 
-def get_divergence_violins(files_list, tree_fpath, analyzed_species, out_file):
+def get_divergence_violins(files_list, tree_fpath, analyzed_species, out_file,
+                           div_reader=read_div_file):
     """Generate violin plots given a long-form DataFrame.
 
     For a DataFrame containing divergence data from RECollector,
@@ -240,7 +524,15 @@ def get_divergence_violins(files_list, tree_fpath, analyzed_species, out_file):
         Newick tree file is given)
     
     out_file : output file path
+
+    div_reader : callable, default: `read_div_file`
+        Function that takes the path to a divergence file and
+        returns its DataFrame. The returned DataFrame is not
+        modified, so it can come from a cache.
     """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     plt.rc('axes',titlesize="xx-large")  
     plt.rc('axes',labelsize="large")
     #No tree file provided
@@ -268,28 +560,26 @@ def get_divergence_violins(files_list, tree_fpath, analyzed_species, out_file):
             else:
                 ax = axs[i]
 
-            with open(file) as div_file:
-                div_df = get_large_dfs(div_file)
-                species_in_df = list(div_df["species"].unique())
-                excluded_df_species = [species for species in species_in_df if species not in analyzed_species]
-                div_df = div_df[~div_df["species"].isin(excluded_df_species)]
-                div_df.species = div_df.species.cat.remove_unused_categories()
-                print(f"Species excluded from the analysis: {', '.join(excluded_df_species)}\n")
-                cat_name = div_df.columns[1]
-                div_df[cat_name] = div_df[cat_name].cat.remove_unused_categories()
-                cat = list(div_df[cat_name].unique())[0]
-                print(f"Read data for {cat} divergence")
+            div_df = div_reader(file)
+            species_in_df = list(div_df["species"].unique())
+            excluded_df_species = [species for species in species_in_df if species not in analyzed_species]
+            div_df = div_df[~div_df["species"].isin(excluded_df_species)].copy()
+            div_df.species = div_df.species.cat.remove_unused_categories()
+            print(f"Species excluded from the analysis: {', '.join(excluded_df_species)}\n")
+            cat_name = div_df.columns[1]
+            div_df[cat_name] = div_df[cat_name].cat.remove_unused_categories()
+            cat = list(div_df[cat_name].unique())[0]
+            print(f"Read data for {cat} divergence")
+            n_rows, n_repeats = get_div_sampling(div_df)
+            if n_rows < n_repeats:
+                print(f"Plotted a sample of {n_rows} of {n_repeats} repeats (--div-sample)")
             sp_in_df = list(div_df["species"].unique())
             if (len(sp_in_df)/len(n_species)) < 0.75:
                 print("Not enough species to proceed with the plot")
                 continue
             ax_count += 1
-            for species in n_species:
-                #Add blank data if not present
-                if species not in sp_in_df:
-                    empty_df = pd.DataFrame({"species": [species],
-                                             cat_name: cat, "per div": 0.0})
-                    div_df = pd.concat([div_df, empty_df])
+            #Add blank data for species that are not present
+            div_df = add_missing_species(div_df, n_species, cat_name, cat)
 
             #Generate violin plot for the category,
             #limit the extent of the violin within the range
@@ -320,12 +610,14 @@ def get_divergence_violins(files_list, tree_fpath, analyzed_species, out_file):
 
     #Tree file provided
     else:
+        from matplotlib.gridspec import GridSpec
+
+        from .newick import read_newick
+        from .plot_eteTree import plot_tree
+
         #Read the Newick tree
-        tree = Tree(tree_fpath)
-        nstyle = NodeStyle()
-        nstyle["hz_line_width"] = 2
-        nstyle["vt_line_width"] = 2
-        nstyle["size"] = 7
+        tree = read_newick(tree_fpath)
+        nstyle = {"hz_line_width": 2, "vt_line_width": 2, "size": 7}
         for n in tree.traverse():
             n.set_style(nstyle)
 
@@ -358,18 +650,15 @@ def get_divergence_violins(files_list, tree_fpath, analyzed_species, out_file):
                 ax = fig.add_subplot(gs[i], sharey=ax1, sharex=ax2)
             
             #Create DataFrame and check if some species is not it
-            with open(file) as div_file:
-                div_df = get_large_dfs(div_file)
-                cat_name = div_df.columns[1]
-                cat = list(div_df[cat_name].unique())[0]
-                print(f"Read data for {cat} divergence")
-            sp_in_df = list(div_df["species"].unique())
-            for species in n_species:
-                #Add blank data if not present
-                if species not in sp_in_df:
-                    empty_df = pd.DataFrame({"species": [species],
-                                             cat_name: cat, "per div": 0.0})
-                    div_df = pd.concat([div_df, empty_df])
+            div_df = div_reader(file)
+            cat_name = div_df.columns[1]
+            cat = list(div_df[cat_name].unique())[0]
+            print(f"Read data for {cat} divergence")
+            n_rows, n_repeats = get_div_sampling(div_df)
+            if n_rows < n_repeats:
+                print(f"Plotted a sample of {n_rows} of {n_repeats} repeats (--div-sample)")
+            #Add blank data for species that are not present
+            div_df = add_missing_species(div_df, n_species, cat_name, cat)
 
             #Generate violin plot for the category,
             #limit the extent of the violin within the range
@@ -393,3 +682,79 @@ def get_divergence_violins(files_list, tree_fpath, analyzed_species, out_file):
         _ = ax1.set_ylim(ymin, ymax)
 
         fig.savefig(out_file, dpi=200)
+
+def get_divergence_landscapes(landscape_fpath, out_file, analyzed_species=None,
+                              exclude=False):
+    """Generate a divergence landscape plot for each species.
+
+    For a landscape file from RECollector (--landscape), the number
+    of repeats of each category in each bin of divergence is drawn
+    as stacked bars, with one subplot per species.
+
+    Parameters
+    ----------
+    landscape_fpath : path to the RECollector landscape file
+        <output>_<depth>_landscape_<log number>.npz
+
+    out_file : output file path
+
+    analyzed_species : list, optional
+        Names of the species to plot, in the order of the plots.
+        By default, all the species of the landscape file, in
+        their order.
+
+    exclude : bool, default: False
+        If True, categories in `EXCLUDED_CATEGORIES` are not plotted.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import seaborn as sns
+
+    from .config import EXCLUDED_CATEGORIES
+
+    plt.rc('axes',titlesize="x-large")
+    plt.rc('axes',labelsize="large")
+    landscape = load_landscape(landscape_fpath)
+    landscape_df = landscape_to_long_df(landscape)
+    bin_edges = landscape["bin_edges"]
+    categories = list(landscape["categories"])
+    if exclude:
+        categories = [cat for cat in categories if cat not in EXCLUDED_CATEGORIES]
+    species_in_file = list(landscape["species"])
+    if analyzed_species is None:
+        n_species = species_in_file
+    else:
+        excluded_file_species = [species for species in species_in_file if species not in analyzed_species]
+        print(f"Species excluded from the analysis: {', '.join(excluded_file_species)}\n")
+        n_species = [species for species in analyzed_species if species in species_in_file]
+    print(f"Read landscape of {len(n_species)} species and {len(categories)} categories")
+
+    #Same color for each category in all the plots
+    cat_pal = dict(zip(categories, sns.color_palette("hls", len(categories))))
+
+    width, height = plt.rcParams.get("figure.figsize")
+    fig, axs = plt.subplots(len(n_species), 1, squeeze=False,
+                            figsize=(width*2, max(height, len(n_species)*2.5)),
+                            sharex=True, constrained_layout=True)
+    for ax, species in zip(axs[:, 0], n_species):
+        #Counts of each category (columns) in each bin (rows)
+        species_df = landscape_df[landscape_df["species"] == species]
+        counts = species_df.pivot_table(index="div", columns="category", values="count",
+                                        aggfunc="sum", fill_value=0)
+        counts = counts.reindex(index=bin_edges[:-1], columns=categories, fill_value=0)
+        bottom = np.zeros(len(counts))
+        for cat in categories:
+            ax.bar(bin_edges[:-1], counts[cat], width=np.diff(bin_edges), bottom=bottom,
+                   align="edge", color=cat_pal[cat], label=cat, linewidth=0)
+            bottom += counts[cat].to_numpy()
+        ax.set_title(species)
+        ax.set_ylabel("Number of repeats")
+        ax.spines["right"].set_visible(False)
+        ax.spines["top"].set_visible(False)
+        print(f"Generated landscape plot for {species}")
+
+    axs[-1, 0].set_xlabel("Divergence (%)")
+    axs[-1, 0].set_xlim(bin_edges[0], bin_edges[-1])
+    handles, labels = axs[0, 0].get_legend_handles_labels()
+    fig.legend(handles, labels, title="Categories", loc="outside right upper")
+    fig.savefig(out_file, dpi=200)
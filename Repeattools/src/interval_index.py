@@ -0,0 +1,279 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .intervals import get_group_max_ends
+
+#Columns of the merged table kept for each repeat (see `merge_inputs`)
+INDEX_CATEGORIES = ["class", "subclass", "superfamily", "element",
+                    "tes_order", "tes_superfamily", "clade"]
+
+#Folder of the indexes in the output of RECollector, with one
+#subfolder for each species directory
+INDEX_DIRNAME = "interval_index"
+META_FNAME = "index.json"
+
+class IntervalIndex:
+    """Repeats of a species sorted by position, for region queries.
+
+    Repeats are sorted by sequence and start. For each repeat, the
+    index also keeps the largest end of the repeats of its sequence
+    up to it, which is never lower than for the previous repeats. So
+    the repeats that overlap a region are found with two binary
+    searches (repeats starting before the end of the region, and
+    from the first one that reaches its start), and only the repeats
+    between them are checked. Saved indexes are loaded as memory maps,
+    so a query only reads the pages it needs.
+
+    Coordinates are those of RepeatMasker: 1-based, and both the
+    start and end positions belong to the repeat.
+
+    Parameters
+    ----------
+    species : str
+
+    arrays : dict of `numpy.ndarray`
+        'seqids' (sorted names of the sequences), 'offsets' (first
+        repeat of each sequence, plus the number of repeats),
+        'starts', 'ends', 'max_ends', 'per_div' and 'codes' (one
+        column for each classification column).
+
+    categories : dict
+        Names of the values of each classification column,
+        in the order of the columns of 'codes'.
+    """
+    def __init__(self, species, arrays, categories):
+        self.species = species
+        self.arrays = arrays
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.arrays["starts"])
+
+    @classmethod
+    def from_dataframe(cls, species_df, species):
+        """Builds the index of a merged table.
+
+        Parameters
+        ----------
+        species_df : `pandas.DataFrame`
+            From `merge_inputs` with `keep_coords=True`.
+
+        species : str
+
+        Returns
+        -------
+        index : `IntervalIndex`
+        """
+        seqid_codes, seqids = pd.factorize(species_df["seqid"])
+        #Names are sorted as text for `get_sequence_bounds` (the
+        #categories of a categorical column may have another order)
+        seqids = np.asarray(seqids, dtype=str)
+        seqid_order = np.argsort(seqids, kind="stable")
+        seqid_codes = np.argsort(seqid_order)[seqid_codes]
+        seqids = seqids[seqid_order]
+        starts = species_df["start"].to_numpy()
+        ends = species_df["end"].to_numpy()
+        order = np.lexsort((starts, seqid_codes))
+        seqid_codes = seqid_codes[order]
+
+        arrays = {"seqids": seqids,
+                  "offsets": np.searchsorted(seqid_codes, np.arange(len(seqids) + 1)),
+                  "starts": starts[order], "ends": ends[order]}
+        arrays["max_ends"] = get_group_max_ends(seqid_codes, arrays["ends"]).astype(ends.dtype)
+        arrays["per_div"] = species_df["per div"].to_numpy()[order]
+
+        categories = {}
+        codes = np.empty((len(order), 0), dtype=np.int32)
+        cols = [col for col in INDEX_CATEGORIES if col in species_df]
+        if cols:
+            codes = np.empty((len(order), len(cols)), dtype=np.int32)
+        for i, col in enumerate(cols):
+            col_codes, names = pd.factorize(species_df[col])
+            codes[:, i] = col_codes[order]
+            categories[col] = [str(name) for name in names]
+        arrays["codes"] = codes
+        return cls(species, arrays, categories)
+
+    def save(self, index_dir):
+        """Writes the arrays as .npy files in a folder (replacing it).
+
+        The folder is written with a temporary name and then
+        renamed, so an interrupted write leaves no partial index.
+        """
+        index_dir = Path(index_dir)
+        tmp_dir = index_dir.with_name(index_dir.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        for name, array in self.arrays.items():
+            np.save(tmp_dir / f"{name}.npy", array)
+        with open(tmp_dir / META_FNAME, "w") as meta_fhand:
+            json.dump({"species": self.species, "categories": self.categories}, meta_fhand)
+        if index_dir.exists():
+            shutil.rmtree(index_dir)
+        os.replace(tmp_dir, index_dir)
+
+    @classmethod
+    def load(cls, index_dir):
+        """Opens an index written by `save`, mapping its arrays."""
+        index_dir = Path(index_dir)
+        with open(index_dir / META_FNAME) as meta_fhand:
+            meta = json.load(meta_fhand)
+        arrays = {}
+        for array_fpath in index_dir.glob("*.npy"):
+            arrays[array_fpath.stem] = np.load(array_fpath, mmap_mode="r")
+        return cls(meta["species"], arrays, meta["categories"])
+
+    def get_sequence_bounds(self, seqid):
+        """First and last (excluded) repeat of a sequence."""
+        seqids = self.arrays["seqids"]
+        i = int(np.searchsorted(seqids, seqid))
+        if i == len(seqids) or seqids[i] != seqid:
+            return 0, 0
+        offsets = self.arrays["offsets"]
+        return int(offsets[i]), int(offsets[i + 1])
+
+    def get_rows(self, seqid, idx, distances=None):
+        """Returns the repeats at the given positions of the index as a table."""
+        rows = pd.DataFrame({"species": self.species, "seqid": seqid,
+                             "start": self.arrays["starts"][idx],
+                             "end": self.arrays["ends"][idx],
+                             "per div": self.arrays["per_div"][idx]},
+                            index=pd.RangeIndex(len(idx)))
+        codes = self.arrays["codes"][idx]
+        for i, (col, names) in enumerate(self.categories.items()):
+            #Missing values have a code of -1
+            rows[col] = np.append(np.array(names, dtype=object), None)[codes[:, i]]
+        if distances is not None:
+            rows["distance"] = distances
+        return rows
+
+    def overlap(self, seqid, start, end):
+        """Repeats that overlap a region (both positions included).
+
+        Returns
+        -------
+        hits : `pandas.DataFrame`
+            Columns: species, seqid, start, end, per div and the
+            classification columns (as strings), sorted by start.
+        """
+        first, last = self.get_sequence_bounds(seqid)
+        #Repeats that start before the end of the region...
+        last = first + np.searchsorted(self.arrays["starts"][first:last], end, side="right")
+        #...from the first one whose running maximum end reaches its start
+        first = first + np.searchsorted(self.arrays["max_ends"][first:last], start, side="left")
+        idx = first + np.flatnonzero(self.arrays["ends"][first:last] >= start)
+        return self.get_rows(seqid, idx)
+
+    def nearest(self, seqid, start, end=None):
+        """Repeats closest to a region (or a position).
+
+        Repeats that overlap the region have a distance of 0.
+        Otherwise, the closest repeats before and after the
+        region are compared, and all the repeats at the smallest
+        distance are returned.
+
+        Returns
+        -------
+        hits : `pandas.DataFrame`
+            As in `overlap`, with an additional distance column.
+        """
+        end = start if end is None else end
+        hits = self.overlap(seqid, start, end)
+        if len(hits):
+            hits["distance"] = 0
+            return hits
+        first, last = self.get_sequence_bounds(seqid)
+        if first == last:
+            return self.get_rows(seqid, np.array([], dtype=np.int64), [])
+        starts = self.arrays["starts"][first:last]
+        after = int(np.searchsorted(starts, end, side="right"))
+        #No repeat overlaps, so all the repeats before `after` end
+        #before the region, the closest one with the largest end
+        left_dist = start - int(self.arrays["max_ends"][first + after - 1]) if after > 0 else None
+        right_dist = int(starts[after]) - end if after < len(starts) else None
+        dist = min(d for d in [left_dist, right_dist] if d is not None)
+        idx = []
+        if left_dist == dist:
+            idx.append(np.flatnonzero(self.arrays["ends"][first:first + after] == start - dist))
+        if right_dist == dist:
+            idx.append(after + np.flatnonzero(starts[after:] == end + dist))
+        idx = first + np.concatenate(idx)
+        return self.get_rows(seqid, idx, np.full(len(idx), dist))
+
+def query_index(index, regions, nearest=False):
+    """Queries several regions in the index of a species.
+
+    Parameters
+    ----------
+    index : `IntervalIndex`
+
+    regions : list of (str, int, int)
+        Sequence, start and end of each region.
+
+    nearest : bool, default: False
+        If True, the closest repeats of each region are
+        returned instead of the overlapping ones.
+
+    Returns
+    -------
+    hits : `pandas.DataFrame`
+        Repeats of every region, with a region column.
+    """
+    hits = []
+    for seqid, start, end in regions:
+        if nearest:
+            region_hits = index.nearest(seqid, start, end)
+        else:
+            region_hits = index.overlap(seqid, start, end)
+        region_hits.insert(0, "region", f"{seqid}:{start}-{end}")
+        hits.append(region_hits)
+    return pd.concat(hits, ignore_index=True)
+
+def query_indexes(index_dirs, regions, nearest=False, counts=None):
+    """Queries several regions in the indexes of several species.
+
+    Parameters
+    ----------
+    index_dirs : list of paths
+        Folders written by `IntervalIndex.save`.
+
+    regions, nearest
+        As in `query_index`.
+
+    counts : str, optional
+        Classification column. If given, the repeats found
+        are counted instead of returned (see `count_tes`).
+
+    Returns
+    -------
+    hits : `pandas.DataFrame`
+        Repeats of every species and region or, with `counts`,
+        the TE count matrix of the repeats (categories x species).
+    """
+    from .create_matrix import count_tes, create_te_count_matrix
+
+    hits = []
+    for index_dir in index_dirs:
+        index = IntervalIndex.load(index_dir)
+        species_hits = query_index(index, regions, nearest)
+        if counts:
+            hits.append(count_tes(species_hits, index.species, counts))
+        else:
+            hits.append(species_hits)
+    if counts:
+        return create_te_count_matrix(hits)
+    return pd.concat(hits, ignore_index=True)
+
+def find_index_dirs(out_folders):
+    """Index folders of the species of several RECollector outputs, sorted by species directory."""
+    index_dirs = []
+    for out_folder in out_folders:
+        index_root = Path(out_folder) / INDEX_DIRNAME
+        index_dirs.extend(sorted(meta_fpath.parent for meta_fpath in index_root.glob(f"*/{META_FNAME}")))
+    return index_dirs
@@ -0,0 +1,64 @@
+import numpy as np
+
+def get_group_max_ends(group_codes, ends):
+    """Running maximum of the ends of the intervals of each group.
+
+    Groups are shifted apart (each one by a multiple of the range of
+    the ends), so a single running maximum of all the intervals never
+    crosses from one group to the next.
+
+    Parameters
+    ----------
+    group_codes : `numpy.ndarray` of int
+        Group of each interval, with the intervals of each
+        group next to each other (e.g. sorted by group).
+
+    ends : `numpy.ndarray` of int
+
+    Returns
+    -------
+    max_ends : `numpy.ndarray` of int64
+        Largest end of the intervals of each group up to each one.
+    """
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(ends) == 0:
+        return ends.copy()
+    new_group = np.ones(len(ends), dtype=bool)
+    new_group[1:] = group_codes[1:] != group_codes[:-1]
+    low = int(ends.min())
+    span = int(ends.max()) - low + 1
+    shifts = (np.cumsum(new_group) - 1) * span - low
+    return np.maximum.accumulate(ends + shifts) - shifts
+
+def get_interval_runs(group_codes, starts, ends):
+    """Union of the intervals of each group, as disjoint runs.
+
+    A run begins wherever an interval starts after the end of all
+    the previous intervals of its group (see `get_group_max_ends`),
+    so intervals that overlap or touch belong to the same run.
+
+    Parameters
+    ----------
+    group_codes : `numpy.ndarray` of int
+        Group of each interval (e.g. sequence, or sequence and
+        category), sorted by group and start.
+
+    starts, ends : `numpy.ndarray` of int
+        Coordinates of the intervals (the end is not included,
+        as in the length column).
+
+    Returns
+    -------
+    firsts : `numpy.ndarray` of int
+        Position of the first interval of each run.
+
+    run_starts, run_ends : `numpy.ndarray` of int64
+        Coordinates of the runs, in the order of the intervals.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    max_ends = get_group_max_ends(group_codes, ends)
+    new_run = np.ones(len(starts), dtype=bool)
+    new_run[1:] = (group_codes[1:] != group_codes[:-1]) | (starts[1:] > max_ends[:-1])
+    firsts = np.flatnonzero(new_run)
+    lasts = np.append(firsts[1:], len(starts)) - 1
+    return firsts, starts[firsts], max_ends[lasts]
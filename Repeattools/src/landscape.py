@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+#Divergence (in %) covered by the bins; higher values go to the last bin
+MAX_DIVERGENCE = 100.0
+
+def get_landscape_folder_name(depth):
+    """Folder of the landscapes of each species in the output of RECollector."""
+    return f"{depth}_landscape"
+
+def compute_landscape(species_df, depth, bin_width=1.0):
+    """Counts the repeats of each category in bins of divergence.
+
+    Parameters
+    ----------
+    species_df : `pandas.DataFrame`
+        Dataframe with the "per div" column and the `depth` column.
+
+    depth : str
+        Column of the categories.
+
+    bin_width : float, default: 1.0
+        Width of the bins, in percentage of divergence. Bins go
+        from 0 to 100%; repeats without divergence are not counted.
+
+    Returns
+    -------
+    landscape : dict of `numpy.ndarray`
+        'categories', 'bin_edges' and 'counts' (categories x bins, int32).
+    """
+    bin_edges = get_bin_edges(bin_width)
+    n_bins = len(bin_edges) - 1
+    cat_codes, cats = pd.factorize(species_df[depth])
+    per_div = species_df["per div"].to_numpy(dtype=np.float64)
+    valid = (cat_codes >= 0) & ~np.isnan(per_div)
+    bins = np.clip(np.floor(per_div[valid] / bin_width), 0, n_bins - 1).astype(np.int64)
+    counts = np.bincount(cat_codes[valid] * n_bins + bins, minlength=len(cats) * n_bins)
+    return {"categories": np.asarray(cats, dtype=str), "bin_edges": bin_edges,
+            "counts": counts.astype(np.int32).reshape(len(cats), n_bins)}
+
+def get_bin_edges(bin_width):
+    n_bins = int(np.ceil(MAX_DIVERGENCE / bin_width))
+    return np.arange(n_bins + 1) * bin_width
+
+def save_landscape(landscape_fpath, landscape):
+    """Writes a landscape (of a species or combined) as a compressed .npz file."""
+    np.savez_compressed(landscape_fpath, **landscape)
+
+def load_landscape(landscape_fpath):
+    """Reads a landscape written by `save_landscape`.
+
+    Returns
+    -------
+    landscape : dict of `numpy.ndarray`
+    """
+    with np.load(landscape_fpath) as landscape:
+        return {name: landscape[name] for name in landscape.files}
+
+def combine_landscapes(species_landscapes):
+    """Combines the landscapes of several species into a single tensor.
+
+    Parameters
+    ----------
+    species_landscapes : list of (str, dict)
+        Name of each species and its landscape (from `compute_landscape`).
+        All of them must have the same bins.
+
+    Returns
+    -------
+    landscape : dict of `numpy.ndarray`
+        'species', 'categories' (in order of appearance), 'bin_edges'
+        and 'counts' (species x categories x bins, int32).
+    """
+    bin_edges = species_landscapes[0][1]["bin_edges"] if species_landscapes else get_bin_edges(1.0)
+    categories = {}
+    for _, landscape in species_landscapes:
+        if not np.array_equal(landscape["bin_edges"], bin_edges):
+            raise ValueError("Landscapes with different bins cannot be combined")
+        for cat in landscape["categories"].tolist():
+            categories.setdefault(cat, len(categories))
+    counts = np.zeros((len(species_landscapes), len(categories), len(bin_edges) - 1),
+                      dtype=np.int32)
+    for i, (_, landscape) in enumerate(species_landscapes):
+        cat_idx = [categories[cat] for cat in landscape["categories"].tolist()]
+        counts[i, cat_idx] = landscape["counts"]
+    return {"species": np.array([species for species, _ in species_landscapes], dtype=str),
+            "categories": np.array(list(categories), dtype=str),
+            "bin_edges": bin_edges, "counts": counts}
+
+def landscape_to_long_df(landscape):
+    """Converts a combined landscape into a long-form table (for plotting).
+
+    Returns
+    -------
+    landscape_df : `pandas.DataFrame`
+        Columns: species, category, div (start of the bin) and
+        count. Only bins with repeats are included.
+    """
+    species_idx, cat_idx, bin_idx = np.nonzero(landscape["counts"])
+    return pd.DataFrame({"species": landscape["species"][species_idx],
+                         "category": landscape["categories"][cat_idx],
+                         "div": landscape["bin_edges"][bin_idx],
+                         "count": landscape["counts"][species_idx, cat_idx, bin_idx]})
+
+def write_species_landscapes(checkpoint_species, landscape_folder, landscape_fpath):
+    """Combines the saved landscapes of the species of a run into a tensor file.
+
+    Parameters
+    ----------
+    checkpoint_species : list of dict
+        Species recorded in the checkpoint of the run (with their
+        'name' and 'dir'), in the order of the tensor.
+
+    landscape_folder : path
+        Folder with the landscape of each species, named after
+        its directory.
+
+    landscape_fpath : path
+        .npz file of the combined landscape.
+
+    Returns
+    -------
+    landscape : dict of `numpy.ndarray`
+        From `combine_landscapes`.
+    """
+    species_landscapes = [(species["name"], load_landscape(landscape_folder / f"{species['dir']}.npz"))
+                          for species in checkpoint_species]
+    landscape = combine_landscapes(species_landscapes)
+    save_landscape(landscape_fpath, landscape)
+    return landscape
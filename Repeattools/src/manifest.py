@@ -0,0 +1,133 @@
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .compression import has_extension, open_input
+
+#RepeatMasker and TESorter files smaller than this are read to check
+#that they contain data (and not only the header). Larger files can
+#not consist only of the header, so only their size is checked
+MIN_UNCHECKED_FILE_SIZE = 65536
+
+SpeciesFiles = namedtuple("SpeciesFiles", ["species", "dir_name", "rm_path", "te_path",
+                                           "rm_size", "te_size", "rm_mtime", "te_mtime"])
+
+def has_lines(fpath, size, n_lines):
+    """Checks whether a file contains at least `n_lines` lines.
+
+    The file is only opened if it is smaller than `MIN_UNCHECKED_FILE_SIZE`
+    (compressed files are decompressed).
+    """
+    if size == 0:
+        return False
+    if size >= MIN_UNCHECKED_FILE_SIZE:
+        return True
+    with open_input(fpath, parallel=False) as fhand:
+        return sum(1 for _ in fhand) >= n_lines
+
+def scan_species_dir(dir_path, dir_name, species):
+    """Finds and checks the RepeatMasker and TESorter files of a species.
+
+    Files can be compressed with gzip (.out.gz, .cls.tsv.gz) or
+    zstd (.out.zst, .cls.tsv.zst).
+
+    Parameters
+    ----------
+    dir_path : path to the species directory
+
+    dir_name : str
+        Name of the directory in the names file.
+
+    species : str
+        Name of the species.
+
+    Returns
+    -------
+    species_files : `SpeciesFiles` or None
+
+    error : str or None
+        Reason why the species cannot be processed.
+    """
+    rm_entries = []
+    te_entries = []
+    with os.scandir(dir_path) as dir_entries:
+        for entry in dir_entries:
+            if has_extension(entry.name, ".out") and entry.is_file():
+                rm_entries.append(entry)
+            elif has_extension(entry.name, ".cls.tsv") and entry.is_file():
+                te_entries.append(entry)
+
+    #Check that each species contains both files
+    if len(rm_entries) != 1:
+        return None, f"{dir_name}: RepeatMasker file was not found/file must end in .out and be the only one\n"
+    if len(te_entries) != 1:
+        return None, f"{dir_name}: TESorter file was not found/file must end in .cls.tsv and be the only one\n"
+
+    rm_stat = rm_entries[0].stat()
+    te_stat = te_entries[0].stat()
+    #Check that those files are not empty and contain at least one read
+    if not has_lines(rm_entries[0].path, rm_stat.st_size, 4):
+        return None, f"{dir_name}: RepeatMasker file was empty\n"
+    if not has_lines(te_entries[0].path, te_stat.st_size, 2):
+        return None, f"{dir_name}: TESorter file was empty\n"
+
+    species_files = SpeciesFiles(species, dir_name, Path(rm_entries[0].path),
+                                 Path(te_entries[0].path), rm_stat.st_size,
+                                 te_stat.st_size, rm_stat.st_mtime, te_stat.st_mtime)
+    return species_files, None
+
+def scan_input_dir(root_dir, dir_species, max_workers=8):
+    """Builds the manifest of the species to process by RECollector.
+
+    The input directory is walked once with `os.scandir`, and the
+    species directories are checked concurrently.
+
+    Parameters
+    ----------
+    root_dir : path
+        Directory with a subdirectory for each species.
+
+    dir_species : dict
+        Names of the directories of the species to process and
+        names of the species (from `read_names_file`).
+
+    max_workers : int, default: 8
+        Number of directories checked at the same time.
+
+    Returns
+    -------
+    manifest : list of `SpeciesFiles`
+        Species that can be processed, sorted by directory name.
+
+    ignored_dirs : list of str
+        Directories that are not in `dir_species`.
+
+    failed_dirs : list of str
+        Reasons why directories of `dir_species` cannot be processed.
+    """
+    ignored_dirs = []
+    species_dirs = []
+    with os.scandir(root_dir) as dir_entries:
+        for entry in sorted(dir_entries, key=lambda entry: entry.name):
+            if not entry.is_dir():
+                continue
+            if entry.name not in dir_species:
+                ignored_dirs.append(entry.name)
+                continue
+            species_dirs.append((entry.path, entry.name, dir_species[entry.name]))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(lambda args: scan_species_dir(*args), species_dirs))
+
+    manifest = [species_files for species_files, _ in results if species_files is not None]
+    failed_dirs = [error for _, error in results if error is not None]
+
+    return manifest, ignored_dirs, failed_dirs
+
+def write_manifest(manifest, out_fpath):
+    """Writes the manifest as a tab-separated file."""
+    with open(out_fpath, "w") as out_fhand:
+        out_fhand.write("\t".join(SpeciesFiles._fields) + "\n")
+        for species_files in manifest:
+            out_fhand.write("\t".join(map(str, species_files)) + "\n")
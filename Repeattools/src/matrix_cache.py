@@ -0,0 +1,84 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+def hash_matrix(matrix_df, *params):
+    """Creates a key for the content of a matrix and the parameters used with it.
+
+    Parameters
+    ----------
+    matrix_df : `pandas.DataFrame`
+
+    params : str, int, float...
+        Parameters of the computation (e.g. metric and method),
+        so that different computations on the same matrix
+        get different keys.
+
+    Returns
+    -------
+    key : str
+        SHA-1 hexdigest of the values, index, columns and parameters.
+    """
+    sha = hashlib.sha1()
+    sha.update(str(matrix_df.shape).encode())
+    sha.update(np.ascontiguousarray(matrix_df.to_numpy(dtype="float64")).tobytes())
+    sha.update("\0".join(map(str, matrix_df.index)).encode())
+    sha.update("\0".join(map(str, matrix_df.columns)).encode())
+    sha.update(repr(params).encode())
+    return sha.hexdigest()
+
+def load_cached_arrays(cache_dir, name, key):
+    """Loads the arrays saved by `save_cached_arrays`.
+
+    Parameters
+    ----------
+    cache_dir : path to the cache directory, or None
+
+    name : str
+        Kind of data (e.g. 'pca', 'linkage').
+
+    key : str
+        Key from `hash_matrix`.
+
+    Returns
+    -------
+    arrays : dict of `numpy.ndarray`, or None if they were not cached
+    """
+    if cache_dir is None:
+        return None
+    cache_fpath = Path(cache_dir) / f"{name}_{key}.npz"
+    if not cache_fpath.exists():
+        return None
+    with np.load(cache_fpath) as cached:
+        return {array_name: cached[array_name] for array_name in cached.files}
+
+def save_cached_arrays(cache_dir, name, key, **arrays):
+    """Saves arrays in the cache directory.
+
+    The file is written to a temporary file first and then renamed,
+    so interrupted runs never leave incomplete cache files.
+
+    Parameters
+    ----------
+    cache_dir : path to the cache directory, or None (nothing is saved)
+
+    name : str
+        Kind of data (e.g. 'pca', 'linkage').
+
+    key : str
+        Key from `hash_matrix`.
+
+    arrays : `numpy.ndarray`
+        Arrays to save, by name.
+    """
+    if cache_dir is None:
+        return
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_fd, tmp_fpath = tempfile.mkstemp(dir=cache_dir, suffix=".npz.tmp")
+    with os.fdopen(tmp_fd, "wb") as tmp_fhand:
+        np.savez(tmp_fhand, **arrays)
+    os.replace(tmp_fpath, cache_dir / f"{name}_{key}.npz")
@@ -0,0 +1,160 @@
+#Same values as the default ete3.NodeStyle, so that trees are drawn
+#identically with and without ete3
+DEFAULT_NODE_STYLE = {"fgcolor": "#0030c1", "bgcolor": "#FFFFFF",
+                      "vt_line_color": "#000000", "hz_line_color": "#000000",
+                      "hz_line_type": 0, "vt_line_type": 0, "size": 3,
+                      "shape": "circle", "draw_descendants": True,
+                      "hz_line_width": 0, "vt_line_width": 0}
+
+class TreeNode:
+    """Lightweight node of a phylogenetic tree read from a Newick file.
+
+    It provides the subset of the ete3.TreeNode interface used
+    by `plot_tree`, so that trees can be drawn without ete3 (and PyQt5).
+
+    Parameters
+    ----------
+    name : str, default: ''
+
+    dist : float, default: 1.0
+        Length of the branch leading to the node.
+    """
+    def __init__(self, name="", dist=1.0):
+        self.name = name
+        self.dist = dist
+        self.children = []
+        self.up = None
+        self.style = dict(DEFAULT_NODE_STYLE)
+
+    def __repr__(self):
+        return f"TreeNode(name={self.name!r}, dist={self.dist})"
+
+    def add_child(self, child):
+        child.up = self
+        self.children.append(child)
+        return child
+
+    def is_leaf(self):
+        return not self.children
+
+    def is_root(self):
+        return self.up is None
+
+    def traverse(self, strategy="preorder"):
+        """Iterates over the node and its descendants without recursion.
+
+        Parameters
+        ----------
+        strategy : str, default: 'preorder'
+            'preorder' (parents before children) or 'postorder'
+            (children before parents). Children are always
+            visited from left to right.
+        """
+        if strategy == "preorder":
+            stack = [self]
+            while stack:
+                node = stack.pop()
+                yield node
+                stack.extend(reversed(node.children))
+        elif strategy == "postorder":
+            #Reversed "parent, then children from right to left" order
+            stack = [self]
+            reverse_postorder = []
+            while stack:
+                node = stack.pop()
+                reverse_postorder.append(node)
+                stack.extend(node.children)
+            yield from reversed(reverse_postorder)
+        else:
+            raise ValueError(f"Unknown traversal strategy: {strategy}")
+
+    def iter_leaves(self):
+        return (node for node in self.traverse() if node.is_leaf())
+
+    def get_leaves(self):
+        return list(self.iter_leaves())
+
+    def get_leaf_names(self):
+        return [leaf.name for leaf in self.iter_leaves()]
+
+    def set_style(self, style):
+        self.style = dict(DEFAULT_NODE_STYLE)
+        if style is not None:
+            self.style.update(style)
+
+    def _get_style(self):
+        return self.style
+
+def read_newick(newick):
+    """Reads a tree in Newick format.
+
+    Names can be quoted, and comments between square brackets
+    (e.g. NHX annotations) are ignored. Branches without a length
+    get a length of 1.0, except the root (0.0), as in ete3. The
+    parser does not use recursion, so trees of any depth can be read.
+
+    Parameters
+    ----------
+    newick : str or path
+        Path to a Newick file, or a Newick string.
+
+    Returns
+    -------
+    tree : `TreeNode`
+        Root of the tree.
+    """
+    #Newick strings end with ";", anything else is a file path
+    if not str(newick).strip().endswith(";"):
+        with open(newick) as newick_fhand:
+            newick = newick_fhand.read()
+    newick = newick.strip()
+    if not newick.endswith(";"):
+        raise ValueError("Newick tree must end with ';'")
+
+    root = TreeNode(dist=0.0)
+    node = root
+    #Text read since the last delimiter: "name" or "name:length"
+    label = []
+    i = 0
+    end = len(newick) - 1
+
+    def set_label(node, label):
+        label = "".join(label).strip()
+        if label.rfind(":") > max(label.rfind("'"), label.rfind('"')):
+            name, dist = label.rsplit(":", 1)
+            node.dist = float(dist)
+        else:
+            name = label
+        node.name = name.strip().strip("'\"")
+
+    while i < end:
+        char = newick[i]
+        if char == "(":
+            node = node.add_child(TreeNode())
+        elif char == ",":
+            set_label(node, label)
+            label = []
+            if node.up is None:
+                raise ValueError(f"Unexpected ',' at position {i} of the Newick tree")
+            node = node.up.add_child(TreeNode())
+        elif char == ")":
+            set_label(node, label)
+            label = []
+            node = node.up
+            if node is None:
+                raise ValueError(f"Unbalanced ')' at position {i} of the Newick tree")
+        elif char == "[":
+            i = newick.index("]", i)
+        elif char in "'\"":
+            closing = newick.index(char, i + 1)
+            label.append(newick[i:closing + 1])
+            i = closing
+        else:
+            label.append(char)
+        i += 1
+
+    if node is not root:
+        raise ValueError("Unbalanced '(' in the Newick tree")
+    set_label(root, label)
+
+    return root
@@ -0,0 +1,268 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+#Marks the end of the items of a queue
+_END = object()
+
+class PipelineError(Exception):
+    """Error of a background stage of the pipeline.
+
+    The original exception is chained as its cause.
+
+    Parameters
+    ----------
+    stage : str
+
+    item : object
+        Item whose processing failed.
+
+    name : str, optional
+        Name of the item in the message (by default, the item).
+    """
+    def __init__(self, stage, item, name=None):
+        self.name = str(item) if name is None else name
+        super().__init__(f"The {stage} stage failed for {self.name}")
+        self.stage = stage
+        self.item = item
+
+class StageClock:
+    """Time that a stage of the pipeline spends working and waiting.
+
+    Parameters
+    ----------
+    name : str
+    """
+    def __init__(self, name):
+        self.name = name
+        self.busy_s = 0.0
+        self.wait_s = 0.0
+        self.items = 0
+
+    @contextmanager
+    def busy(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy_s += time.perf_counter() - start
+            self.items += 1
+
+    @contextmanager
+    def waiting(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.wait_s += time.perf_counter() - start
+
+def put_until_stopped(items_queue, item, stop):
+    """Puts an item in a bounded queue, unless `stop` is set while waiting.
+
+    Returns
+    -------
+    put : bool
+    """
+    while not stop.is_set():
+        try:
+            items_queue.put(item, timeout=0.05)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+class Prefetcher:
+    """Applies a function to items in a background thread, ahead of their use.
+
+    Iterating over the prefetcher yields `(item, result)` in the order
+    of the items. At most `depth` results wait in the queue, so the
+    memory used is capped by `depth` (plus the item being processed).
+    With `depth=0`, each item is processed when it is requested,
+    without any thread.
+
+    Parameters
+    ----------
+    items : iterable
+
+    func : callable
+        Function applied to each item.
+
+    depth : int, default: 1
+        Number of results prepared in advance.
+
+    name : str, default: 'reader'
+        Name of the stage in errors and in the utilization report.
+
+    consumer_clock : `StageClock`, optional
+        Clock of the stage that uses the results, in which the
+        time spent waiting for them is recorded.
+
+    describe : callable, optional
+        Function that gives the name of an item in errors
+        (by default, the item itself).
+
+    Raises
+    ------
+    PipelineError
+        If `func` fails, when its item is reached.
+    """
+    def __init__(self, items, func, depth=1, name="reader", consumer_clock=None,
+                 describe=None):
+        self.items = items
+        self.func = func
+        self.describe = describe or str
+        self.depth = depth
+        self.clock = StageClock(name)
+        self.consumer_clock = consumer_clock or StageClock("consumer")
+        self._stop = threading.Event()
+        self._thread = None
+        if depth > 0:
+            self._results = queue.Queue(maxsize=depth)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        for item in self.items:
+            if self._stop.is_set():
+                return
+            error = None
+            with self.clock.busy():
+                try:
+                    result = self.func(item)
+                except Exception as e:
+                    result, error = None, e
+            with self.clock.waiting():
+                if not put_until_stopped(self._results, (item, result, error), self._stop):
+                    return
+            if error is not None:
+                return
+        put_until_stopped(self._results, _END, self._stop)
+
+    def __iter__(self):
+        if self._thread is None:
+            for item in self.items:
+                with self.consumer_clock.waiting(), self.clock.busy():
+                    try:
+                        result = self.func(item)
+                    except Exception as e:
+                        raise PipelineError(self.clock.name, item, self.describe(item)) from e
+                yield item, result
+            return
+        while True:
+            with self.consumer_clock.waiting():
+                next_result = self._results.get()
+            if next_result is _END:
+                return
+            item, result, error = next_result
+            if error is not None:
+                raise PipelineError(self.clock.name, item, self.describe(item)) from error
+            yield item, result
+
+    def close(self):
+        """Stops the thread, discarding the results that were not used."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+class BackgroundWriter:
+    """Runs jobs (e.g. writing files) in order in a background thread.
+
+    At most `depth` jobs wait in the queue: `submit` blocks while
+    the queue is full, which caps the memory used by the data of
+    the pending jobs. With `depth=0`, jobs run when they are submitted.
+
+    Parameters
+    ----------
+    depth : int, default: 1
+
+    name : str, default: 'writer'
+        Name of the stage in errors and in the utilization report.
+    """
+    def __init__(self, depth=1, name="writer"):
+        self.depth = depth
+        self.clock = StageClock(name)
+        self._error = None
+        self._thread = None
+        if depth > 0:
+            self._jobs = queue.Queue(maxsize=depth)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self.clock.waiting():
+                job = self._jobs.get()
+            if job is _END:
+                return
+            item, func, args = job
+            if self._error is not None:
+                #Jobs after a failed one are discarded
+                continue
+            with self.clock.busy():
+                try:
+                    func(*args)
+                except Exception as e:
+                    self._error = PipelineError(self.clock.name, item)
+                    self._error.__cause__ = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, item, func, *args):
+        """Queues `func(*args)`; `item` identifies the job in errors.
+
+        Raises
+        ------
+        PipelineError
+            If a previous job failed.
+        """
+        self._raise_error()
+        if self._thread is None:
+            with self.clock.busy():
+                try:
+                    func(*args)
+                except Exception as e:
+                    raise PipelineError(self.clock.name, item) from e
+            return
+        #The thread keeps taking jobs after an error, so this never blocks forever
+        self._jobs.put((item, func, args))
+
+    def close(self):
+        """Waits for the pending jobs to finish.
+
+        Raises
+        ------
+        PipelineError
+            If a job failed.
+        """
+        if self._thread is not None:
+            self._jobs.put(_END)
+            self._thread.join()
+            self._thread = None
+        self._raise_error()
+
+def format_utilization(clocks, wall_s):
+    """Summarizes the time each stage spent working and waiting.
+
+    Parameters
+    ----------
+    clocks : list of `StageClock`
+
+    wall_s : float
+        Duration of the whole pipeline, in seconds.
+
+    Returns
+    -------
+    msg : str
+        One line for each stage.
+    """
+    msg = ""
+    for clock in clocks:
+        utilization = 100 * clock.busy_s / wall_s if wall_s > 0 else 0.0
+        msg += (f"{clock.name}: {clock.items} items, busy {clock.busy_s:.2f} s "
+                f"({utilization:.1f}%), waiting {clock.wait_s:.2f} s\n")
+    return msg
@@ -1,14 +1,14 @@
 #Made by Francois Serra (@fransua in GitHub)
 #https://gist.github.com/fransua/da703c3d2ba121903c0de5e976838b71
 
-import builtins as __builtin__
-from itertools import chain
+#Adapted to draw trees without ete3 (see newick.py), computing
+#the coordinates of the nodes in a single traversal
+
 from math import floor
 
 import matplotlib.pyplot as plt
 import numpy as np
 
-from ete3 import Tree
 from matplotlib.collections import LineCollection
 
 def round_sig(x, sig=2):
@@ -23,9 +23,9 @@ def to_coord(x, y, xmin, xmax, ymin, ymax, plt_xmin, plt_ymin, plt_width, plt_he
 
 def plot_tree(tree, align_names=False, name_offset=None, max_dist=None, font_size=9, axe=None, **kwargs):
     """
-    Plots a ete3.Tree object using matploltib.
+    Plots a tree using matploltib.
     
-    :param tree: ete Tree object
+    :param tree: `newick.TreeNode` or ete Tree object (ete3 is not required)
     :param False align_names: if True names will be aligned vertically
     :param None max_dist: if defined any branch longer than the given value will be 
        reduced by this same value.
@@ -44,28 +44,28 @@ def plot_tree(tree, align_names=False, name_offset=None, max_dist=None, font_siz
     
     def __draw_edge_nm(c, x):
         h = node_pos[c]
-        hlinec.append(((x, h), (x + c.dist, h)))
+        hlinec.append(((x, h), (x + dists[c], h)))
         hlines.append(cstyle)
-        return (x + c.dist, h)
+        return (x + dists[c], h)
 
     def __draw_edge_md(c, x):
         h = node_pos[c]
         if c in cut_edge:
             offset = max_x / 600.
-            hlinec.append(((x, h), (x + c.dist / 2 - offset, h)))
+            hlinec.append(((x, h), (x + dists[c] / 2 - offset, h)))
             hlines.append(cstyle)
-            hlinec.append(((x + c.dist / 2 + offset, h), (x + c.dist, h)))
+            hlinec.append(((x + dists[c] / 2 + offset, h), (x + dists[c], h)))
             hlines.append(cstyle)
-            hlinec.append(((x + c.dist / 2, h - 0.05), (x + c.dist / 2 - 2 * offset, h + 0.05)))
+            hlinec.append(((x + dists[c] / 2, h - 0.05), (x + dists[c] / 2 - 2 * offset, h + 0.05)))
             hlines.append(cstyle)
-            hlinec.append(((x + c.dist / 2 + 2 * offset, h - 0.05), (x + c.dist / 2, h + 0.05)))
+            hlinec.append(((x + dists[c] / 2 + 2 * offset, h - 0.05), (x + dists[c] / 2, h + 0.05)))
             hlines.append(cstyle)
-            axe.text(x + c.dist / 2, h - 0.07, '+%g' % max_dist, va='top', 
+            axe.text(x + dists[c] / 2, h - 0.07, '+%g' % max_dist, va='top', 
                      ha='center', size=2. * font_size / 3)
         else:
-            hlinec.append(((x, h), (x + c.dist, h)))
+            hlinec.append(((x, h), (x + dists[c], h)))
             hlines.append(cstyle)
-        return (x + c.dist, h)
+        return (x + dists[c], h)
 
     __draw_edge = __draw_edge_nm if max_dist is None else __draw_edge_md
     
@@ -77,30 +77,45 @@ def plot_tree(tree, align_names=False, name_offset=None, max_dist=None, font_siz
     nodex = []
     nodey = []
     ali_lines = []
-    
-    # to align leaf names
-    tree = tree.copy()
-    max_x = max(n.get_distance(tree) for n in tree.iter_leaves())
-
-    coords = {}
-    node_pos = dict((n2, i) for i, n2 in enumerate(tree.get_leaves()[::-1]))
-    node_list = tree.iter_descendants(strategy='postorder')
-    node_list = chain(node_list, [tree])
 
-    # reduce branch length
+    # compute node coordinates in a single preorder traversal (children
+    # are visited from right to left), without copying or modifying the tree.
+    # x: sum of the (reduced) branch lengths from the root; max_x: longest
+    # root-to-leaf distance (before reducing branch lengths)
+    dists = {}
+    node_x = {}
+    node_pos = {}
     cut_edge = set()
-    if max_dist is not None:
-        for n in tree.iter_descendants():
-            if n.dist > max_dist:
-                n.dist -= max_dist
-                cut_edge.add(n)
+    max_x = 0
+    preorder = []
+    stack = [(tree, 0, 0)]
+    while stack:
+        n, parent_x, parent_dist = stack.pop()
+        preorder.append(n)
+        dist = n.dist
+        # reduce branch length
+        if max_dist is not None and n is not tree and dist > max_dist:
+            dist -= max_dist
+            cut_edge.add(n)
+        dists[n] = dist
+        node_x[n] = parent_x + dist
+        root_dist = parent_dist + n.dist if n is not tree else 0
+        if n.is_leaf():
+            node_pos[n] = len(node_pos)
+            max_x = max(max_x, root_dist)
+        for child in n.children:
+            stack.append((child, node_x[n], root_dist))
+
+    coords = {}
+    # postorder, root last
+    node_list = reversed(preorder)
 
     if name_offset is None:
         name_offset = max_x / 100.
     # draw tree
     for n in node_list:
         style = n._get_style()
-        x = __builtin__.sum(n2.dist for n2 in n.iter_ancestors()) + n.dist
+        x = node_x[n]
         if n.is_leaf():
             y = node_pos[n]
             if align_names:
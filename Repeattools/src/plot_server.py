@@ -0,0 +1,237 @@
+import json
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from uuid import uuid1
+
+from .generate_plots import (get_count_matrix_heatmap,
+                             get_count_matrix_pca,
+                             get_divergence_boxplots,
+                             get_divergence_violins)
+from .utils import get_div_files, get_large_dfs, read_div_file, read_names_file
+
+class DataCache:
+    """LRU cache for the inputs of REPlotCounts and REPlotDivergence.
+
+    Entries are keyed by the resolved path of the file, the function
+    used to load it and its arguments. The modification time of the
+    file is stored along the data, so an entry is reloaded as soon
+    as its file changes on disk.
+
+    Parameters
+    ----------
+    max_entries : int, default: 8
+        Maximum number of loaded files to keep. When it is exceeded,
+        the least recently used entry is evicted.
+    """
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, fpath, loader, *args):
+        """Returns the data of a file, loading it only if needed.
+
+        Parameters
+        ----------
+        fpath : path to the file
+
+        loader : callable
+            Function that takes the path of the file (and `args`)
+            and returns its data.
+
+        Returns
+        -------
+        data : object returned by `loader`
+            Cached data must not be modified by the caller.
+        """
+        fpath = Path(fpath).resolve()
+        mtime = fpath.stat().st_mtime_ns
+        key = (str(fpath), loader.__name__, args)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        data = loader(fpath, *args)
+        self._entries[key] = (mtime, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return data
+
+    def get_matrix(self, fpath, exclude=False):
+        return self.get(fpath, read_count_matrix, exclude)
+
+    def get_divergence(self, fpath):
+        return self.get(fpath, read_div_file)
+
+    def status(self):
+        return {"entries": [key[0] for key in self._entries],
+                "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+def read_count_matrix(matrix_fpath, exclude=False):
+    """Reads a RECollector TE count matrix (transposed) from its path."""
+    with open(matrix_fpath) as matrix:
+        matrix_df = get_large_dfs(matrix, exclude, transpose=True)
+
+    return matrix_df
+
+def read_groups(groups_fpath):
+    with open(groups_fpath) as groups:
+        group_dict = read_names_file(groups)
+
+    return group_dict
+
+def get_grouped_matrix(job, cache):
+    """Returns the count matrix of a job, restricted to the species in its groups file."""
+    group_dict = read_groups(job["groups"])
+    matrix_df = cache.get_matrix(job["matrix"], job.get("exclude", False))
+    excluded_df_species = list(matrix_df.loc[~matrix_df.index.isin(list(group_dict.keys()))].index)
+    matrix_df = matrix_df.drop(excluded_df_species)
+
+    return matrix_df, group_dict
+
+def run_heatmap_job(job, cache, out_folder, job_number):
+    matrix_df, group_dict = get_grouped_matrix(job, cache)
+    out_heatmap = out_folder / f"Heatmap_{job_number}.png"
+    get_count_matrix_heatmap(matrix_df, out_heatmap, group_dict,
+                             tuple(job.get("hsize", [15, 15])),
+                             dendro=job.get("dendro", False),
+                             mode=job.get("hmode", "auto"),
+                             cache_dir=job.get("cache", out_folder / "cache"))
+    return out_heatmap
+
+def run_pca_job(job, cache, out_folder, job_number):
+    matrix_df, group_dict = get_grouped_matrix(job, cache)
+    out_pca = out_folder / f"PCA_{job_number}.png"
+    get_count_matrix_pca(matrix_df, out_pca, group_dict,
+                         show_names=job.get("names", False),
+                         solver=job.get("pca", "auto"),
+                         cache_dir=job.get("cache", out_folder / "cache"),
+                         out_csv_prefix=out_folder / f"PCA_{job_number}")
+    return out_pca
+
+def run_violins_job(job, cache, out_folder, job_number):
+    analyzed_species = list(read_groups(job["names"]).values())
+    files_list = get_div_files(job["violin"], job.get("exclude", False))
+    out_violin = out_folder / f"Violin_plots_{job_number}.png"
+    get_divergence_violins(files_list, job.get("tree", False),
+                           analyzed_species, out_violin,
+                           div_reader=cache.get_divergence)
+    return out_violin
+
+def run_boxplots_job(job, cache, out_folder, job_number):
+    species_and_groups = read_groups(job["groups"])
+    out_box = out_folder / f"Box_plots_{job_number}.png"
+    get_divergence_boxplots(job["box"], species_and_groups, out_box,
+                            div_reader=cache.get_divergence)
+    return out_box
+
+PLOT_JOBS = {"heatmap": run_heatmap_job, "pca": run_pca_job,
+             "violins": run_violins_job, "boxplots": run_boxplots_job}
+
+def run_plot_job(job, cache, default_out_folder):
+    """Runs a plot job using the data kept in the cache.
+
+    Parameters
+    ----------
+    job : dict
+        Must contain the type of plot under "plot" (heatmap, pca,
+        violins or boxplots) and the same inputs as the options of
+        REPlotCounts/REPlotDivergence: "matrix", "groups", "exclude",
+        "dendro", "hsize", "hmode", "pca", "cache" and "names" for
+        heatmaps and PCAs;
+        "violin", "names", "exclude" and "tree" for violin plots;
+        "box" and "groups" for box plots. "output" can be used
+        to select the output folder.
+
+    cache : `DataCache`
+
+    default_out_folder : path
+        Output folder for jobs that do not specify one.
+
+    Returns
+    -------
+    out_fpath : path to the generated figure
+    """
+    plot = job.get("plot")
+    if plot not in PLOT_JOBS:
+        raise ValueError(f"Unknown plot type: {plot}. Choose from {', '.join(PLOT_JOBS)}")
+
+    out_folder = Path(job.get("output", default_out_folder))
+    if not out_folder.exists():
+        out_folder.mkdir(parents=True)
+
+    try:
+        out_fpath = PLOT_JOBS[plot](job, cache, out_folder, uuid1())
+    finally:
+        import matplotlib.pyplot as plt
+        plt.close("all")
+
+    return out_fpath.resolve()
+
+class PlotRequestHandler(BaseHTTPRequestHandler):
+    """Handles plot jobs (POST /plot) and cache queries (GET /status)."""
+
+    def send_json(self, code, content):
+        body = json.dumps(content).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/status":
+            self.send_json(404, {"status": "error", "error": f"Unknown path: {self.path}"})
+            return
+        self.send_json(200, {"status": "ok", "cache": self.server.cache.status()})
+
+    def do_POST(self):
+        if self.path != "/plot":
+            self.send_json(404, {"status": "error", "error": f"Unknown path: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            job = json.loads(self.rfile.read(length))
+            out_fpath = run_plot_job(job, self.server.cache,
+                                     self.server.out_folder)
+        except Exception as e:
+            msg = f"{'*'*10} An error occurred. See traceback below {'*'*10}\n"
+            self.server.log(msg + traceback.format_exc())
+            self.send_json(400 if isinstance(e, (KeyError, ValueError)) else 500,
+                           {"status": "error", "error": repr(e)})
+            return
+
+        self.server.log(f"Job: {json.dumps(job)}\nOutput: {out_fpath}\n")
+        self.send_json(200, {"status": "ok", "output": str(out_fpath)})
+
+    def log_message(self, format, *args):
+        self.server.log(f"{self.address_string()} - {format % args}\n")
+
+class PlotServer(HTTPServer):
+    """Single-threaded HTTP server that keeps plot inputs in a `DataCache`.
+
+    Jobs are run one at a time, as matplotlib figures
+    are not thread-safe.
+    """
+    def __init__(self, address, cache, out_folder, log_fhand=None):
+        super().__init__(address, PlotRequestHandler)
+        self.cache = cache
+        self.out_folder = Path(out_folder)
+        self.log_fhand = log_fhand
+
+    def log(self, msg):
+        print(msg)
+        if self.log_fhand is not None:
+            self.log_fhand.write(msg)
+            self.log_fhand.flush()
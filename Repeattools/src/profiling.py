@@ -0,0 +1,145 @@
+import cProfile
+import os
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+class StackSampler:
+    """Samples the call stack of a thread at regular intervals.
+
+    The stacks are counted in the collapsed format used by
+    flamegraph.pl, speedscope and py-spy ("root;...;leaf count").
+
+    Parameters
+    ----------
+    interval : float, default: 0.005
+        Seconds between samples.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread = None
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """Starts sampling the thread that calls this method."""
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample,
+                                        args=(threading.get_ident(),),
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def write_collapsed(self, out_fpath):
+        with open(out_fpath, "w") as out_fhand:
+            for stack, count in sorted(self.stacks.items()):
+                out_fhand.write(f"{stack} {count}\n")
+
+class RunProfiler:
+    """Profiles selected sections of a run with cProfile and a stack sampler.
+
+    The profile of every profiled section is accumulated and saved as
+    a pstats dump (for pstats, snakeviz...) and as collapsed stacks
+    (for flamegraph.pl, speedscope...). When disabled, sections
+    run without any profiling.
+
+    Parameters
+    ----------
+    out_prefix : path, optional
+        Files are saved as <out_prefix>.pstats and <out_prefix>.collapsed.
+        If None, the profiler is disabled.
+
+    scope : str, optional
+        Only sections with this name are profiled.
+        If None, all sections are profiled.
+    """
+    def __init__(self, out_prefix=None, scope=None):
+        self.enabled = out_prefix is not None
+        self.out_prefix = out_prefix
+        self.scope = scope
+        self.profiled_sections = []
+        self._profile = cProfile.Profile() if self.enabled else None
+        self._sampler = StackSampler() if self.enabled else None
+        self._running = False
+
+    def start(self, *names):
+        """Starts profiling a section if any of its names is in the scope.
+
+        Parameters
+        ----------
+        names : str
+            Names of the section (e.g. the name of the species
+            and of its directory).
+        """
+        if not self.enabled or self._running:
+            return
+        if self.scope is not None and self.scope not in names:
+            return
+        self.profiled_sections.append(names[0])
+        self._running = True
+        self._sampler.start()
+        self._profile.enable()
+
+    def stop(self):
+        if not self._running:
+            return
+        self._profile.disable()
+        self._sampler.stop()
+        self._running = False
+
+    @contextmanager
+    def section(self, *names):
+        """Context manager that profiles a section (see `start`)."""
+        self.start(*names)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def save(self):
+        """Saves the profile.
+
+        Returns
+        -------
+        pstats_fpath, collapsed_fpath : paths to the files, or None
+            if no section was profiled.
+        """
+        self.stop()
+        if not self.profiled_sections:
+            return None
+        pstats_fpath = Path(f"{self.out_prefix}.pstats")
+        collapsed_fpath = Path(f"{self.out_prefix}.collapsed")
+        self._profile.dump_stats(pstats_fpath)
+        self._sampler.write_collapsed(collapsed_fpath)
+        return pstats_fpath, collapsed_fpath
+
+def save_profile(profiler, log_fhand):
+    """Saves the profile of a `RunProfiler` (if enabled) and logs its location."""
+    if not profiler.enabled:
+        return
+    profile_fpaths = profiler.save()
+    if profile_fpaths is None:
+        msg = f"Nothing was profiled: {profiler.scope} was not run\n"
+    else:
+        msg = f"Profile (pstats) saved at: {profile_fpaths[0].resolve()}\n"
+        msg += f"Profile (collapsed stacks) saved at: {profile_fpaths[1].resolve()}\n"
+    print(msg)
+    log_fhand.write(msg)
+    log_fhand.flush()
@@ -1,8 +1,12 @@
+import numpy as np
 import pandas as pd
 
 from src.config import CLASSIFIER_FOR_RECOLLECTOR as classifier, TESORTER_TO_RM_EQUIV_FOR_RECOLLECTOR as tes_rm_dict
 
-def merge_inputs(target_df, te_df, override=False):
+#Lines of the RepeatMasker file read at once when filtering sequences
+READ_CHUNK_ROWS = 1000000
+
+def merge_inputs(target_df, te_df, override=False, keep_coords=False):
     """Merges inputs from both RepeatMasker and TESorter.
     
     Repeats of RepeatMasker that are not in TESorter
@@ -32,6 +36,11 @@ def merge_inputs(target_df, te_df, override=False):
         identified as Class II transposons, given that their
         TESorter classification also belongs to this Class.
 
+    keep_coords : bool, default: False
+        If True, the "seqid", "start" and "end" columns are kept,
+        which is needed to merge overlapping repeats when counting
+        covered base pairs (see `count_tes`).
+
     Returns
     -------
     merged_inputs : `pandas.DataFrame`
@@ -41,10 +50,18 @@ def merge_inputs(target_df, te_df, override=False):
     cats_dict = {"class/family": "category",
                  "repeat": "category", "tes_order":"category",
                  "tes_superfamily": "category", "clade": "category"}
+    #Text keys of TESorter use the categories of RepeatMasker, so the
+    #merge compares their integer codes (repeats of TESorter with other
+    #values could not match any repeat)
+    key_dtypes = {col: target_df[col].dtype for col in merge_cols
+                  if isinstance(target_df[col].dtype, pd.CategoricalDtype)
+                  and te_df[col].dtype != target_df[col].dtype}
+    te_df = te_df.astype(key_dtypes)
     target_df = target_df.merge(te_df, how="left", on=merge_cols).astype(cats_dict)
     
     #Remove repeat, start, and end columns as they are no longer necessary
-    target_df.drop(["repeat", "start", "end"],inplace=True,axis=1)
+    coord_cols = [] if keep_coords else ["start", "end"]
+    target_df.drop(["repeat"] + coord_cols,inplace=True,axis=1)
     
     #Add "Unknown" to repeats of RepeatMasker that do not have
     #a match in TESorter
@@ -57,7 +74,9 @@ def merge_inputs(target_df, te_df, override=False):
 
     #Same as before, but with the "domains" column
     tr = target_df["domains"].isna()
-    target_df.loc[tr, "domains"] = target_df.loc[tr, "domains"].apply(lambda x: [{"none":"none"}])
+    none_doms = np.empty(tr.sum(), dtype=object)
+    none_doms.fill([{"none":"none"}])
+    target_df.loc[tr, "domains"] = none_doms
 
     #Create new classification for the data
     classif_cols = ["class", "subclass", "superfamily", "element"]
@@ -89,12 +108,16 @@ def merge_inputs(target_df, te_df, override=False):
                 target_df.loc[copia_gypsy_values, col] = target_df.loc[copia_gypsy_values, "clade"].astype("str")
             target_df[col] = target_df[col].astype("category")
 
-    #Finally, remove "seqid", "tes_classif", and "class/family" columns
-    target_df.drop(["seqid", "tes_classif", "class/family"],inplace=True,axis=1)
+    #Finally, remove "seqid", "tes_classif" (only created when overriding),
+    #and "class/family" columns
+    coord_cols = [] if keep_coords else ["seqid"]
+    target_df.drop(coord_cols + ["tes_classif", "class/family"],inplace=True,axis=1,
+                   errors="ignore")
 
     return target_df
 
-def read_repeatmasker_out(input_fhand):
+def read_repeatmasker_out(input_fhand, query_left=False, ids=False, seqid_filter=None,
+                          memory_map=False):
     """Reads the .out file from RepeatMasker.
     
     It creates a `pandas.DataFrame`. Additionally,
@@ -106,6 +129,28 @@ def read_repeatmasker_out(input_fhand):
     input_fhand : file
         .out file from RepeatMasker.
 
+    query_left : bool, default: False
+        If True, the "q left" column (bases of the sequence after
+        the end of the repeat) is also read, as an integer.
+
+    ids : bool, default: False
+        If True, the "id" column (RepeatMasker ID of the element of
+        each hit, shared by its fragments) and an "overlapped" column
+        (True for hits marked with '*', overlapped by a higher-scoring
+        hit) are also read (see `resolve_fragments`).
+
+    seqid_filter : function, optional
+        Selects the sequences whose repeats are read (see
+        `get_seqid_filter`). The file is read in chunks of
+        `READ_CHUNK_ROWS` lines, and the repeats of the other
+        sequences are removed from each chunk, so they are
+        never kept in memory all at once.
+
+    memory_map : bool, default: False
+        If True, the file (which must be uncompressed) is read
+        through a memory map instead of buffered reads (see the
+        `memory_map` option of `pandas.read_csv`).
+
     Returns
     -------
     rm_input : `pandas.DataFrame`
@@ -123,20 +168,89 @@ def read_repeatmasker_out(input_fhand):
         ]
     convert_dict = {
         "per div": "float16", "per del": "float16",
-        "per ins": "float16", "seqid": "str", "start": "int32",
+        "per ins": "float16", "seqid": "category", "start": "int32",
         "end": "int32", "repeat": "category", "class/family": "category"
         }
+    comment = "*"
+    if query_left:
+        usable_cols = usable_cols + ["q left"]
+        convert_dict = dict(convert_dict, **{"q left": "str"})
+    if ids:
+        #The '*' of overlapped hits is read as an additional column
+        fieldnames = fieldnames + ["overlapped"]
+        usable_cols = usable_cols + ["id", "overlapped"]
+        convert_dict = dict(convert_dict, **{"id": "int64", "overlapped": "str"})
+        comment = None
 
     #Create the DataFrame, and
     #add a repeat length column
-    rm_input = pd.read_csv(input_fhand, skiprows=2, header=None,
-                           names=fieldnames, sep="\s+", comment="*",
-                           usecols=usable_cols, dtype=convert_dict)
+    if seqid_filter is None:
+        rm_input = pd.read_csv(input_fhand, skiprows=2, header=None,
+                               names=fieldnames, sep="\s+", comment=comment,
+                               usecols=usable_cols, dtype=convert_dict,
+                               memory_map=memory_map)
+    else:
+        #Categories of the chunks would differ, so text columns
+        #are converted after joining the filtered chunks
+        cat_cols = [col for col, dtype in convert_dict.items() if dtype == "category"]
+        chunk_dict = dict(convert_dict, **{col: "str" for col in cat_cols})
+        filtered_chunks = []
+        for chunk in pd.read_csv(input_fhand, skiprows=2, header=None,
+                                 names=fieldnames, sep="\s+", comment=comment,
+                                 usecols=usable_cols, dtype=chunk_dict,
+                                 chunksize=READ_CHUNK_ROWS, memory_map=memory_map):
+            seqid_codes, seqids = pd.factorize(chunk["seqid"])
+            kept = seqid_filter(np.asarray(seqids, dtype=object))[seqid_codes]
+            filtered_chunks.append(chunk[kept])
+        rm_input = pd.concat(filtered_chunks, ignore_index=True)
+        rm_input = rm_input.astype({col: "category" for col in cat_cols})
     rm_input["length"] = rm_input["end"] - rm_input["start"]
+    if query_left:
+        #Values are written between parentheses, e.g. (1234)
+        rm_input["q left"] = rm_input["q left"].str.strip("()").astype("int64")
+    if ids:
+        rm_input["overlapped"] = rm_input["overlapped"] == "*"
 
     return rm_input
 
-def read_tesorter_cls_tsv(input_fhand):
+def get_sequence_lengths(rm_input):
+    """Gets the length of each sequence from the RepeatMasker data.
+
+    The length of a sequence is the end of any of its repeats
+    plus the bases left after it. Sequences without any repeat
+    are not included.
+
+    Parameters
+    ----------
+    rm_input : `pandas.DataFrame`
+        From `read_repeatmasker_out` with `query_left=True`.
+
+    Returns
+    -------
+    seq_lengths : `pandas.Series`
+        Lengths indexed by sequence.
+    """
+    return (rm_input["end"].astype("int64") + rm_input["q left"]).groupby(rm_input["seqid"],
+                                                                         observed=True).max()
+
+def get_genome_size(rm_input):
+    """Estimates the size of the genome from the RepeatMasker data.
+
+    It is the sum of the lengths of `get_sequence_lengths`, so the
+    estimate is exact except for sequences without any repeat.
+
+    Parameters
+    ----------
+    rm_input : `pandas.DataFrame`
+        From `read_repeatmasker_out` with `query_left=True`.
+
+    Returns
+    -------
+    genome_size : int
+    """
+    return int(get_sequence_lengths(rm_input).sum())
+
+def read_tesorter_cls_tsv(input_fhand, seqids=None):
     """Reads the .cls.tsv file from TESorter.
     
     Sequences that were analyzed by TESorter must be 
@@ -150,6 +264,13 @@ def read_tesorter_cls_tsv(input_fhand):
     input_fhand : file
         .cls.tsv file from TESorter.
 
+    seqids : `pandas.Index`, optional
+        Categories of the seqid column, usually those of the
+        RepeatMasker data of the species, so both tables share
+        the same dictionary of sequences (see `merge_inputs`).
+        Sequences that are not in it are left empty. By default,
+        the sequences of the file.
+
     Returns
     -------
     te_input : `pandas.DataFrame`
@@ -187,7 +308,7 @@ def read_tesorter_cls_tsv(input_fhand):
     #Separate data of #TE column
     new_cols = ["seqid", "start", "end", "repeat", "class/family"]
     te_input[new_cols] = te_input.pop("#TE").str.extract("(.*):(\d*)..(\d*)_{1}(.*)#(.*)", expand=True)
-    te_input["seqid"] = te_input["seqid"].astype("str")
+    te_input["seqid"] = pd.Categorical(te_input["seqid"], categories=seqids)
     te_input["repeat"] = te_input["repeat"].astype("category")
     te_input["class/family"] = te_input["class/family"].astype("category")
     te_input[["start","end"]] = te_input[["start","end"]].astype("int32")
@@ -196,8 +317,14 @@ def read_tesorter_cls_tsv(input_fhand):
     for col in ["tes_order", "tes_superfamily", "clade"]:
         te_input[col] = te_input[col].cat.rename_categories({"unknown": "Unknown"})
 
-    #add a repeat length column and modify the domains column
-    te_input["domains"] = te_input["domains"].apply(doms_dict)
+    #add a repeat length column and modify the domains column;
+    #each distinct domain string is parsed once, and the repeats
+    #with the same domains share their list
+    dom_codes, dom_strs = pd.factorize(te_input["domains"], use_na_sentinel=False)
+    dom_lists = np.empty(len(dom_strs), dtype=object)
+    for i, dom in enumerate(dom_strs):
+        dom_lists[i] = doms_dict(dom)
+    te_input["domains"] = dom_lists[dom_codes]
 
     te_input["length"] = te_input["end"] - te_input["start"]
 
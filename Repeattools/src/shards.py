@@ -0,0 +1,269 @@
+import json
+import shutil
+import zlib
+from pathlib import Path
+
+from .checkpoint import CHECKPOINT_FNAME
+
+#Options of a run that differ between the shards of the same analysis
+SHARD_SETTINGS = ["input", "shard"]
+
+#Bytes copied at once when the divergence data of the shards is merged
+COPY_BLOCK_SIZE = 1 << 20
+
+def select_shard_species(dir_species, shard_index, n_shards, partition="index"):
+    """Selects the species directories of a shard.
+
+    Parameters
+    ----------
+    dir_species : dict
+        Names of the directories of the species and names of
+        the species (from `read_names_file`).
+
+    shard_index, n_shards : int
+
+    partition : {'index', 'hash'}, default: 'index'
+        With 'index', the directories (sorted by name) are split in
+        `n_shards` consecutive ranges. With 'hash', a directory belongs
+        to the shard given by the CRC32 of its name, so shards do not
+        change when directories are added to the names file.
+
+    Returns
+    -------
+    shard_species : dict
+        Subset of `dir_species`.
+    """
+    dir_names = sorted(dir_species)
+    if partition == "index":
+        first = shard_index * len(dir_names) // n_shards
+        last = (shard_index + 1) * len(dir_names) // n_shards
+        selected = dir_names[first:last]
+    elif partition == "hash":
+        selected = [dir_name for dir_name in dir_names
+                    if zlib.crc32(dir_name.encode()) % n_shards == shard_index]
+    else:
+        raise ValueError(f"Unknown partition: {partition}")
+    return {dir_name: dir_species[dir_name] for dir_name in selected}
+
+def parse_shard_setting(shard_setting):
+    """Reads the shards of an output from its settings.
+
+    Parameters
+    ----------
+    shard_setting : str
+        "K/N partition" for a shard of 'RECollector.py map', or
+        "K1,K2,.../N partition" for the output of a partial reduce.
+
+    Returns
+    -------
+    shard_indexes : list of int
+
+    n_shards : int
+
+    partition : str
+    """
+    shards, partition = shard_setting.split()
+    indexes, n_shards = shards.split("/")
+    return [int(index) for index in indexes.split(",")], int(n_shards), partition
+
+def format_shard_setting(shard_indexes, n_shards, partition):
+    """Inverse of `parse_shard_setting`."""
+    return f"{','.join(str(index) for index in sorted(shard_indexes))}/{n_shards} {partition}"
+
+def read_shards(shard_dirs, partial=False):
+    """Reads the checkpoints of the shards written by 'RECollector.py map'.
+
+    Parameters
+    ----------
+    shard_dirs : list of paths
+        Output folders of the shards (or of previous reduces).
+
+    partial : bool, default: False
+        If True, some shards of the partition can be missing,
+        so the output can be merged later with the rest.
+
+    Returns
+    -------
+    settings : dict
+        Options shared by all the shards. If some shards are
+        missing, "shard" holds the shards that were merged
+        (see `format_shard_setting`).
+
+    shard_species : list of dict
+        Species of all the shards, sorted by the name of their
+        directory (as in a run with a single node). Each one has
+        the entries of the checkpoint ('name', 'dir', 'counts' and
+        'div_ranges') and 'shard_dir'.
+
+    Raises
+    ------
+    ValueError
+        If the shards were run with different options, a species
+        is in several shards, a shard is not complete or (unless
+        `partial`) some shards of the partition (all of them from
+        0 to N-1) are missing.
+    """
+    settings = None
+    shard_species = {}
+    #Shards of the partition of 'RECollector.py map' merged so far,
+    #outputs of single runs or of complete reduces do not have any
+    partition = None
+    shard_indexes = {}
+    for shard_dir in shard_dirs:
+        shard_dir = Path(shard_dir)
+        checkpoint_fpath = shard_dir / CHECKPOINT_FNAME
+        if not checkpoint_fpath.exists():
+            raise ValueError(f"{shard_dir} is not a RECollector output folder (no {CHECKPOINT_FNAME})")
+        with open(checkpoint_fpath) as checkpoint_fhand:
+            checkpoint = json.load(checkpoint_fhand)
+
+        shard_settings = {key: value for key, value in checkpoint["settings"].items()
+                          if key not in SHARD_SETTINGS}
+        if settings is None:
+            settings = shard_settings
+        elif shard_settings != settings:
+            changed = [key for key in settings if shard_settings.get(key) != settings[key]]
+            raise ValueError(f"{shard_dir} was run with different options: {', '.join(changed)}")
+        if "shard" in checkpoint["settings"]:
+            indexes, n_shards, shard_partition = parse_shard_setting(checkpoint["settings"]["shard"])
+            if partition is None:
+                partition = (n_shards, shard_partition)
+            elif (n_shards, shard_partition) != partition:
+                raise ValueError(f"{shard_dir} is a shard of another partition "
+                                 f"({n_shards} {shard_partition} shards instead of "
+                                 f"{partition[0]} {partition[1]} shards)")
+            for shard_index in indexes:
+                if shard_index in shard_indexes:
+                    raise ValueError(f"Shard {shard_index}/{n_shards} is in {shard_indexes[shard_index]} "
+                                     f"and {shard_dir}")
+                shard_indexes[shard_index] = shard_dir
+        committed = {species["dir"] for species in checkpoint["species"]}
+        pending = [dir_name for dir_name in checkpoint.get("planned", []) if dir_name not in committed]
+        if pending:
+            raise ValueError(f"{shard_dir} was not completed, {', '.join(pending)} "
+                             "must still be processed (use --resume)")
+
+        for species in checkpoint["species"]:
+            if species["dir"] in shard_species:
+                raise ValueError(f"{species['dir']} is in {shard_species[species['dir']]['shard_dir']} "
+                                 f"and {shard_dir}")
+            if "div_ranges" not in species:
+                raise ValueError(f"{shard_dir} was created by a version of RECollector "
+                                 "that cannot be merged")
+            shard_species[species["dir"]] = dict(species, shard_dir=shard_dir)
+
+    if settings is None:
+        raise ValueError("No shards were given")
+    if partition is not None:
+        missing = [str(shard_index) for shard_index in range(partition[0])
+                   if shard_index not in shard_indexes]
+        if missing and not partial:
+            raise ValueError(f"Shards {', '.join(missing)} of {partition[0]} are missing "
+                             "(use --partial to merge them later)")
+        if missing:
+            settings["shard"] = format_shard_setting(shard_indexes, *partition)
+    return settings, [shard_species[dir_name] for dir_name in sorted(shard_species)]
+
+def copy_range(in_fhand, out_fhand, start, end):
+    in_fhand.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = in_fhand.read(min(COPY_BLOCK_SIZE, remaining))
+        if not block:
+            raise ValueError(f"{in_fhand.name} is shorter than recorded in its checkpoint")
+        out_fhand.write(block)
+        remaining -= len(block)
+
+def merge_divergence_files(shard_species, depth, out_div_folder):
+    """Writes the divergence files of all the shards.
+
+    The rows of each species are copied as they are (also when
+    the files are compressed) from the byte ranges recorded in
+    the checkpoint of its shard, in the order of `shard_species`.
+
+    Parameters
+    ----------
+    shard_species : list of dict
+        From `read_shards`.
+
+    depth : str
+        Depth of the divergence files.
+
+    out_div_folder : path
+
+    Returns
+    -------
+    div_fpaths : list of paths
+        Divergence files written.
+
+    merged_species : list of dict
+        Entries of the species for the checkpoint of the merged
+        output, with their byte ranges in the new files (so the
+        merged output can itself be merged with other outputs).
+    """
+    #The header of a file of a shard ends where its first rows start
+    header_ends = {}
+    for species in shard_species:
+        for div_fname, (start, _) in species["div_ranges"].items():
+            key = (species["shard_dir"], div_fname)
+            header_ends[key] = min(start, header_ends.get(key, start))
+
+    out_div_folder = Path(out_div_folder)
+    div_fpaths = {}
+    div_sizes = {}
+    merged_species = []
+    for species in shard_species:
+        shard_div_folder = species["shard_dir"] / f"{depth}_divergence_files"
+        div_ranges = {}
+        for div_fname, (start, end) in species["div_ranges"].items():
+            with open(shard_div_folder / div_fname, "rb") as in_fhand:
+                if div_fname not in div_fpaths:
+                    div_fpaths[div_fname] = out_div_folder / div_fname
+                    div_sizes[div_fname] = header_ends[species["shard_dir"], div_fname]
+                    with open(div_fpaths[div_fname], "wb") as out_fhand:
+                        copy_range(in_fhand, out_fhand, 0, div_sizes[div_fname])
+                with open(div_fpaths[div_fname], "ab") as out_fhand:
+                    copy_range(in_fhand, out_fhand, start, end)
+            div_ranges[div_fname] = [div_sizes[div_fname], div_sizes[div_fname] + end - start]
+            div_sizes[div_fname] += end - start
+        merged_species.append({"name": species["name"], "dir": species["dir"],
+                               "counts": species["counts"], "div_ranges": div_ranges})
+    return list(div_fpaths.values()), merged_species
+
+def copy_species_outputs(shard_species, out_folder, folder_name, suffix=""):
+    """Copies the files (or folders) of each species from a folder of the shards.
+
+    Parameters
+    ----------
+    shard_species : list of dict
+        From `read_shards`.
+
+    out_folder : path
+
+    folder_name : str
+        Folder of the outputs in the shards and in `out_folder`
+        (e.g. 'interval_index').
+
+    suffix : str, default: ''
+        The output of a species is named after its directory
+        followed by `suffix` (e.g. '.npz').
+
+    Returns
+    -------
+    n_copied : int
+        Number of species whose output was copied.
+    """
+    n_copied = 0
+    out_species_folder = Path(out_folder) / folder_name
+    for species in shard_species:
+        species_fpath = species["shard_dir"] / folder_name / f"{species['dir']}{suffix}"
+        if species_fpath.is_dir():
+            shutil.copytree(species_fpath, out_species_folder / species_fpath.name,
+                            dirs_exist_ok=True)
+        elif species_fpath.exists():
+            out_species_folder.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(species_fpath, out_species_folder / species_fpath.name)
+        else:
+            continue
+        n_copied += 1
+    return n_copied
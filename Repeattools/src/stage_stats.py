@@ -0,0 +1,130 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+def get_rss():
+    """Current resident memory of the process in bytes.
+
+    It is read from /proc/self/statm. Where it is not available,
+    the peak resident memory of the process is returned instead.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+class StageTimer:
+    """Measures one stage of `StageStats` (used as a context manager).
+
+    The number of rows produced by the stage can be set
+    in `rows_out` before the context exits.
+    """
+    def __init__(self, stats, species, stage, rows_in=None):
+        self.stats = stats
+        self.species = species
+        self.stage = stage
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def __enter__(self):
+        self.start_rss = get_rss()
+        self.start_cpu = time.process_time()
+        self.start_wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        wall = time.perf_counter() - self.start_wall
+        cpu = time.process_time() - self.start_cpu
+        end_rss = get_rss()
+        self.stats.record({"species": self.species, "stage": self.stage,
+                           "wall_s": round(wall, 4), "cpu_s": round(cpu, 4),
+                           "rows_in": self.rows_in, "rows_out": self.rows_out,
+                           "rss_mb": round(end_rss / 2**20, 1),
+                           "rss_delta_mb": round((end_rss - self.start_rss) / 2**20, 1),
+                           "status": "ok" if exc_type is None else "error"})
+        return False
+
+class NullStageTimer:
+    """Stage that measures nothing, used when the statistics are disabled."""
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+NULL_STAGE = NullStageTimer()
+
+class StageStats:
+    """Wall time, CPU time, rows and memory of each processing stage.
+
+    Every stage is written as a line of the log and as a JSON
+    object in the statistics file (JSON Lines format). When
+    disabled, `stage` returns a shared object that does nothing,
+    so the instrumented code runs at its normal speed. Stages
+    can be recorded from several threads.
+
+    Parameters
+    ----------
+    stats_fpath : path, optional
+        JSON Lines file for the statistics. If None (and no
+        log is given), the statistics are disabled.
+
+    log_fhand : file, optional
+        Log in which a summary of each stage is written.
+    """
+    def __init__(self, stats_fpath=None, log_fhand=None):
+        self.enabled = stats_fpath is not None or log_fhand is not None
+        self.log_fhand = log_fhand
+        self.stats_fhand = open(stats_fpath, "a") if stats_fpath is not None else None
+        self.records = []
+        self._lock = threading.Lock()
+
+    def stage(self, species, stage, rows_in=None):
+        """Returns a context manager that measures a stage.
+
+        Parameters
+        ----------
+        species : str
+
+        stage : str
+            Name of the stage (e.g. 'merge_inputs').
+
+        rows_in : int, optional
+            Number of rows the stage receives.
+        """
+        if not self.enabled:
+            return NULL_STAGE
+        return StageTimer(self, species, stage, rows_in)
+
+    def record(self, stage_stats):
+        with self._lock:
+            self._record(stage_stats)
+
+    def _record(self, stage_stats):
+        self.records.append(stage_stats)
+        if self.log_fhand is not None:
+            rows_in = "-" if stage_stats["rows_in"] is None else stage_stats["rows_in"]
+            rows_out = "-" if stage_stats["rows_out"] is None else stage_stats["rows_out"]
+            msg = (f"[stats] {stage_stats['species']} {stage_stats['stage']}: "
+                   f"wall {stage_stats['wall_s']:.3f} s, CPU {stage_stats['cpu_s']:.3f} s, "
+                   f"rows {rows_in} -> {rows_out}, RSS {stage_stats['rss_mb']:.1f} MB "
+                   f"({stage_stats['rss_delta_mb']:+.1f} MB)")
+            if stage_stats["status"] != "ok":
+                msg += f" [{stage_stats['status']}]"
+            self.log_fhand.write(msg + "\n")
+            self.log_fhand.flush()
+        if self.stats_fhand is not None:
+            self.stats_fhand.write(json.dumps(stage_stats) + "\n")
+            self.stats_fhand.flush()
+
+    def close(self):
+        if self.stats_fhand is not None:
+            self.stats_fhand.close()
+            self.stats_fhand = None
@@ -1,6 +1,17 @@
+import zlib
 from csv import DictReader
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from src.compression import open_input
+from src.config import EXCLUDED_CATEGORIES
+
+#Columns of sampled divergence files: number of repeats of the species
+#in the category and their minimum and maximum divergence
+DIV_SAMPLE_COLS = ["sampled from", "min div", "max div"]
+
 def convert_data_to_long_df_div(species_df, species, depth):
     """Convert divergence data of RECollector to a long-form DataFrame.
 
@@ -34,6 +45,134 @@ def convert_data_to_long_df_div(species_df, species, depth):
 
     return long_df_div
 
+def get_reservoir_sample(n_items, sample_size, seed):
+    """Positions of a uniform random sample of a stream of items.
+
+    Each item gets a random key and the `sample_size` items with the
+    smallest keys are kept, which is the reservoir of a streaming
+    (bottom-k) sample, selected with a partial sort instead of
+    item by item.
+
+    Parameters
+    ----------
+    n_items : int
+
+    sample_size : int
+        Maximum number of items of the sample.
+
+    seed : int
+        Seed of the random keys, so the sample is reproducible.
+
+    Returns
+    -------
+    positions : `numpy.ndarray` of int
+        Sorted positions of the items of the sample (all
+        of them if there are `sample_size` items or less).
+    """
+    if n_items <= sample_size:
+        return np.arange(n_items)
+    keys = np.random.default_rng(seed).random(n_items)
+    return np.sort(np.argpartition(keys, sample_size)[:sample_size])
+
+def sample_div_data(long_df_div, depth, sample_size):
+    """Keeps a random sample of the divergence data of each species and category.
+
+    The sample of each species and category has at most `sample_size`
+    repeats (see `get_reservoir_sample`), and its seed is taken from
+    their names, so the same data gives the same sample regardless
+    of the order of the species or the shard that processed them.
+    The exact number of repeats and their minimum and maximum
+    divergence are added to the sample (see `DIV_SAMPLE_COLS`).
+
+    Parameters
+    ----------
+    long_df_div : `pandas.DataFrame`
+        From `convert_data_to_long_df_div`.
+
+    depth : str
+        Column of the categories.
+
+    sample_size : int
+
+    Returns
+    -------
+    sampled_df : `pandas.DataFrame`
+        Sampled rows (in their original order) with the
+        columns of `DIV_SAMPLE_COLS` after the others.
+    """
+    samples = []
+    for (species, cat), div_df in long_df_div.groupby(["species", depth], observed=True,
+                                                      sort=False):
+        seed = zlib.crc32(f"{species}\t{cat}".encode())
+        positions = get_reservoir_sample(len(div_df), sample_size, seed)
+        samples.append(div_df.iloc[positions].assign(**{
+            "sampled from": len(div_df),
+            "min div": div_df["per div"].min(),
+            "max div": div_df["per div"].max()}))
+    if not samples:
+        return long_df_div.assign(**{col: pd.Series(dtype=dtype) for col, dtype
+                                     in zip(DIV_SAMPLE_COLS, ["int64", "float16", "float16"])})
+    return pd.concat(samples)
+
+def get_div_sampling(div_df):
+    """Number of rows and of repeats of a (possibly sampled) divergence file.
+
+    Parameters
+    ----------
+    div_df : `pandas.DataFrame`
+        From `read_div_file`.
+
+    Returns
+    -------
+    n_rows, n_repeats : int
+        Rows of the file and repeats they were sampled from (the
+        same if the file was written without --div-sample).
+    """
+    if "sampled from" not in div_df.columns:
+        return len(div_df), len(div_df)
+    n_repeats = div_df.groupby(["species", div_df.columns[1]], observed=True)["sampled from"].first()
+    return len(div_df), int(n_repeats.sum())
+
+def add_missing_species(div_df, species_list, cat_name, cat):
+    """Adds blank divergence data for species missing from a DataFrame.
+
+    All the placeholder rows are added in a single concatenation,
+    so the (possibly very large) divergence DataFrame is only
+    copied once, regardless of the number of missing species.
+
+    Parameters
+    ----------
+    div_df : `pandas.DataFrame`
+        Divergence data from RECollector (species, category
+        and percentage of divergence columns).
+
+    species_list : list
+        Species that must be present in the DataFrame.
+
+    cat_name : str
+        Name of the category column.
+
+    cat : str
+        Category of the divergence data.
+
+    Returns
+    -------
+    div_df : `pandas.DataFrame`
+        DataFrame containing a row with a divergence of 0.0
+        for each species that was not present. If no species
+        is missing, the input DataFrame is returned untouched.
+    """
+    sp_in_df = set(div_df["species"].unique())
+    missing_species = [species for species in species_list if species not in sp_in_df]
+    if not missing_species:
+        return div_df
+
+    empty_df = pd.DataFrame({"species": missing_species,
+                             cat_name: cat, "per div": 0.0})
+    div_df = pd.concat([div_df, empty_df])
+
+    return div_df
+
 def get_large_dfs(file, exclude=False, transpose=False):
     """Creates DataFrame from large files.
 
@@ -82,20 +221,89 @@ def get_large_dfs(file, exclude=False, transpose=False):
 
         if exclude and transpose:
                 te_count_df = te_count_df.T
-                excluded = ["Artifact", "Other", "Accidental", "Low_complexity",
-                            "Simple_repeat", "Normally_Non-integrating_Virus",
-                            "Pseudogene", "RNA", "rRNA", "Tandem_repeat",
-                            "Satellite", "Acromeric", "Centromeric", "Macro",
-                            "Subtelomeric", "W-chromosomal", "Y-chromosomal",
-                            "scRNA", "Segmental_Duplication", "Simple", "snRNA",
-                            "tRNA", "DFAM-Unknown_Centromeric", "Unknown"]
-                te_count_df = te_count_df.drop(columns=excluded, errors="ignore")
+                te_count_df = te_count_df.drop(columns=EXCLUDED_CATEGORIES, errors="ignore")
 
         elif not exclude and transpose:
             te_count_df = te_count_df.T
 
         return te_count_df
 
+def read_div_file(div_fpath):
+    """Reads a RECollector divergence file from its path.
+
+    Parameters
+    ----------
+    div_fpath : path to the RECollector divergence file
+        It can be compressed (.csv.gz or .csv.zst).
+
+    Returns
+    -------
+    div_df : `pandas.DataFrame`
+        DataFrame from `get_large_dfs`.
+    """
+    with open_input(div_fpath) as div_file:
+        div_df = get_large_dfs(div_file)
+
+    return div_df
+
+def get_div_files(div_dir, exclude=False):
+    """Lists the divergence files of a RECollector divergence directory.
+
+    Parameters
+    ----------
+    div_dir : path to the RECollector divergence directory
+
+    exclude : bool, default: False
+        If True, files of unknown data and other repetitive
+        elements (see `EXCLUDED_CATEGORIES` in config.py)
+        will not be listed.
+
+    Returns
+    -------
+    files_list : list of paths
+    """
+    files_list = list(Path(div_dir).glob("*"))
+    if exclude:
+        new_list = []
+        for file in files_list:
+            for col in EXCLUDED_CATEGORIES:
+                if col in file.name:
+                    break
+            else:
+                new_list.append(file)
+        files_list = new_list
+
+    return files_list
+
+def standardize_matrix(matrix_df):
+    """Standardizes (z-score) each column of a TE count matrix.
+
+    All columns are standardized at once. Columns whose values
+    are all the same (standard deviation of 0) are left unchanged.
+
+    Parameters
+    ----------
+    matrix_df : `pandas.DataFrame`
+        DataFrame in wide form, where columns are the different
+        subcategories of the chosen category, and rows are species.
+
+    Returns
+    -------
+    standard_matrix : `pandas.DataFrame`
+        DataFrame of floats with the same index and columns.
+    """
+    values = matrix_df.to_numpy(dtype="float64")
+    mean = values.mean(axis=0)
+    std = values.std(axis=0)
+    constant = std == 0
+    mean[constant] = 0
+    std[constant] = 1
+    standard_matrix = pd.DataFrame((values - mean) / std,
+                                   index=matrix_df.index,
+                                   columns=matrix_df.columns)
+
+    return standard_matrix
+
 def read_doms_file(doms_file):
     """Reads the file for domain filtering
     
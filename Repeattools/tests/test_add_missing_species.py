@@ -0,0 +1,33 @@
+import unittest
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from src.utils import add_missing_species
+
+class AddMissingSpecies(unittest.TestCase):
+
+    def test_add_missing_species(self):
+        input_df = pd.DataFrame({"species": ["Persea_americana"],
+                                 "superfamily": ["L1"], "per div": [14.7]})
+        div_df = add_missing_species(input_df,
+                                     ["Persea_americana", "Persea_schiedeana",
+                                      "Persea_indica"], "superfamily", "L1")
+
+        test_df = pd.DataFrame({"species": ["Persea_americana", "Persea_schiedeana",
+                                            "Persea_indica"],
+                                "superfamily": ["L1", "L1", "L1"],
+                                "per div": [14.7, 0.0, 0.0]})
+
+        assert_frame_equal(div_df.reset_index(drop=True), test_df)
+
+    def test_no_missing_species(self):
+        input_df = pd.DataFrame({"species": ["Persea_americana"],
+                                 "superfamily": ["L1"], "per div": [14.7]})
+        div_df = add_missing_species(input_df, ["Persea_americana"],
+                                     "superfamily", "L1")
+
+        self.assertIs(div_df, input_df)
+
+if __name__ == "__main__":
+    unittest.main()
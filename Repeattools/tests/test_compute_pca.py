@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from src import generate_plots
+from src.generate_plots import compute_pca
+
+class ComputePCA(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.matrix_df = pd.DataFrame(rng.poisson(50, (40, 6)),
+                                      index=[f"Species_{i}" for i in range(40)],
+                                      columns=["L1", "Copia", "Gypsy", "hAT",
+                                               "Helitron", "Unknown"])
+
+    def test_solvers_agree(self):
+        pca_df, loadings_df, variance = compute_pca(self.matrix_df)
+        #A single batch of IncrementalPCA is an exact PCA
+        for solver, batch_size in [("randomized", 1000), ("incremental", 40)]:
+            solver_pca_df, _, solver_variance = compute_pca(self.matrix_df, solver,
+                                                            batch_size=batch_size)
+            #Components are defined up to their sign
+            signs = np.sign(pca_df.iloc[0]) * np.sign(solver_pca_df.iloc[0])
+            np.testing.assert_allclose(solver_pca_df * signs, pca_df, atol=1e-6)
+            np.testing.assert_allclose(solver_variance, variance, atol=1e-6)
+        self.assertEqual(list(loadings_df.index), list(self.matrix_df.columns))
+
+    def test_incremental_batches(self):
+        pca_df, _, _ = compute_pca(self.matrix_df, "incremental", batch_size=15)
+
+        self.assertEqual(pca_df.shape, (40, 2))
+        self.assertEqual(list(pca_df.index), list(self.matrix_df.index))
+
+    def test_cached_pca(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            pca_df, loadings_df, _ = compute_pca(self.matrix_df, cache_dir=cache_dir)
+            with mock.patch("sklearn.decomposition.PCA") as pca:
+                cached_pca_df, cached_loadings_df, _ = compute_pca(self.matrix_df,
+                                                                   cache_dir=cache_dir)
+                pca.assert_not_called()
+
+        assert_frame_equal(cached_pca_df, pca_df)
+        assert_frame_equal(cached_loadings_df, loadings_df)
+
+    def test_no_cache(self):
+        #The matrix is not hashed when there is no cache
+        with mock.patch.object(generate_plots, "hash_matrix") as hash_matrix:
+            compute_pca(self.matrix_df)
+            hash_matrix.assert_not_called()
+
+    def test_unknown_solver(self):
+        with self.assertRaises(ValueError):
+            compute_pca(self.matrix_df, "arpack")
+
+if __name__ == "__main__":
+    unittest.main()
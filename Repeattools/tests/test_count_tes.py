@@ -1,10 +1,11 @@
 import unittest
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from pandas.testing import assert_series_equal
 
-from src.create_matrix import count_tes
+from src.create_matrix import count_tes, get_merged_bp
 
 class CountTransposableElement(unittest.TestCase):
 
@@ -22,6 +23,50 @@ class CountTransposableElement(unittest.TestCase):
         test_series.index.name = "superfamily"
 
         assert_series_equal(counted_tes, test_series) 
+
+    def test_count_tes_bp(self):
+        #The three L1 repeats overlap (280, 211 and 211 bp)
+        input_df = pd.read_csv(self.test_path)
+        for measure, value, dtype in [("bp", 702, "int64"), ("merged_bp", 280, "int64"),
+                                      ("genome_fraction", 28.0, "float64")]:
+            counted_tes = count_tes(input_df, "Persea_americana", measure=measure,
+                                    genome_size=1000)
+
+            test_series = pd.Series({"L1": value}, name="Persea_americana", dtype=dtype)
+            test_series.index.name = "superfamily"
+
+            assert_series_equal(counted_tes, test_series)
+
+    def test_count_tes_domains(self):
+        domains = pd.Series([[{"RT": "Ale"}, {"GAG": "Ale"}], [{"GAG": "Ale"}, {"RT": "Ale"}],
+                             [{"RT": "Ale"}], [{"none": "none"}], [{"RT": "Ale"}, {"RT": "Ale"}]])
+        input_df = pd.DataFrame({"domains": domains, "length": [100, 200, 300, 400, 500]})
+        #The same domains in a different order are the same combination
+        counted_tes = count_tes(input_df, "Persea_americana", "domains")
+        test_series = pd.Series({"{'GAG': 'Ale'},{'RT': 'Ale'}": 2, "{'RT': 'Ale'}": 2,
+                                 "{'none': 'none'}": 1}, name="Persea_americana", dtype="int32")
+        test_series.index.name = "domains"
+        assert_series_equal(counted_tes, test_series)
+
+        counted_tes = count_tes(input_df, "Persea_americana", "domains", measure="bp",
+                                domains_mode="exploded")
+        test_series = pd.Series({"{'RT': 'Ale'}": 1100, "{'none': 'none'}": 400,
+                                 "{'GAG': 'Ale'}": 300}, name="Persea_americana", dtype="int64")
+        test_series.index.name = "domains"
+        assert_series_equal(counted_tes, test_series)
+
+        #The input is not modified
+        assert_series_equal(input_df["domains"], domains, check_names=False)
+
+    def test_merged_bp(self):
+        seqid_codes = np.array([0, 0, 0, 1, 0, 0])
+        cat_codes = np.array([0, 0, 0, 0, 1, 1])
+        starts = np.array([10, 15, 40, 10, 12, 30])
+        ends = np.array([20, 25, 50, 20, 14, 31])
+        merged_bp = get_merged_bp(seqid_codes, cat_codes, starts, ends, 3)
+        #Category 0: 10-25 and 40-50 in the first sequence, 10-20 in the second
+        np.testing.assert_array_equal(merged_bp, [35, 3, 0])
         
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
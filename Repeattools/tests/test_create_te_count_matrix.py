@@ -18,6 +18,18 @@ class CreateMatrix(unittest.TestCase):
         test_df = pd.DataFrame({"Persea_americana": [3, 0], "Persea_schiedeana": [0, 3]}, index=["L1", "SINE"], dtype="int32")
 
         assert_frame_equal(te_count_matrix, test_df) 
+
+    def test_create_matrix_fraction(self):
+        input_fhand1 = pd.Series({"L1": 3.5}, name="Persea_americana")
+        input_fhand1.index.name = "superfamily"
+        input_fhand2 = pd.Series({"SINE": 0.25}, name="Persea_schiedeana")
+        input_fhand2.index.name = "superfamily"
+
+        te_count_matrix = create_te_count_matrix([input_fhand1, input_fhand2], "float64")
+
+        test_df = pd.DataFrame({"Persea_americana": [3.5, 0], "Persea_schiedeana": [0, 0.25]}, index=["L1", "SINE"], dtype="float64")
+
+        assert_frame_equal(te_count_matrix, test_df) 
         
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
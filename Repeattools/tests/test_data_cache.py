@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.plot_server import DataCache
+
+def read_text(fpath):
+    with open(fpath) as fhand:
+        return fhand.read()
+
+class Cache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.test_path = Path(self.tmp_dir.name)
+        for name in ["a", "b", "c"]:
+            with open(self.test_path / name, "w") as fhand:
+                fhand.write(name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cache_hits_and_eviction(self):
+        cache = DataCache(max_entries=2)
+        self.assertEqual(cache.get(self.test_path / "a", read_text), "a")
+        self.assertEqual(cache.get(self.test_path / "a", read_text), "a")
+        cache.get(self.test_path / "b", read_text)
+        cache.get(self.test_path / "a", read_text)
+        cache.get(self.test_path / "c", read_text)
+
+        #"b" was the least recently used entry
+        self.assertEqual(cache.status()["entries"],
+                         [str((self.test_path / name).resolve()) for name in ["a", "c"]])
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 3)
+
+    def test_cache_reloads_modified_files(self):
+        cache = DataCache()
+        fpath = self.test_path / "a"
+        cache.get(fpath, read_text)
+        with open(fpath, "w") as fhand:
+            fhand.write("modified")
+        mtime = fpath.stat().st_mtime_ns + 10**9
+        os.utime(fpath, ns=(mtime, mtime))
+
+        self.assertEqual(cache.get(fpath, read_text), "modified")
+        self.assertEqual(cache.misses, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from src.generate_plots import get_divergence_landscapes
+from src.landscape import combine_landscapes, compute_landscape, save_landscape
+
+class DivergenceLandscapes(unittest.TestCase):
+
+    def setUp(self):
+        landscape1 = compute_landscape(pd.DataFrame({"per div": [5.0, 5.5, 30.0],
+                                                     "superfamily": ["Gypsy", "Copia", "Gypsy"]}),
+                                       "superfamily", bin_width=10.0)
+        landscape2 = compute_landscape(pd.DataFrame({"per div": [2.0, 2.5, 15.0],
+                                                     "superfamily": ["Simple_repeat", "Gypsy", "Gypsy"]}),
+                                       "superfamily", bin_width=10.0)
+        self.landscape = combine_landscapes([("Persea_americana", landscape1),
+                                             ("Persea_schiedeana", landscape2)])
+
+    def tearDown(self):
+        plt.close("all")
+
+    def plot_landscapes(self, *args):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            landscape_fpath = Path(tmp_dir) / "out_superfamily_landscape_1.npz"
+            save_landscape(landscape_fpath, self.landscape)
+            out_fpath = Path(tmp_dir) / "Landscape_plots.png"
+            get_divergence_landscapes(landscape_fpath, out_fpath, *args)
+            self.assertTrue(out_fpath.exists())
+        return plt.gcf()
+
+    def get_bar_heights(self, ax):
+        #Height of the bars of each category, per bin
+        return {container.get_label(): [bar.get_height() for bar in container]
+                for container in ax.containers}
+
+    def test_landscapes(self):
+        fig = self.plot_landscapes()
+        axs = [ax for ax in fig.axes if ax.get_title()]
+        self.assertEqual([ax.get_title() for ax in axs], ["Persea_americana", "Persea_schiedeana"])
+        self.assertEqual(self.get_bar_heights(axs[0]),
+                         {"Gypsy": [1, 0, 0, 1, 0, 0, 0, 0, 0, 0],
+                          "Copia": [1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+                          "Simple_repeat": [0] * 10})
+        self.assertEqual(self.get_bar_heights(axs[1])["Gypsy"], [1, 1, 0, 0, 0, 0, 0, 0, 0, 0])
+        #Bars of a bin are stacked
+        copia_bar = axs[0].containers[1][0]
+        self.assertEqual(copia_bar.get_y(), 1)
+        self.assertEqual(copia_bar.get_width(), 10.0)
+
+    def test_names_and_exclude(self):
+        fig = self.plot_landscapes(["Persea_schiedeana", "Persea_indica"], True)
+        axs = [ax for ax in fig.axes if ax.get_title()]
+        self.assertEqual([ax.get_title() for ax in axs], ["Persea_schiedeana"])
+        self.assertEqual(list(self.get_bar_heights(axs[0])), ["Gypsy", "Copia"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -40,6 +40,16 @@ class FilterChrom(unittest.TestCase):
         assert_frame_equal(filtered_df.reset_index(drop=True), test_df.reset_index(drop=True)) 
         assert_frame_equal(excluded_df.reset_index(drop=True), test_df.reset_index(drop=True)) 
 
+    def test_filter_chrom_regex(self):
+        input_df = pd.DataFrame({"seqid": pd.Categorical(["Chr01", "scaffold_7", "ChrC", "Chr02", "Chr01"]),
+                                 "length": [100, 200, 300, 400, 500]})
+        filtered_df = filter_df_by_chromosomes(input_df, ["scaffold_.*", "ChrC"],
+                                               exclude=True, regex=True)
+        self.assertEqual(list(filtered_df["length"]), [100, 400, 500])
+        #Regular expressions must match the whole name
+        filtered_df = filter_df_by_chromosomes(input_df, ["Chr0"], regex=True)
+        self.assertEqual(len(filtered_df), 0)
+
         
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,38 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from src import generate_plots
+from src.generate_plots import get_cached_linkage
+
+class CachedLinkage(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data_df = pd.DataFrame(rng.normal(size=(20, 5)))
+
+    def test_cached_linkage(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            linkage = get_cached_linkage(self.data_df, cache_dir=cache_dir)
+            self.assertEqual(len(list(Path(cache_dir).glob("linkage_*.npz"))), 1)
+
+            with mock.patch.object(generate_plots, "compute_linkage") as compute:
+                cached_linkage = get_cached_linkage(self.data_df, cache_dir=cache_dir)
+                compute.assert_not_called()
+            np.testing.assert_array_equal(cached_linkage, linkage)
+
+            #Other method, other entry
+            get_cached_linkage(self.data_df, method="single", cache_dir=cache_dir)
+            self.assertEqual(len(list(Path(cache_dir).glob("linkage_*.npz"))), 2)
+
+    def test_no_cache(self):
+        with mock.patch.object(generate_plots, "hash_matrix") as hash_matrix:
+            get_cached_linkage(self.data_df)
+            hash_matrix.assert_not_called()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+#Maximum cumulative import time (in microseconds) of each entry point
+IMPORT_BUDGET = 250000
+#Modules that must not be loaded before the arguments are parsed
+HEAVY_MODULES = ["pandas", "numpy", "matplotlib", "seaborn", "scipy",
+                 "sklearn", "ete3", "PyQt5"]
+
+def get_import_times(module):
+    """Runs `python -X importtime` and returns the cumulative time of each imported module."""
+    repeattools_path = Path(__file__).parent.parent.absolute()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             cwd=repeattools_path, capture_output=True, text=True, check=True)
+    import_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        import_times[name.strip()] = int(cumulative)
+    return import_times
+
+class ImportTime(unittest.TestCase):
+
+    def test_entry_points_import_time(self):
+        for module in ["RECollector", "REPlotCounts", "REPlotDivergence", "REPlotServer"]:
+            with self.subTest(module=module):
+                import_times = get_import_times(module)
+                loaded_heavy_modules = [name for name in HEAVY_MODULES if name in import_times]
+
+                self.assertEqual(loaded_heavy_modules, [])
+                self.assertLess(import_times[module], IMPORT_BUDGET)
+
+    def test_generate_plots_import_time(self):
+        import_times = get_import_times("src.generate_plots")
+        for name in ["matplotlib", "seaborn", "scipy", "sklearn", "ete3", "PyQt5"]:
+            self.assertNotIn(name, import_times)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+from src.interval_index import IntervalIndex, find_index_dirs, query_indexes
+
+class IntervalIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        #A long repeat at the start of chr1 overlaps later ones
+        self.species_df = pd.DataFrame({
+            "per div": [10.0, 5.5, 20.0, 7.5, 3.0],
+            "seqid": ["chr1", "chr1", "chr2", "chr1", "chr1"],
+            "start": [100, 1000, 50, 300, 5000],
+            "end": [2000, 1100, 80, 400, 5100],
+            "superfamily": pd.Categorical(["Gypsy", "Copia", "L1", "Copia", "Gypsy"])})
+        self.index = IntervalIndex.from_dataframe(self.species_df, "Persea_americana")
+
+    def test_overlap(self):
+        hits = self.index.overlap("chr1", 1050, 1200)
+        self.assertEqual(list(zip(hits["start"], hits["end"])), [(100, 2000), (1000, 1100)])
+        self.assertEqual(list(hits["superfamily"]), ["Gypsy", "Copia"])
+        #Both positions of the region and of the repeats are included
+        hits = self.index.overlap("chr1", 2000, 5000)
+        self.assertEqual(list(hits["start"]), [100, 5000])
+        self.assertEqual(len(self.index.overlap("chr1", 2001, 4999)), 0)
+        self.assertEqual(len(self.index.overlap("chr3", 1, 10000)), 0)
+
+    def test_nearest(self):
+        hits = self.index.nearest("chr1", 3000)
+        self.assertEqual(list(hits["start"]), [100])
+        self.assertEqual(list(hits["distance"]), [1000])
+        hits = self.index.nearest("chr1", 4000, 4500)
+        self.assertEqual(list(hits["start"]), [5000])
+        self.assertEqual(list(hits["distance"]), [500])
+        hits = self.index.nearest("chr2", 60)
+        self.assertEqual(list(hits["distance"]), [0])
+
+    def test_save_and_query(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_folder = Path(tmp_dir)
+            self.index.save(out_folder / "interval_index" / "Peame105")
+            index_dirs = find_index_dirs([out_folder])
+            self.assertEqual(index_dirs, [out_folder / "interval_index" / "Peame105"])
+
+            hits = query_indexes(index_dirs, [("chr1", 350, 360), ("chr2", 1, 100)])
+            self.assertEqual(list(hits["region"]), ["chr1:350-360", "chr1:350-360", "chr2:1-100"])
+            self.assertEqual(list(hits["species"].unique()), ["Persea_americana"])
+            self.assertEqual(list(hits["superfamily"]), ["Gypsy", "Copia", "L1"])
+
+    def test_unsorted_categories(self):
+        #Categories that are not in lexical order
+        species_df = pd.DataFrame({
+            "per div": [1.0, 2.0, 3.0],
+            "seqid": pd.Categorical(["chrB", "chrA", "chrC"], categories=["chrB", "chrA", "chrC"]),
+            "start": [10, 20, 30], "end": [50, 60, 70]})
+        index = IntervalIndex.from_dataframe(species_df, "Persea_americana")
+        self.assertEqual(list(index.overlap("chrA", 1, 100)["start"]), [20])
+        self.assertEqual(list(index.overlap("chrB", 1, 100)["start"]), [10])
+        self.assertEqual(list(index.overlap("chrC", 1, 100)["start"]), [30])
+
+    def test_query_counts(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_folder = Path(tmp_dir)
+            self.index.save(out_folder / "interval_index" / "Peame105")
+            te_count_matrix = query_indexes(find_index_dirs([out_folder]),
+                                            [("chr1", 350, 1050)], counts="superfamily")
+        self.assertEqual(te_count_matrix["Persea_americana"].to_dict(), {"Copia": 2, "Gypsy": 1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+import numpy as np
+
+from src.intervals import get_group_max_ends, get_interval_runs
+
+class Intervals(unittest.TestCase):
+
+    def test_group_max_ends(self):
+        #The long interval of group 0 does not reach group 1
+        max_ends = get_group_max_ends(np.array([0, 0, 0, 1, 1]),
+                                      np.array([500, 200, 300, 50, 40]))
+        np.testing.assert_array_equal(max_ends, [500, 500, 500, 50, 50])
+
+    def test_interval_runs(self):
+        #Intervals that touch belong to the same run
+        firsts, run_starts, run_ends = get_interval_runs(np.array([0, 0, 0, 0, 1]),
+                                                         np.array([10, 15, 30, 40, 10]),
+                                                         np.array([20, 30, 35, 50, 20]))
+        np.testing.assert_array_equal(firsts, [0, 3, 4])
+        np.testing.assert_array_equal(run_starts, [10, 40, 10])
+        np.testing.assert_array_equal(run_ends, [35, 50, 20])
+
+if __name__ == "__main__":
+    unittest.main()
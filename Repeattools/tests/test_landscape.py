@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.landscape import combine_landscapes, compute_landscape, landscape_to_long_df
+
+class Landscape(unittest.TestCase):
+
+    def test_compute_landscape(self):
+        species_df = pd.DataFrame({"per div": [0.5, 1.0, 1.9, 35.0, 120.0, np.nan],
+                                   "superfamily": ["Gypsy", "Gypsy", "Copia", "Gypsy", "Copia", "Copia"]})
+        landscape = compute_landscape(species_df, "superfamily", bin_width=10.0)
+
+        np.testing.assert_array_equal(landscape["categories"], ["Gypsy", "Copia"])
+        np.testing.assert_array_equal(landscape["bin_edges"], np.arange(11) * 10.0)
+        self.assertEqual(landscape["counts"].dtype, np.int32)
+        #Divergences above 100% go to the last bin
+        np.testing.assert_array_equal(landscape["counts"],
+                                      [[2, 0, 0, 1, 0, 0, 0, 0, 0, 0],
+                                       [1, 0, 0, 0, 0, 0, 0, 0, 0, 1]])
+
+    def test_combine_landscapes(self):
+        landscape1 = compute_landscape(pd.DataFrame({"per div": [5.0], "superfamily": ["Gypsy"]}),
+                                       "superfamily")
+        landscape2 = compute_landscape(pd.DataFrame({"per div": [2.0, 2.5], "superfamily": ["L1", "Gypsy"]}),
+                                       "superfamily")
+        landscape = combine_landscapes([("Persea_americana", landscape1),
+                                        ("Persea_schiedeana", landscape2)])
+
+        self.assertEqual(landscape["counts"].shape, (2, 2, 100))
+        np.testing.assert_array_equal(landscape["categories"], ["Gypsy", "L1"])
+        landscape_df = landscape_to_long_df(landscape)
+        self.assertEqual(landscape_df.values.tolist(),
+                         [["Persea_americana", "Gypsy", 5.0, 1],
+                          ["Persea_schiedeana", "Gypsy", 2.0, 1],
+                          ["Persea_schiedeana", "L1", 2.0, 1]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import gzip
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from pandas.testing import assert_frame_equal
+
+from src import compression
+from src.compression import has_extension, open_input
+from src.read_input import read_repeatmasker_out
+
+class OpenInput(unittest.TestCase):
+
+    def setUp(self):
+        test_path = Path(__file__).parent.absolute() / "data"
+        self.rm_fpath = test_path / "test_read_repeatmasker_out.out"
+
+    def test_has_extension(self):
+        self.assertTrue(has_extension("Peame105.out", ".out"))
+        self.assertTrue(has_extension("Peame105.out.gz", ".out"))
+        self.assertTrue(has_extension("Peame105.rexdb.cls.tsv.zst", ".cls.tsv"))
+        self.assertFalse(has_extension("Peame105.out.tar", ".out"))
+
+    def test_open_gzip_input(self):
+        with open(self.rm_fpath) as rm_fhand:
+            expected_df = read_repeatmasker_out(rm_fhand)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            gz_fpath = Path(tmp_dir) / "Peame105.out.gz"
+            with open(self.rm_fpath, "rb") as rm_fhand, gzip.open(gz_fpath, "wb") as gz_fhand:
+                gz_fhand.write(rm_fhand.read())
+
+            #External decompressor (if installed), background thread and plain reading
+            with open_input(gz_fpath) as rm_fhand:
+                assert_frame_equal(read_repeatmasker_out(rm_fhand), expected_df)
+            with mock.patch.dict(compression.DECOMPRESSORS, {"gzip": []}):
+                with open_input(gz_fpath) as rm_fhand:
+                    self.assertIsInstance(rm_fhand.buffer.raw, compression.ThreadedReader)
+                    assert_frame_equal(read_repeatmasker_out(rm_fhand), expected_df)
+            with open_input(gz_fpath, parallel=False) as rm_fhand:
+                assert_frame_equal(read_repeatmasker_out(rm_fhand), expected_df)
+
+            #Files can be closed before they are read completely
+            rm_fhand = open_input(gz_fpath)
+            rm_fhand.readline()
+            rm_fhand.close()
+
+if __name__ == "__main__":
+    unittest.main()
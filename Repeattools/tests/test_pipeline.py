@@ -0,0 +1,106 @@
+import threading
+import time
+import unittest
+
+from src.pipeline import (BackgroundWriter, PipelineError, Prefetcher,
+                          StageClock, format_utilization)
+
+class Pipeline(unittest.TestCase):
+
+    def test_prefetcher(self):
+        for depth in [0, 1, 3]:
+            prefetcher = Prefetcher(range(5), lambda x: x * 10, depth)
+            self.assertEqual(list(prefetcher), [(i, i * 10) for i in range(5)])
+            prefetcher.close()
+            self.assertEqual(prefetcher.clock.items, 5)
+
+    def test_prefetcher_depth(self):
+        #The reader only runs ahead by the depth of the queue
+        #(plus the item that waits to be queued)
+        read_items = []
+        ahead = threading.Event()
+
+        def read(x):
+            read_items.append(x)
+            if len(read_items) == 4:
+                ahead.set()
+
+        prefetcher = Prefetcher(range(10), read, depth=2)
+        results = iter(prefetcher)
+        next(results)
+        #With 2 results queued, the reader is blocked until the
+        #fourth item can be queued, so it cannot read a fifth one
+        self.assertTrue(ahead.wait(timeout=10))
+        self.assertEqual(len(read_items), 4)
+        prefetcher.close()
+
+    def test_prefetcher_error(self):
+        def read(x):
+            if x == 2:
+                raise ValueError("Corrupt file")
+            return x
+
+        for depth in [0, 1]:
+            prefetcher = Prefetcher(range(5), read, depth)
+            results = []
+            with self.assertRaises(PipelineError) as error:
+                for item, result in prefetcher:
+                    results.append(result)
+            prefetcher.close()
+            self.assertEqual(results, [0, 1])
+            self.assertEqual(error.exception.item, 2)
+            self.assertIsInstance(error.exception.__cause__, ValueError)
+
+    def test_prefetcher_error_name(self):
+        #Errors name the item as given by `describe`
+        for depth in [0, 1]:
+            items = [{"species": "Persea_americana", "rm_size": 100}]
+            prefetcher = Prefetcher(items, lambda x: 1 / 0, depth,
+                                    describe=lambda x: x["species"])
+            with self.assertRaises(PipelineError) as error:
+                list(prefetcher)
+            prefetcher.close()
+            self.assertEqual(str(error.exception), "The reader stage failed for Persea_americana")
+            self.assertIs(error.exception.item, items[0])
+
+    def test_background_writer(self):
+        for depth in [0, 2]:
+            written = []
+            writer = BackgroundWriter(depth)
+            for i in range(5):
+                writer.submit(i, written.append, i)
+            writer.close()
+            self.assertEqual(written, list(range(5)))
+
+    def test_background_writer_error(self):
+        written = []
+        def write(x):
+            if x == 1:
+                raise OSError("Disk full")
+            written.append(x)
+
+        writer = BackgroundWriter(depth=1)
+        with self.assertRaises(PipelineError) as error:
+            for i in range(5):
+                writer.submit(i, write, i)
+            writer.close()
+        self.assertEqual(error.exception.item, 1)
+        #Jobs after the failed one are not run
+        with self.assertRaises(PipelineError):
+            writer.close()
+        self.assertEqual(written, [0])
+
+    def test_utilization(self):
+        clock = StageClock("compute")
+        with clock.busy():
+            time.sleep(0.05)
+        with clock.waiting():
+            time.sleep(0.05)
+        self.assertEqual(clock.items, 1)
+        self.assertGreaterEqual(clock.busy_s, 0.05)
+        msg = format_utilization([clock], 0.1)
+        self.assertTrue(msg.startswith("compute: 1 items, busy 0.0"))
+        self.assertIn("waiting 0.0", msg)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import leaves_list
+
+from src.generate_plots import compute_linkage, get_count_matrix_heatmap
+from src.utils import standardize_matrix
+
+class RasterHeatmap(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.matrix_df = pd.DataFrame(rng.integers(0, 500, size=(40, 8)),
+                                      index=[f"Species_{i}" for i in range(40)],
+                                      columns=[f"Superfamily_{i}" for i in range(8)])
+        self.group_dict = {f"Species_{i}": "Lauraceae" if i < 25 else "Magnoliaceae"
+                           for i in range(40)}
+        self.hsize = (6, 4)
+
+    def tearDown(self):
+        plt.close("all")
+
+    def draw_heatmap(self, out_fpath, dendro):
+        get_count_matrix_heatmap(self.matrix_df, out_fpath, self.group_dict,
+                                 self.hsize, dendro=dendro, mode="raster")
+        return plt.gcf()
+
+    def test_raster_image(self):
+        standard_matrix = standardize_matrix(self.matrix_df)
+        row_order = leaves_list(compute_linkage(standard_matrix))
+        col_order = leaves_list(compute_linkage(standard_matrix.T))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_fpath = Path(tmp_dir) / "heatmap.png"
+            fig = self.draw_heatmap(out_fpath, dendro=True)
+            png = plt.imread(out_fpath)
+        #Written at 250 dpi
+        self.assertEqual(png.shape[:2], (self.hsize[1] * 250, self.hsize[0] * 250))
+
+        #The whole matrix is a single image, clustered in both axes
+        ax_heatmap = fig.axes[0]
+        self.assertEqual(len(ax_heatmap.images), 1)
+        self.assertEqual(len(ax_heatmap.collections), 0)
+        np.testing.assert_allclose(ax_heatmap.images[0].get_array(),
+                                   standard_matrix.to_numpy()[np.ix_(row_order, col_order)])
+        self.assertEqual([label.get_text() for label in ax_heatmap.get_xticklabels()],
+                         list(standard_matrix.columns[col_order]))
+
+        #Group color of each species, in the order of the heatmap
+        row_colors = fig.axes[1].images[0].get_array()[:, 0, :]
+        lauraceae = np.array([int(name.split("_")[1]) < 25
+                              for name in standard_matrix.index[row_order]])
+        self.assertEqual(len(np.unique(row_colors[lauraceae], axis=0)), 1)
+        self.assertEqual(len(np.unique(row_colors[~lauraceae], axis=0)), 1)
+        self.assertFalse(np.array_equal(row_colors[lauraceae][0], row_colors[~lauraceae][0]))
+
+    def test_no_dendrogram(self):
+        standard_matrix = standardize_matrix(self.matrix_df)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fig = self.draw_heatmap(Path(tmp_dir) / "heatmap.png", dendro=False)
+        #Species are kept in the input order
+        labels = [label.get_text() for label in fig.axes[0].get_yticklabels()]
+        self.assertEqual(labels, list(standard_matrix.index))
+
+if __name__ == "__main__":
+    unittest.main()
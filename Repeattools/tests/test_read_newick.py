@@ -0,0 +1,31 @@
+import unittest
+
+from src.newick import read_newick
+
+class ReadNewick(unittest.TestCase):
+
+    def test_read_newick(self):
+        tree = read_newick("((Persea_americana:1,'Persea indica':2)90:1,Persea_schiedeana[&&NHX:S=x]);")
+
+        self.assertEqual(tree.get_leaf_names(), ["Persea_americana", "Persea indica",
+                                                 "Persea_schiedeana"])
+        self.assertEqual([n.dist for n in tree.traverse()], [0.0, 1.0, 1.0, 2.0, 1.0])
+        self.assertEqual([n.name for n in tree.traverse("postorder")],
+                         ["Persea_americana", "Persea indica", "90",
+                          "Persea_schiedeana", ""])
+
+    def test_read_deep_newick(self):
+        #Caterpillar tree deeper than the recursion limit
+        newick = "(" * 5000 + "A" + "".join(f",L{i}):0.1" for i in range(5000)) + ";"
+        tree = read_newick(newick)
+
+        self.assertEqual(len(tree.get_leaves()), 5001)
+
+    def test_read_newick_errors(self):
+        with self.assertRaises(ValueError):
+            read_newick("((A,B);")
+        with self.assertRaises(ValueError):
+            read_newick("(A,B));")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from pandas.testing import assert_frame_equal
+
+from benchmarks.synthetic import write_species_files
+from src.create_matrix import get_seqid_filter
+from src.read_input import get_genome_size, read_repeatmasker_out
+
+class RepMaskMmap(unittest.TestCase):
+
+    def setUp(self):
+        test_path = Path(__file__).parent.absolute() / "data"
+        self.rm_fpath = test_path / "test_read_repeatmasker_out.out"
+
+    def assert_same_reading(self, rm_fpath, query_left=False, ids=False, seqid_filter=None):
+        with open(rm_fpath) as rm_fhand:
+            expected_df = read_repeatmasker_out(rm_fhand, query_left, ids, seqid_filter)
+        with open(rm_fpath) as rm_fhand:
+            assert_frame_equal(read_repeatmasker_out(rm_fhand, query_left, ids, seqid_filter,
+                                                     memory_map=True),
+                               expected_df)
+        return expected_df
+
+    def test_read_repmask_mmap(self):
+        self.assert_same_reading(self.rm_fpath)
+
+    def test_query_left(self):
+        rm_input = self.assert_same_reading(self.rm_fpath, query_left=True)
+        self.assertEqual(rm_input["q left"].dtype, "int64")
+        #Peame105C00 is counted once: end of a repeat plus the
+        #bases left after it (4959 + 55849342)
+        self.assertEqual(list(rm_input["q left"]), [55849342, 55848782, 55848454])
+        self.assertEqual(get_genome_size(rm_input), 55854301)
+
+    def test_ids(self):
+        rm_input = self.assert_same_reading(self.rm_fpath, ids=True)
+        self.assertEqual(list(rm_input["id"]), [1, 2, 3])
+        #Only the second hit is marked with '*'
+        self.assertEqual(list(rm_input["overlapped"]), [False, True, False])
+
+    def test_synthetic_data(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rm_fpath, _ = write_species_files(tmp_dir, "Spec000", 5000)
+            self.assert_same_reading(rm_fpath)
+
+    def test_seqid_filter(self):
+        seqid_filter = get_seqid_filter(excluded=["Chr0[3-9]"], regex=True)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rm_fpath, _ = write_species_files(tmp_dir, "Spec000", 5000)
+            expected_df = self.assert_same_reading(rm_fpath, seqid_filter=seqid_filter)
+            with open(rm_fpath) as rm_fhand:
+                rm_input = read_repeatmasker_out(rm_fhand)
+        self.assertEqual(sorted(expected_df["seqid"].unique()), ["Chr00", "Chr01", "Chr02", "Chr10", "Chr11"])
+        #Sequences that were filtered out are not kept as categories
+        self.assertEqual(sorted(expected_df["seqid"].cat.categories), ["Chr00", "Chr01", "Chr02", "Chr10", "Chr11"])
+        self.assertEqual(len(expected_df), rm_input["seqid"].isin(expected_df["seqid"]).sum())
+
+    def test_irregular_lines(self):
+        with open(self.rm_fpath) as rm_fhand:
+            lines = rm_fhand.readlines()
+        #Tabs, '*' right after a value, blank lines and no final newline
+        lines[3] = lines[3].replace("  Peame105C00  ", "\tPeame105C00\t")
+        lines[4] = lines[4].replace(" 2 *", " 2** 3")
+        lines.insert(5, "\n")
+        lines[-1] = lines[-1].rstrip("\n")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rm_fpath = Path(tmp_dir) / "Peame105.out"
+            rm_fpath.write_text("".join(lines))
+            self.assert_same_reading(rm_fpath)
+
+if __name__ == "__main__":
+    unittest.main()
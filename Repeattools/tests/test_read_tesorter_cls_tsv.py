@@ -45,5 +45,14 @@ class TESort(unittest.TestCase):
         
         assert_frame_equal(test_df, read_repeats)
 
+    def test_shared_seqids(self):
+        seqids = pd.Index(["Peame105C01", "Peame105C00"])
+        with open(self.test_path) as input_fhand:
+            read_repeats = read_tesorter_cls_tsv(input_fhand, seqids)
+
+        #Codes of the given categories, not of the sequences of the file
+        self.assertTrue(read_repeats["seqid"].cat.categories.equals(seqids))
+        self.assertEqual(list(read_repeats["seqid"].cat.codes), [1, 1, 1])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
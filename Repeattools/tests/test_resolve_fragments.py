@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.fragments import get_covered_bp, resolve_fragments
+
+class ResolveFragments(unittest.TestCase):
+
+    def setUp(self):
+        #Element 1 has two fragments in chr1; the third hit (marked
+        #with '*') overlaps the first one by 50 bp
+        self.species_df = pd.DataFrame({
+            "per div": np.array([10.0, 20.0, 30.0, 5.0], dtype="float16"),
+            "per del": np.array([1.0, 1.0, 1.0, 1.0], dtype="float16"),
+            "per ins": np.array([0.0, 3.0, 0.0, 0.0], dtype="float16"),
+            "seqid": ["chr1", "chr1", "chr1", "chr2"],
+            "start": np.array([100, 400, 150, 100], dtype="int32"),
+            "end": np.array([200, 700, 300, 200], dtype="int32"),
+            "length": np.array([100, 300, 150, 100], dtype="int32"),
+            "superfamily": pd.Categorical(["Gypsy", "Copia", "L1", "Copia"]),
+            "id": [1, 1, 2, 1],
+            "overlapped": [False, False, True, False]})
+
+    def test_resolve_fragments(self):
+        resolved_df = resolve_fragments(self.species_df)
+
+        self.assertEqual(list(resolved_df.columns),
+                         ["per div", "per del", "per ins", "seqid", "start",
+                          "end", "length", "superfamily", "fragments"])
+        #The same ID in another sequence is another element
+        self.assertEqual(list(resolved_df["seqid"]), ["chr1", "chr1", "chr2"])
+        self.assertEqual(list(resolved_df["start"]), [100, 150, 100])
+        self.assertEqual(list(resolved_df["end"]), [700, 300, 200])
+        self.assertEqual(list(resolved_df["length"]), [400, 100, 100])
+        self.assertEqual(list(resolved_df["fragments"]), [2, 1, 1])
+        #Classification of the longest fragment, divergence weighted by length
+        self.assertEqual(list(resolved_df["superfamily"]), ["Copia", "L1", "Copia"])
+        self.assertEqual(list(resolved_df["per div"]), [17.5, 30.0, 5.0])
+        self.assertEqual(resolved_df["per div"].dtype, np.float16)
+
+    def test_covered_bp(self):
+        covered_bp = get_covered_bp(np.array([0, 0, 1]), np.array([10, 15, 10]),
+                                    np.array([20, 30, 20]),
+                                    np.array([0, 0, 1, 1]), np.array([5, 25, 20, 0]),
+                                    np.array([12, 40, 30, 100]))
+        np.testing.assert_array_equal(covered_bp, [2, 5, 0, 10])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+from pandas.testing import assert_series_equal
+
+from src.checkpoint import RunCheckpoint
+
+class RunCheckpointTest(unittest.TestCase):
+
+    def test_resume_checkpoint(self):
+        settings = {"depth": "superfamily", "length": 100}
+        counted_tes = pd.Series({"Gypsy": 10, "Copia": 4}, name="Persea_americana", dtype="int32")
+        counted_tes.index.name = "superfamily"
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            checkpoint_fpath = tmp_dir / "checkpoint.json"
+            gypsy_fpath = tmp_dir / "Gypsy_divergence.csv"
+            gypsy_fpath.write_text("species,superfamily,per div\nPersea_americana,Gypsy,10.5\n")
+
+            checkpoint = RunCheckpoint(checkpoint_fpath, settings, tmp_dir)
+            checkpoint.commit("Persea_americana", "Peame105", counted_tes, [gypsy_fpath])
+
+            #Rows of an interrupted species
+            with open(gypsy_fpath, "a") as gypsy_fhand:
+                gypsy_fhand.write("Persea_indica,Gypsy,3.")
+            (tmp_dir / "Copia_divergence.csv").write_text("species,superfamily,per div\n")
+
+            resumed = RunCheckpoint.load(checkpoint_fpath, settings, tmp_dir)
+            restored_fnames = resumed.restore_divergence_files()
+
+            self.assertEqual(restored_fnames, ["Copia_divergence.csv", "Gypsy_divergence.csv"])
+            self.assertEqual(gypsy_fpath.read_text(),
+                             "species,superfamily,per div\nPersea_americana,Gypsy,10.5\n")
+            self.assertFalse((tmp_dir / "Copia_divergence.csv").exists())
+            self.assertTrue(resumed.is_committed("Peame105"))
+            self.assertFalse(resumed.is_committed("Pein01"))
+            assert_series_equal(resumed.get_counted_tes()[0], counted_tes)
+
+            with self.assertRaises(ValueError):
+                RunCheckpoint.load(checkpoint_fpath, dict(settings, length=200), tmp_dir)
+
+    def test_previous_divergence_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            checkpoint_fpath = tmp_dir / "checkpoint.json"
+            gypsy_fpath = tmp_dir / "Gypsy_divergence.csv"
+            previous_rows = "species,superfamily,per div\nPersea_americana,Gypsy,10.5\n"
+            gypsy_fpath.write_text(previous_rows)
+
+            #A new run in the same folder is interrupted before
+            #committing any species
+            checkpoint = RunCheckpoint(checkpoint_fpath, {"depth": "superfamily"}, tmp_dir)
+            checkpoint.save()
+            with open(gypsy_fpath, "a") as gypsy_fhand:
+                gypsy_fhand.write("Persea_indica,Gypsy,3.")
+
+            resumed = RunCheckpoint.load(checkpoint_fpath, {"depth": "superfamily"}, tmp_dir)
+            self.assertEqual(resumed.restore_divergence_files(), ["Gypsy_divergence.csv"])
+            self.assertEqual(gypsy_fpath.read_text(), previous_rows)
+
+if __name__ == "__main__":
+    unittest.main()
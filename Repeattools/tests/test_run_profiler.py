@@ -0,0 +1,57 @@
+import pstats
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from src.profiling import RunProfiler
+
+def busy_heatmap():
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+def busy_pca():
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+class RunProfilerTest(unittest.TestCase):
+
+    def test_scoped_profile(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = RunProfiler(Path(tmp_dir) / "profile", scope="heatmap")
+            with profiler.section("heatmap"):
+                busy_heatmap()
+            with profiler.section("pca"):
+                busy_pca()
+            pstats_fpath, collapsed_fpath = profiler.save()
+
+            functions = {func[2] for func in pstats.Stats(str(pstats_fpath)).stats}
+            with open(collapsed_fpath) as collapsed:
+                stacks = [line.rsplit(" ", 1) for line in collapsed]
+
+        self.assertEqual(profiler.profiled_sections, ["heatmap"])
+        self.assertIn("busy_heatmap", functions)
+        self.assertNotIn("busy_pca", functions)
+        self.assertTrue(stacks)
+        self.assertTrue(all(int(count) > 0 for _, count in stacks))
+        self.assertTrue(any("busy_heatmap (test_run_profiler.py" in stack for stack, _ in stacks))
+        self.assertFalse(any("busy_pca" in stack for stack, _ in stacks))
+
+    def test_nothing_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler = RunProfiler(Path(tmp_dir) / "profile", scope="Persea_americana")
+            with profiler.section("Persea_indica"):
+                busy_pca()
+            self.assertIsNone(profiler.save())
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [])
+
+        disabled_profiler = RunProfiler()
+        with disabled_profiler.section("heatmap"):
+            busy_heatmap()
+        self.assertFalse(disabled_profiler.enabled)
+        self.assertEqual(disabled_profiler.profiled_sections, [])
+
+if __name__ == "__main__":
+    unittest.main()
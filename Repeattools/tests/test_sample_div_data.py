@@ -0,0 +1,59 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from src.utils import (DIV_SAMPLE_COLS, convert_data_to_long_df_div, get_div_sampling,
+                       get_reservoir_sample, read_div_file, sample_div_data)
+
+class SampleDivData(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        species_df = pd.DataFrame({"per div": rng.uniform(0, 40, 1000).astype("float16"),
+                                   "superfamily": ["Gypsy"] * 990 + ["L1"] * 10})
+        self.long_df_div = convert_data_to_long_df_div(species_df, "Persea_americana",
+                                                       "superfamily")
+
+    def test_reservoir_sample(self):
+        positions = get_reservoir_sample(1000, 100, seed=1)
+        self.assertEqual(len(positions), 100)
+        self.assertEqual(len(np.unique(positions)), 100)
+        self.assertTrue(np.all(np.diff(positions) > 0))
+        np.testing.assert_array_equal(positions, get_reservoir_sample(1000, 100, seed=1))
+        np.testing.assert_array_equal(get_reservoir_sample(5, 100, seed=1), np.arange(5))
+
+    def test_sample_div_data(self):
+        sampled_df = sample_div_data(self.long_df_div, "superfamily", 100)
+
+        self.assertEqual(list(sampled_df.columns),
+                         ["species", "superfamily", "per div"] + DIV_SAMPLE_COLS)
+        self.assertEqual(sampled_df["superfamily"].value_counts().to_dict(),
+                         {"Gypsy": 100, "L1": 10})
+        #Exact values of all the repeats, not of the sample
+        gypsy_df = sampled_df[sampled_df["superfamily"] == "Gypsy"]
+        gypsy_div = self.long_df_div.loc[self.long_df_div["superfamily"] == "Gypsy", "per div"]
+        self.assertEqual(set(gypsy_df["sampled from"]), {990})
+        self.assertEqual(set(gypsy_df["min div"]), {gypsy_div.min()})
+        self.assertEqual(set(gypsy_df["max div"]), {gypsy_div.max()})
+        #Rows of the input, in their order
+        assert_frame_equal(sampled_df[["species", "superfamily", "per div"]],
+                           self.long_df_div.loc[sampled_df.index])
+        self.assertTrue(sampled_df.index.is_monotonic_increasing)
+        #Same sample for the same species and category
+        assert_frame_equal(sample_div_data(self.long_df_div, "superfamily", 100), sampled_df)
+
+    def test_div_sampling(self):
+        sampled_df = sample_div_data(self.long_df_div, "superfamily", 100)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            div_fpath = Path(tmp_dir) / "Gypsy_divergence.csv"
+            sampled_df.to_csv(div_fpath, index=False)
+            div_df = read_div_file(div_fpath)
+        self.assertEqual(get_div_sampling(div_df), (110, 1000))
+        self.assertEqual(get_div_sampling(self.long_df_div), (1000, 1000))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.manifest import scan_input_dir
+
+class ScanInputDir(unittest.TestCase):
+
+    def setUp(self):
+        test_path = Path(__file__).parent.absolute() / "data"
+        self.rm_text = (test_path / "test_read_repeatmasker_out.out").read_text()
+        self.te_text = (test_path / "test_read_tesorter_cls_tsv.tsv").read_text()
+
+    def make_species_dir(self, root_dir, dir_name, rm_text=None, te_text=None):
+        species_dir = root_dir / dir_name
+        species_dir.mkdir()
+        if rm_text is not None:
+            (species_dir / f"{dir_name}.out").write_text(rm_text)
+        if te_text is not None:
+            (species_dir / f"{dir_name}.cls.tsv").write_text(te_text)
+
+    def test_scan_input_dir(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            root_dir = Path(tmp_dir)
+            self.make_species_dir(root_dir, "Peame105", self.rm_text, self.te_text)
+            self.make_species_dir(root_dir, "Pein01", "\n".join(self.rm_text.splitlines()[:3]), self.te_text)
+            self.make_species_dir(root_dir, "Pesc02", self.rm_text)
+            self.make_species_dir(root_dir, "Other", self.rm_text, self.te_text)
+            (root_dir / "names.txt").write_text("")
+            dir_species = {"Peame105": "Persea_americana", "Pein01": "Persea_indica",
+                           "Pesc02": "Persea_schiedeana"}
+
+            manifest, ignored_dirs, failed_dirs = scan_input_dir(root_dir, dir_species)
+
+            self.assertEqual(len(manifest), 1)
+            self.assertEqual(manifest[0].species, "Persea_americana")
+            self.assertEqual(manifest[0].rm_path, root_dir / "Peame105" / "Peame105.out")
+            self.assertEqual(manifest[0].te_path, root_dir / "Peame105" / "Peame105.cls.tsv")
+            self.assertEqual(manifest[0].rm_size, len(self.rm_text.encode()))
+            self.assertEqual(ignored_dirs, ["Other"])
+            self.assertEqual(failed_dirs,
+                             ["Pein01: RepeatMasker file was empty\n",
+                              "Pesc02: TESorter file was not found/file must end in .cls.tsv and be the only one\n"])
+
+if __name__ == "__main__":
+    unittest.main()
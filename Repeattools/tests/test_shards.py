@@ -0,0 +1,130 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.checkpoint import CHECKPOINT_FNAME
+from src.shards import (merge_divergence_files, parse_shard_setting, read_shards,
+                        select_shard_species)
+
+def write_shard(shard_dir, species_rows, settings=None, planned=None):
+    """Writes a shard with a Gypsy divergence file and its checkpoint."""
+    div_folder = shard_dir / "superfamily_divergence_files"
+    div_folder.mkdir(parents=True)
+    div_fpath = div_folder / "Gypsy_divergence.csv"
+    div_fpath.write_text("species,superfamily,per div\n")
+    species_entries = []
+    for species, rows in species_rows:
+        start = div_fpath.stat().st_size
+        with open(div_fpath, "a") as div_fhand:
+            div_fhand.write(rows)
+        species_entries.append({"name": species, "dir": species[:3],
+                                "counts": {"Gypsy": rows.count("\n")},
+                                "div_ranges": {div_fpath.name: [start, div_fpath.stat().st_size]}})
+    checkpoint = {"settings": settings or {"depth": "superfamily", "input": str(shard_dir)},
+                  "species": species_entries, "div_sizes": {},
+                  "planned": planned or [entry["dir"] for entry in species_entries]}
+    with open(shard_dir / CHECKPOINT_FNAME, "w") as checkpoint_fhand:
+        json.dump(checkpoint, checkpoint_fhand)
+
+class Shards(unittest.TestCase):
+
+    def test_select_shard_species(self):
+        dir_species = {f"Spec{i:03d}": f"Species_{i}" for i in range(10)}
+        for partition in ["index", "hash"]:
+            shards = [select_shard_species(dir_species, i, 3, partition) for i in range(3)]
+            selected = [dir_name for shard in shards for dir_name in shard]
+            self.assertEqual(sorted(selected), sorted(dir_species))
+        shards = [select_shard_species(dir_species, i, 3) for i in range(3)]
+        self.assertEqual(list(shards[0]), ["Spec000", "Spec001", "Spec002"])
+
+    def test_merge_shards(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            write_shard(tmp_dir / "shard0", [("AAA_species", "AAA_species,Gypsy,1.0\n"),
+                                             ("CCC_species", "CCC_species,Gypsy,3.0\n")])
+            write_shard(tmp_dir / "shard1", [("BBB_species", "BBB_species,Gypsy,2.0\n"
+                                                             "BBB_species,Gypsy,2.5\n")])
+
+            settings, shard_species = read_shards([tmp_dir / "shard0", tmp_dir / "shard1"])
+            self.assertEqual(settings, {"depth": "superfamily"})
+            self.assertEqual([species["name"] for species in shard_species],
+                             ["AAA_species", "BBB_species", "CCC_species"])
+
+            out_folder = tmp_dir / "merged"
+            out_folder.mkdir()
+            div_fpaths, merged_species = merge_divergence_files(shard_species, "superfamily",
+                                                                out_folder)
+            self.assertEqual(div_fpaths[0].read_text(),
+                             "species,superfamily,per div\nAAA_species,Gypsy,1.0\n"
+                             "BBB_species,Gypsy,2.0\nBBB_species,Gypsy,2.5\nCCC_species,Gypsy,3.0\n")
+            self.assertEqual(merged_species[1]["div_ranges"]["Gypsy_divergence.csv"], [50, 94])
+
+    def test_invalid_shards(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            write_shard(tmp_dir / "shard0", [("AAA_species", "AAA_species,Gypsy,1.0\n")])
+            write_shard(tmp_dir / "shard1", [("AAA_species", "AAA_species,Gypsy,1.0\n")])
+            write_shard(tmp_dir / "shard2", [("BBB_species", "BBB_species,Gypsy,1.0\n")],
+                        settings={"depth": "class"})
+            write_shard(tmp_dir / "shard3", [("CCC_species", "CCC_species,Gypsy,1.0\n")],
+                        planned=["CCC", "DDD"])
+
+            for shards, error in [(["shard0", "shard1"], "AAA is in"),
+                                  (["shard0", "shard2"], "different options: depth"),
+                                  (["shard0", "shard3"], "DDD must still be processed"),
+                                  (["shard0", "missing"], "not a RECollector output folder")]:
+                with self.assertRaises(ValueError) as context:
+                    read_shards([tmp_dir / shard for shard in shards])
+                self.assertIn(error, str(context.exception))
+
+    def test_missing_shards(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            for i, species in enumerate(["AAA_species", "BBB_species", "CCC_species"]):
+                write_shard(tmp_dir / f"shard{i}", [(species, f"{species},Gypsy,1.0\n")],
+                            settings={"depth": "superfamily", "shard": f"{i}/3 index"})
+            write_shard(tmp_dir / "other", [("DDD_species", "DDD_species,Gypsy,1.0\n")],
+                        settings={"depth": "superfamily", "shard": "1/2 index"})
+
+            _, shard_species = read_shards([tmp_dir / f"shard{i}" for i in range(3)])
+            self.assertEqual(len(shard_species), 3)
+            for shards, error in [(["shard0", "shard1"], "Shards 2 of 3 are missing"),
+                                  (["shard0", "other"], "another partition"),
+                                  (["shard0", "shard0"], "Shard 0/3 is in")]:
+                with self.assertRaises(ValueError) as context:
+                    read_shards([tmp_dir / shard for shard in shards])
+                self.assertIn(error, str(context.exception))
+
+    def test_partial_reduce(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = Path(tmp_dir)
+            for i, species in enumerate(["AAA_species", "BBB_species", "CCC_species"]):
+                write_shard(tmp_dir / f"shard{i}", [(species, f"{species},Gypsy,1.0\n")],
+                            settings={"depth": "superfamily", "shard": f"{i}/3 index"})
+
+            settings, shard_species = read_shards([tmp_dir / "shard0", tmp_dir / "shard2"],
+                                                  partial=True)
+            self.assertEqual(settings, {"depth": "superfamily", "shard": "0,2/3 index"})
+            self.assertEqual(parse_shard_setting(settings["shard"]), ([0, 2], 3, "index"))
+            #Output of the first reduce, merged with the missing shard
+            merged_dir = tmp_dir / "merged"
+            merged_div_folder = merged_dir / "superfamily_divergence_files"
+            merged_div_folder.mkdir(parents=True)
+            _, merged_species = merge_divergence_files(shard_species, "superfamily",
+                                                       merged_div_folder)
+            with open(merged_dir / CHECKPOINT_FNAME, "w") as checkpoint_fhand:
+                json.dump({"settings": settings, "species": merged_species, "div_sizes": {},
+                           "planned": [species["dir"] for species in merged_species]},
+                          checkpoint_fhand)
+
+            settings, shard_species = read_shards([merged_dir, tmp_dir / "shard1"])
+            self.assertEqual(settings, {"depth": "superfamily"})
+            self.assertEqual([species["name"] for species in shard_species],
+                             ["AAA_species", "BBB_species", "CCC_species"])
+            with self.assertRaises(ValueError) as context:
+                read_shards([merged_dir, tmp_dir / "shard2"])
+            self.assertIn("Shard 2/3 is in", str(context.exception))
+
+if __name__ == "__main__":
+    unittest.main()
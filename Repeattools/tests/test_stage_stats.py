@@ -0,0 +1,45 @@
+import io
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.stage_stats import NULL_STAGE, StageStats
+
+class StageStatsTest(unittest.TestCase):
+
+    def test_stage_stats(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stats_fpath = Path(tmp_dir) / "stats.jsonl"
+            log_fhand = io.StringIO()
+            stats = StageStats(stats_fpath, log_fhand)
+            with stats.stage("Persea_americana", "filter_df_by_length", 10) as stage:
+                stage.rows_out = 4
+            with self.assertRaises(KeyError):
+                with stats.stage("Persea_americana", "merge_inputs", 10):
+                    raise KeyError("seqid")
+            stats.close()
+
+            with open(stats_fpath) as stats_fhand:
+                records = [json.loads(line) for line in stats_fhand]
+
+        self.assertEqual(records, stats.records)
+        self.assertEqual([(r["stage"], r["rows_in"], r["rows_out"], r["status"]) for r in records],
+                         [("filter_df_by_length", 10, 4, "ok"),
+                          ("merge_inputs", 10, None, "error")])
+        self.assertTrue(all(r["wall_s"] >= 0 and r["rss_mb"] > 0 for r in records))
+        log_lines = log_fhand.getvalue().splitlines()
+        self.assertTrue(log_lines[0].startswith("[stats] Persea_americana filter_df_by_length: wall"))
+        self.assertIn("rows 10 -> 4", log_lines[0])
+        self.assertTrue(log_lines[1].endswith("[error]"))
+
+    def test_disabled_stage_stats(self):
+        stats = StageStats()
+        with stats.stage("Persea_americana", "count_tes") as stage:
+            stage.rows_out = 4
+
+        self.assertIs(stage, NULL_STAGE)
+        self.assertEqual(stats.records, [])
+
+if __name__ == "__main__":
+    unittest.main()
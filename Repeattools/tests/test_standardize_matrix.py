@@ -0,0 +1,30 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from scipy.stats import zscore
+
+from src.utils import standardize_matrix
+
+class StandardizeMatrix(unittest.TestCase):
+
+    def test_same_as_zscore(self):
+        rng = np.random.default_rng(0)
+        matrix_df = pd.DataFrame(rng.integers(0, 500, size=(30, 6)),
+                                 index=[f"Species_{i}" for i in range(30)],
+                                 columns=["Gypsy", "Copia", "L1", "Helitron", "hAT", "CACTA"])
+        #Constant columns are left unchanged
+        matrix_df["hAT"] = 7
+        matrix_df["CACTA"] = 0
+
+        #Previous standardization, one zscore (ddof=0) per column
+        expected_df = matrix_df.apply(lambda col: zscore(col) if col.std() != 0 else col, axis=0)
+        assert_frame_equal(standardize_matrix(matrix_df), expected_df.astype("float64"))
+
+    def test_single_species(self):
+        matrix_df = pd.DataFrame([[3, 5]], index=["Persea_americana"], columns=["Gypsy", "Copia"])
+        assert_frame_equal(standardize_matrix(matrix_df), matrix_df.astype("float64"))
+
+if __name__ == "__main__":
+    unittest.main()
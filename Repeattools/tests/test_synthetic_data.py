@@ -0,0 +1,35 @@
+import tempfile
+import unittest
+
+from benchmarks.synthetic import write_dataset
+from src.read_input import (merge_inputs, read_repeatmasker_out,
+                            read_tesorter_cls_tsv)
+from src.utils import read_names_file
+
+class SyntheticData(unittest.TestCase):
+
+    def test_synthetic_data(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            names_fpath = write_dataset(tmp_dir, 2, 2000, te_fraction=0.5)
+            with open(names_fpath) as names:
+                species = read_names_file(names)
+            self.assertEqual(list(species), ["Spec000", "Spec001"])
+
+            species_dir = names_fpath.parent / "Spec000"
+            with open(next(species_dir.glob("*.out"))) as rm_fhand:
+                rm_repeats = read_repeatmasker_out(rm_fhand)
+            with open(next(species_dir.glob("*.cls.tsv"))) as te_fhand:
+                te_repeats = read_tesorter_cls_tsv(te_fhand)
+
+        self.assertEqual(len(rm_repeats), 2000)
+        self.assertTrue(400 < len(te_repeats) < 1600)
+        self.assertTrue((rm_repeats["length"] > 0).all())
+
+        #Every TESorter row matches its RepeatMasker row
+        for override in [False, True]:
+            merged_df = merge_inputs(rm_repeats, te_repeats, override)
+            self.assertEqual(len(merged_df), 2000)
+            self.assertEqual((merged_df["tes_order"] != "Unknown").sum(), len(te_repeats))
+
+if __name__ == "__main__":
+    unittest.main()
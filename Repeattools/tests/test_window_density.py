@@ -0,0 +1,46 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.density import compute_window_density, load_window_density, save_window_density
+
+class WindowDensity(unittest.TestCase):
+
+    def setUp(self):
+        #With 50 bp windows, the second Gypsy repeat covers 11 bp of
+        #the second window and 29 bp of the third one
+        self.species_df = pd.DataFrame({
+            "seqid": ["chr1", "chr1", "chr1", "chr2"],
+            "start": [1, 90, 150, 5],
+            "end": [11, 130, 160, 25],
+            "superfamily": pd.Categorical(["Gypsy", "Gypsy", "Copia", "Copia"])})
+
+    def test_window_density(self):
+        seq_lengths = pd.Series({"chr1": 260, "chr2": 30})
+        density = compute_window_density(self.species_df, "superfamily", 50, seq_lengths)
+
+        np.testing.assert_array_equal(density["seqids"], ["chr1", "chr2"])
+        np.testing.assert_array_equal(density["offsets"], [0, 6, 7])
+        np.testing.assert_array_equal(density["categories"], ["Gypsy", "Copia"])
+        np.testing.assert_array_equal(density["counts"][:, 0], [1, 1, 0, 0, 0, 0, 0])
+        np.testing.assert_array_equal(density["counts"][:, 1], [0, 0, 1, 0, 0, 0, 1])
+        np.testing.assert_array_equal(density["bp"][:, 0], [10, 11, 29, 0, 0, 0, 0])
+        np.testing.assert_array_equal(density["bp"][:, 1], [0, 0, 1, 9, 0, 0, 20])
+
+    def test_load_window_density(self):
+        density = compute_window_density(self.species_df, "superfamily", 100)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            density_fpath = Path(tmp_dir) / "Peame105.npz"
+            save_window_density(density_fpath, density)
+            density_df = load_window_density(density_fpath, "bp")
+
+        #Without sequence lengths, windows end at the last repeat
+        self.assertEqual(list(density_df.index), [("chr1", 1), ("chr1", 101), ("chr2", 1)])
+        self.assertEqual(list(density_df["Gypsy"]), [10 + 11, 29, 0])
+        self.assertEqual(list(density_df["Copia"]), [0, 10, 20])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,8 +8,10 @@ setup(
     url="https://github.com/AgustinAmata/Repeattools.git",
     packages=find_packages(),
     long_description=open(join(dirname(__file__), 'README.md')).read(),
-    install_requires=["ete3==3.1.3", "matplotlib==3.7.3",
+    install_requires=["matplotlib==3.7.3",
                       "numpy==1.25.0", "pandas==2.0.3",
-                      "PyQt5==5.15.9", "scipy==1.11.1",
-                      "seaborn==0.12.2", "scikit-learn==1.3.0"]
+                      "scipy==1.11.1",
+                      "seaborn==0.12.2", "scikit-learn==1.3.0"],
+    extras_require={"ete3": ["ete3==3.1.3", "PyQt5==5.15.9"],
+                    "zstd": ["zstandard"]}
 )